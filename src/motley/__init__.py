@@ -15,7 +15,7 @@ from loguru import logger
 # relative
 from . import codes
 from .utils import *
-from .string import Str
+from .string import Str, StyledText
 from .formatter import format, format_partial, stylize
 
 
@@ -82,6 +82,9 @@ class ConvenienceFunction:
     def __call__(self, s):
         # temptation here would be to pre-resolve codes, however this prevents
         # stacking effects appropriately
+        if not codes.use_color():
+            return s
+
         return codes.apply(s, fg=self.fg, bg=self.bg)
 
 
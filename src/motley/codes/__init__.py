@@ -5,6 +5,8 @@ Handel resolution of named colors and effects
 from . import bg, fg
 from .utils import *
 from .resolve import *
+from .depth import color_depth, downgrade, get_depth, set_depth
+from .mode import color_mode, get_color_mode, set_color_mode, use_color
 
 
 def _make_named_codes(fg_or_bg):
@@ -0,0 +1,302 @@
+"""
+Colour depth management. Downgrade 24-bit (truecolor) ANSI codes to the nearest
+colour in the 256 or 16 colour palettes, or strip colours entirely, for
+terminals that do not support the full colour range.
+"""
+
+
+# std
+import re
+import functools as ftl
+import contextlib as ctx
+
+# third-party
+import numpy as np
+
+
+# ---------------------------------------------------------------------------- #
+# Supported colour depths (bits per colour)
+TRUECOLOR = 24
+EIGHT_BIT = 8
+FOUR_BIT = 4
+NONE = 0
+
+DEPTHS = {
+    'truecolor':    TRUECOLOR,
+    '24bit':        TRUECOLOR,
+    24:             TRUECOLOR,
+    16777216:       TRUECOLOR,
+    '256':          EIGHT_BIT,
+    '8bit':         EIGHT_BIT,
+    256:            EIGHT_BIT,
+    8:              EIGHT_BIT,
+    '16':           FOUR_BIT,
+    '4bit':         FOUR_BIT,
+    16:             FOUR_BIT,
+    4:              FOUR_BIT,
+    'none':         NONE,
+    None:           NONE,
+    False:          NONE,
+    0:              NONE,
+}
+
+# number of bits per channel in the quantised colour cube lookup table
+LUT_BITS = 5
+_LUT_SHIFT = 8 - LUT_BITS
+
+# matches SGR escape sequences
+REGEX_SGR = re.compile(r'\x1b\[([\d;]*)m')
+
+# the xterm default colours for the 16 system colours
+SYSTEM_COLORS = np.array([
+    (0, 0, 0),          # black
+    (205, 0, 0),        # red
+    (0, 205, 0),        # green
+    (205, 205, 0),      # yellow
+    (0, 0, 238),        # blue
+    (205, 0, 205),      # magenta
+    (0, 205, 205),      # cyan
+    (229, 229, 229),    # white
+    (127, 127, 127),    # bright black
+    (255, 0, 0),        # bright red
+    (0, 255, 0),        # bright green
+    (255, 255, 0),      # bright yellow
+    (92, 92, 255),      # bright blue
+    (255, 0, 255),      # bright magenta
+    (0, 255, 255),      # bright cyan
+    (255, 255, 255),    # bright white
+])
+
+# 4-bit foreground and background colour codes
+_FG_4BIT = (*range(30, 38), *range(90, 98))
+_BG_4BIT = (*range(40, 48), *range(100, 108))
+_COLOR_CODES_4BIT = set(map(str, (*_FG_4BIT, *_BG_4BIT)))
+
+
+# ---------------------------------------------------------------------------- #
+# Module state
+_depth = TRUECOLOR
+
+
+def resolve_depth(depth):
+    """Resolve the various aliases for colour depth to an integer."""
+    key = depth.lower() if isinstance(depth, str) else depth
+    if key in DEPTHS:
+        return DEPTHS[key]
+
+    raise ValueError(f'Invalid colour depth: {depth!r}. Valid choices are: '
+                     f'{", ".join(map(repr, DEPTHS))}.')
+
+
+def get_depth():
+    """The currently active colour depth."""
+    return _depth
+
+
+def set_depth(depth):
+    """
+    Set the colour depth used when rendering ANSI codes.
+
+    Parameters
+    ----------
+    depth : {'truecolor', 256, 16, 'none'}
+        The colour depth. Aliases include the number of bits: 24, 8, 4, 0.
+    """
+    global _depth
+    _depth = resolve_depth(depth)
+
+
+@ctx.contextmanager
+def color_depth(depth):
+    """
+    Context manager that temporarily changes the colour depth.
+
+    Examples
+    --------
+    >>> with color_depth(256):
+    ...     print(motley.red('hello'))
+    """
+    previous = get_depth()
+    set_depth(depth)
+    try:
+        yield
+    finally:
+        set_depth(previous)
+
+
+# ---------------------------------------------------------------------------- #
+# Palettes
+
+def _palette_256():
+    # colours for the 256 colour palette
+    levels = np.array([0, 95, 135, 175, 215, 255])
+    cube = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), -1)
+    greys = np.repeat(np.arange(8, 248, 10)[:, None], 3, 1)
+    return np.vstack([SYSTEM_COLORS, cube.reshape(-1, 3), greys])
+
+
+PALETTE_256 = _palette_256()
+
+
+def _nearest(rgb, palette, offset=0):
+    rgb = np.asarray(rgb, float)[..., None, :]
+    dist = np.square(rgb - palette).sum(-1)
+    return dist.argmin(-1) + offset
+
+
+@ftl.lru_cache()
+def get_lut(depth):
+    """
+    Lookup table for nearest palette colour indices on a quantised colour cube
+    of `2 ** LUT_BITS` levels per channel. The table is computed once for each
+    colour depth.
+    """
+    depth = resolve_depth(depth)
+    if depth not in {EIGHT_BIT, FOUR_BIT}:
+        raise ValueError(f'No lookup table for colour depth {depth}.')
+
+    # centres of the quantised bins
+    n = 1 << LUT_BITS
+    centres = (np.arange(n) << _LUT_SHIFT) + (1 << _LUT_SHIFT) // 2
+    cube = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'), -1)
+
+    if depth == FOUR_BIT:
+        return _nearest(cube, SYSTEM_COLORS).astype(np.uint8)
+
+    # The 16 system colours are often redefined by terminal themes, so we map
+    # only to the colour cube and greyscale ramp.
+    return _nearest(cube, PALETTE_256[16:], 16).astype(np.uint8)
+
+
+@ftl.lru_cache()
+def _8bit_to_4bit():
+    lut = _nearest(PALETTE_256, SYSTEM_COLORS)
+    lut[:16] = np.arange(16)
+    return lut
+
+
+def rgb_to_8bit(rgb):
+    """
+    Nearest 256 colour palette index for 24-bit colours. Vectorized over the
+    leading dimensions of `rgb` which should have shape (..., 3).
+    """
+    r, g, b = np.moveaxis(np.asarray(rgb, int) >> _LUT_SHIFT, -1, 0)
+    return get_lut(EIGHT_BIT)[r, g, b]
+
+
+def rgb_to_4bit(rgb):
+    """
+    Nearest 16 colour palette index for 24-bit colours. Vectorized over the
+    leading dimensions of `rgb` which should have shape (..., 3).
+    """
+    r, g, b = np.moveaxis(np.asarray(rgb, int) >> _LUT_SHIFT, -1, 0)
+    return get_lut(FOUR_BIT)[r, g, b]
+
+
+def reduce(rgb, depth=None):
+    """
+    Vectorized reduction of 24-bit colours to the requested depth. Returns the
+    `rgb` array unchanged for truecolor, or an array of 8-bit colour indices
+    for the 256 and 16 colour palettes (indices 0-15 for the latter), or None
+    if colours are disabled.
+    """
+    depth = _depth if depth is None else resolve_depth(depth)
+    if depth == TRUECOLOR:
+        return rgb
+
+    if depth == EIGHT_BIT:
+        return rgb_to_8bit(rgb)
+
+    if depth == FOUR_BIT:
+        return rgb_to_4bit(rgb)
+
+
+# ---------------------------------------------------------------------------- #
+# Downgrading code strings
+
+def _4bit_code(index, ground):
+    codes = _FG_4BIT if ground == '38' else _BG_4BIT
+    return str(codes[index])
+
+
+def downgrade_params(params, depth=None):
+    """
+    Rewrite the SGR parameter string `params` (eg: '1;38;2;255;0;0') for the
+    colour `depth`. 24-bit colours are replaced by the nearest colour in the
+    palette of lower depth, and colours are removed entirely for depth 0.
+    """
+    depth = _depth if depth is None else resolve_depth(depth)
+    if depth == TRUECOLOR:
+        return params
+
+    return _downgrade_params(params, depth)
+
+
+@ftl.lru_cache(maxsize=4096)
+def _downgrade_params(params, depth):
+    out = []
+    parts = params.split(';')
+    itr = iter(parts)
+    for part in itr:
+        if part in {'38', '48'}:
+            # extended colour
+            mode = next(itr, None)
+            if mode == '2':
+                rgb = [int(next(itr, 0) or 0) for _ in range(3)]
+                index = int(rgb_to_8bit(rgb) if depth == EIGHT_BIT else
+                            rgb_to_4bit(rgb))
+            elif mode == '5':
+                index = int(next(itr, 0) or 0)
+                if depth == FOUR_BIT:
+                    index = int(_8bit_to_4bit()[index])
+            else:
+                # malformed, leave as is
+                out.extend(filter(None, (part, mode)))
+                continue
+
+            if depth == EIGHT_BIT:
+                out.append(f'{part};5;{index}')
+            elif depth == FOUR_BIT:
+                out.append(_4bit_code(index, part))
+            # depth == NONE: drop
+
+        elif depth == NONE and part in _COLOR_CODES_4BIT:
+            continue
+        else:
+            out.append(part)
+
+    return ';'.join(out)
+
+
+def _sub_sgr(match, depth):
+    params = match[1]
+    new = _downgrade_params(params, depth)
+    if new == params:
+        return match[0]
+
+    # codes which contained only colours are removed (an empty parameter list
+    # would otherwise act as a reset)
+    return f'\x1b[{new}m' if new.strip(';') else ''
+
+
+def downgrade(s, depth=None):
+    """
+    Rewrite all the SGR codes in the string `s` for the colour `depth`. This
+    can be used as a bulk pass over finished (rendered) strings.
+
+    Parameters
+    ----------
+    s : str
+        String containing ANSI codes.
+    depth : {'truecolor', 256, 16, 'none'}, optional
+        The colour depth, by default the currently active depth.
+
+    Returns
+    -------
+    str
+    """
+    depth = _depth if depth is None else resolve_depth(depth)
+    if depth == TRUECOLOR or '\x1b' not in s:
+        return s
+
+    return REGEX_SGR.sub(ftl.partial(_sub_sgr, depth=depth), s)
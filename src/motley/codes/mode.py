@@ -0,0 +1,127 @@
+"""
+Colour mode: global switch for enabling or disabling ANSI codes. When colours
+are disabled, all functions that would apply codes return their input unchanged
+before doing any code resolution. See `tests/bench_color.py` for a comparison
+of the cost with plain `str.format`.
+
+The initial mode is read from the `MOTLEY_COLOR` environment variable, which
+may be one of 'auto', 'always' or 'never', and defaults to 'always'. If the
+`NO_COLOR` environment variable is set (to any non-empty value), colours are
+disabled. See https://no-color.org/.
+"""
+
+
+# std
+import os
+import sys
+import contextlib as ctx
+
+
+# ---------------------------------------------------------------------------- #
+MODES = {
+    'auto':     'auto',
+    'tty':      'auto',
+    'always':   'always',
+    'on':       'always',
+    True:       'always',
+    'never':    'never',
+    'off':      'never',
+    False:      'never',
+    None:       'never',
+}
+
+# module state
+_mode = 'always'
+_enabled = True
+
+
+def resolve_mode(mode):
+    """Resolve the various aliases for colour mode."""
+    key = mode.lower() if isinstance(mode, str) else mode
+    if key in MODES:
+        return MODES[key]
+
+    raise ValueError(f'Invalid colour mode: {mode!r}. Valid choices are: '
+                     "'auto', 'always', 'never'.")
+
+
+def detect(stream=None):
+    """
+    Check whether colours should be used when writing to `stream` (by default
+    `sys.stdout`). Colours are used if the `NO_COLOR` environment variable is
+    not set and the stream is a terminal.
+    """
+    if os.environ.get('NO_COLOR'):
+        return False
+
+    stream = sys.stdout if stream is None else stream
+    isatty = getattr(stream, 'isatty', None)
+    try:
+        return bool(isatty and isatty())
+    except ValueError:
+        # closed stream
+        return False
+
+
+def get_color_mode():
+    """The currently active colour mode: 'auto', 'always' or 'never'."""
+    return _mode
+
+
+def set_color_mode(mode, stream=None):
+    """
+    Set the colour mode.
+
+    Parameters
+    ----------
+    mode : {'auto', 'always', 'never'} or bool
+        If 'auto', detect whether colours are supported from the `NO_COLOR`
+        environment variable and whether `stream` is a terminal. Detection is
+        done once, when this function is called.
+    stream : file-like, optional
+        The output stream used for detection in 'auto' mode, by default
+        `sys.stdout`.
+    """
+    global _mode, _enabled
+
+    _mode = resolve_mode(mode)
+    _enabled = detect(stream) if _mode == 'auto' else (_mode == 'always')
+
+
+def use_color():
+    """Whether ANSI codes will currently be rendered."""
+    return _enabled
+
+
+@ctx.contextmanager
+def color_mode(mode, stream=None):
+    """
+    Context manager that temporarily changes the colour mode.
+
+    Examples
+    --------
+    >>> with color_mode('never'):
+    ...     motley.red('hello')
+    'hello'
+    """
+    previous = (_mode, _enabled)
+    set_color_mode(mode, stream)
+    try:
+        yield
+    finally:
+        _restore(*previous)
+
+
+def _restore(mode, enabled):
+    global _mode, _enabled
+    _mode, _enabled = mode, enabled
+
+
+def _init():
+    mode = os.environ.get('MOTLEY_COLOR', 'always')
+    if os.environ.get('NO_COLOR'):
+        mode = 'never'
+    set_color_mode(mode)
+
+
+_init()
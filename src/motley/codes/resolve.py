@@ -16,8 +16,10 @@ import more_itertools as mit
 from recipes.dicts import ManyToOneMap
 
 # relative
+from .. import stats
 from ..colors import CSS_TO_RGB
 from ._codes import *
+from . import depth, mode
 from .utils import parse
 from .exceptions import InvalidStyle
 
@@ -239,9 +241,44 @@ def get_code_list(*effects, **kws):
     return list(_iter_codes(*effects, **kws))
 
 
+# cache of resolved code strings for styles given by name
+_CODE_CACHE = {}
+_CODE_CACHE_SIZE = 1024
+
+
+def _is_named(obj):
+    # None, str or tuple of str. Only these are cached, since eg. `(1, 0, 0)`
+    # and `(1., 0, 0)` compare equal, but resolve to different colours
+    return obj is None or isinstance(obj, str) or (
+        type(obj) is tuple and all(isinstance(_, str) for _ in obj)
+    )
+
+
+def _resolve_params(effects, kws):
+    if not (_is_named(effects) and all(map(_is_named, kws.values()))):
+        return ';'.join(_iter_codes(*effects, **kws))
+
+    key = (effects, *kws.items())
+    if (codes := _CODE_CACHE.get(key)) is not None:
+        if stats.enabled:
+            stats.count('codes.resolve.cache_hits')
+        return codes
+
+    if len(_CODE_CACHE) >= _CODE_CACHE_SIZE:
+        _CODE_CACHE.clear()
+
+    codes = _CODE_CACHE[key] = ';'.join(_iter_codes(*effects, **kws))
+    return codes
+
+
 def get_code_str(*effects, **kws):
+    if stats.enabled:
+        stats.count('codes.resolve')
+
     # get the semi-colon separated integers as a string: eg '34;48;5;22'
-    return ';'.join(_iter_codes(*effects, **kws))
+    codes = _resolve_params(effects, kws)
+    # rewrite colours for terminals with limited colour support
+    return depth.downgrade_params(codes)
 
 
 def get(*effects, **kws):
@@ -257,7 +294,14 @@ def get(*effects, **kws):
     -------
 
     """
-    return ''.join((CSI, get_code_str(*effects, **kws), 'm'))
+    if not mode.use_color():
+        return ''
+
+    # colours may all be removed by the active colour depth, in which case an
+    # empty parameter list would otherwise act as a reset
+    if params := get_code_str(*effects, **kws):
+        return ''.join((CSI, params, 'm'))
+    return ''
 
 
 def from_list(fg=None, bg=None):
@@ -287,6 +331,10 @@ def apply(s, *effects, **kws):
     # first convert to str
     # string = str(s)
 
+    # colours disabled: skip code resolution entirely
+    if not mode.use_color():
+        return s
+
     # get code bits eg: '34;48;5;22'
     new_codes = get_code_str(*effects, **kws)
 
@@ -302,10 +350,16 @@ def apply(s, *effects, **kws):
 
     # NOTE: final byte 'm' only valid for SGR (Select Graphic Rendition) and not
     # other codes, but this is all we support for now
-    return (''.join(f'{CSI}{params};{new_codes}m{w}{END}'
-                    for _, params, _, w, _ in parse(s))
-            if new_codes
-            else s)
+    result = (''.join(f'{CSI}{params};{new_codes}m{w}{END}'
+                      for _, params, _, w, _ in parse(s))
+              if new_codes
+              else s)
+
+    if stats.enabled:
+        stats.count('codes.apply')
+        stats.count('codes.apply.bytes', len(str(result).encode()))
+
+    return result
 
 
 def apply_naive(s, *effects, **kws):
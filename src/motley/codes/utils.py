@@ -15,8 +15,8 @@ from recipes.oo.slots import SlotHelper
 
 
 # ---------------------------------------------------------------------------- #
-__all__ = ['has_ansi', 'strip', 'pull', 'parse', 'split', 'length',
-           'length_codes', 'length_seen']
+__all__ = ['has_ansi', 'strip', 'pull', 'parse', 'split', 'minimise',
+           'length', 'length_codes', 'length_seen']
 
 # REGEX_ANSI = re.compile(r'''(?x)
 #     (?P<csi>\x1b\[)             # Control Sequence Introducer   eg: '\x1b['
@@ -172,17 +172,164 @@ def split(s):
     return list(split_iter(s))
 
 
-# def shortest(s):
-#     """
-#     Removes superfluous control sequence indicators to get the shortest
-#     version of the string that will render identical to the original
-#
-#     Eg: the following two strings will render identically
-#         '\033[31;1;43mhi\033[0m'
-#         '\x1b[31m\x1b[1m\x1b[43mhi\x1b[0m\x1b[31m\x1b[0m'
-#     """
-#
-#     pattern2 = r'(\x1b\[[\d;]*[a-zA-Z])*(.*)(\x1b\[0m)'
+# ---------------------------------------------------------------------------- #
+# SGR state machine
+
+# codes that reset (some of) the text effects
+_EFFECT_RESETS = {
+    22: {1, 2},
+    23: {3},
+    24: {4, 21},
+    25: {5, 6},
+    27: {7},
+    28: {8},
+    29: {9},
+}
+
+
+class _SGRState:
+    """
+    Graphic rendition state of the terminal as determined by a sequence of SGR
+    codes.
+    """
+
+    __slots__ = ('effects', 'fg', 'bg')
+
+    def __init__(self, effects=(), fg='', bg=''):
+        self.effects = set(effects)
+        self.fg = fg
+        self.bg = bg
+
+    def __eq__(self, other):
+        return ((self.effects, self.fg, self.bg) ==
+                (other.effects, other.fg, other.bg))
+
+    def __bool__(self):
+        return bool(self.effects or self.fg or self.bg)
+
+    def copy(self):
+        return _SGRState(self.effects, self.fg, self.bg)
+
+    def reset(self):
+        self.effects = set()
+        self.fg = self.bg = ''
+
+    def update(self, params):
+        # missing parameters are treated as 0 (reset)
+        itr = iter(params.split(';'))
+        for code in itr:
+            code = int(code or 0)
+            if code == 0:
+                self.reset()
+            elif code in {38, 48}:
+                # extended colours: '38;5;n' or '38;2;r;g;b'
+                mode = next(itr, '')
+                n = {'5': 1, '2': 3}.get(mode, 0)
+                value = ';'.join((str(code), mode, *(next(itr, '0') or '0'
+                                                     for _ in range(n))))
+                setattr(self, 'fg' if code == 38 else 'bg', value)
+            elif code in _EFFECT_RESETS:
+                self.effects -= _EFFECT_RESETS[code]
+            elif (30 <= code <= 37) or (90 <= code <= 97):
+                self.fg = str(code)
+            elif (40 <= code <= 47) or (100 <= code <= 107):
+                self.bg = str(code)
+            elif code == 39:
+                self.fg = ''
+            elif code == 49:
+                self.bg = ''
+            else:
+                self.effects.add(code)
+
+    def params(self):
+        return ';'.join((*map(str, sorted(self.effects)),
+                         *filter(None, (self.fg, self.bg))))
+
+    def transition(self, new):
+        """Shortest parameter string that changes this state into `new`."""
+        if self == new:
+            return ''
+
+        full = new.params()
+        if not new:
+            return '0'
+
+        if not self.effects - new.effects:
+            # only additions / colour changes
+            changes = ';'.join((
+                *map(str, sorted(new.effects - self.effects)),
+                *(new.fg or '39' for _ in range(self.fg != new.fg)),
+                *(new.bg or '49' for _ in range(self.bg != new.bg))
+            ))
+            if len(changes) <= len(full) + 2:
+                return changes
+
+        return f'0;{full}'
+
+
+def _flush(out, current, pending):
+    # emit the codes needed to render subsequent text with the pending state
+    if params := current.transition(pending):
+        out.append(f'\x1b[{params}m')
+        return pending.copy()
+    return current
+
+
+def minimise(s):
+    """
+    Get the shortest version of the string that will render identical to the
+    original. Overridden colours, duplicate effects, empty parameters, no-op
+    resets and codes that do not apply to any text are removed, and adjacent
+    codes are merged. A final reset is kept only if the input resets the
+    state after its last text.
+
+    Examples
+    --------
+    The following two strings will render identically:
+    >>> minimise('\x1b[31m\x1b[1m\x1b[43mhi\x1b[0m\x1b[31m\x1b[0m')
+    '\x1b[1;31;43mhi\x1b[0m'
+    >>> minimise('\x1b[31mhi')
+    '\x1b[31mhi'
+    """
+    if '\x1b' not in s:
+        return s
+
+    out = []
+    current = _SGRState()   # state as rendered so far
+    pending = _SGRState()   # state requested by codes seen so far
+    reset = False           # whether the state was reset after the last text
+    idx = 0
+    for mo in REGEX_ANSI.finditer(s):
+        if (start := mo.start()) != idx:
+            # text: emit transition to the requested state
+            current = _flush(out, current, pending)
+            out.append(s[idx:start])
+            reset = False
+
+        idx = mo.end()
+        if mo['final_byte'] == 'm':
+            pending.update(mo['params'])
+            reset = reset or not pending
+        else:
+            # non-SGR sequences are kept verbatim, but may depend on the
+            # current state (eg. erase with background colour)
+            current = _flush(out, current, pending)
+            out.append(mo[0])
+
+    if idx != len(s):
+        current = _flush(out, current, pending)
+        out.append(s[idx:])
+        reset = False
+
+    # styles left open by the input are left open in the output
+    if current and reset:
+        out.append('\x1b[0m')
+
+    return ''.join(out)
+
+
+# alias
+shortest = minimise
 
 
 def length(s, raw=False):
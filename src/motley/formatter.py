@@ -68,7 +68,7 @@ from recipes.string.brackets import (BracketParser, UnpairedBracketError,
                                      csplit, level)
 
 # relative
-from . import codes
+from . import codes, stats
 from .codes import utils as ansi
 
 
@@ -297,7 +297,7 @@ class Formattable(SlotHelper):
 # ---------------------------------------------------------------------------- #
 def _apply_style(string, **style):
 
-    if not any(style.values()):
+    if not (codes.use_color() and any(style.values())):
         return string
 
     # apply style
@@ -694,6 +694,9 @@ class Formatter(BuiltinFormatter, LoggingMixin):
         motley.codes.exceptions.InvalidStyle
             If the colour / style directives could not be resolved.
         """
+        if stats.enabled:
+            stats.count('formatter.format_field')
+
         self.logger.debug('Formatting {!r} with {!r} at parent.', value, spec)
         value, spec, style = self._parse_spec(value, spec)
 
@@ -808,6 +811,9 @@ class PartialFormatter(Formatter):
         return result
 
     def format_field(self, value, spec):
+        if stats.enabled:
+            stats.count('formatter.format_field')
+
         self.logger.debug('value = {!r}, spec = {!r}.', value, spec)
 
         # convert str necessary to measure field width in _parse_spec
@@ -148,3 +148,25 @@ class Conditional:
 # yield tuple(codes._gen_codes(txt, bg=bg))
 
 ConditionalFormatter = Conditional
+
+
+class TypeGuard:
+    """
+    A str formatter that verifies the type of each object before formatting.
+    Objects of unexpected type are formatted with the `fallback` formatter
+    instead. This allows choosing a formatter from the types of a sample of the
+    data, with verification deferred until formatting.
+    """
+
+    def __init__(self, formatter, types, fallback=str):
+        self.formatter = formatter
+        self.types = frozenset(types)
+        self.fallback = fallback
+        self.n_fallback = 0
+
+    def __call__(self, obj):
+        if type(obj) in self.types:
+            return self.formatter(obj)
+
+        self.n_fallback += 1
+        return self.fallback(obj)
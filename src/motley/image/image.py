@@ -20,7 +20,7 @@ from recipes.functionals import echo0
 from recipes.string.unicode import subscripts, superscripts
 
 # relative
-from .. import apply, codes, table, textbox
+from .. import apply, codes, stats, table, textbox
 from ..codes import utils as ansi
 from .trace import trace_boundary
 
@@ -222,20 +222,28 @@ def ticker(start, stop, every):
 
 
 def thumbnails(images, masks=(), origins=(), cmap=None, contour=('r', 'B'),
-               frame=True, **kws):
+               frame=True, clim=None, n_levels=None, **kws):
     """
     Cutout image thumbnails displayed as a grid in terminal. Optional binary
     contours overlaid.
 
     Parameters
     ----------
-    images : np.ndarray
-        Image arrays to display.
-
+    images : np.ndarray or list of np.ndarray
+        Image arrays to display. Either a 3D stack of images, or a list of 2D
+        image arrays (which may differ in shape).
     cmap : str, optional
         Colour map, by default 'cmr.voltage_r'.
     contour : str, optional
         Colour for the overlaid contour, by default 'r'.
+    clim : tuple or bool or None, optional
+        Colour limits. If None (the default), the limits are resolved for each
+        image individually. If True, a common set of limits is computed once for
+        the entire stack. A 2-tuple (vmin, vmax) will be used for all images.
+    n_levels : int, optional
+        Number of discrete colour levels, by default the number of colours in
+        the colour map. The pre-rendered pixels for these levels are cached and
+        shared by all thumbnails.
 
     """
     #    contour_cmap='hot'):
@@ -246,9 +254,13 @@ def thumbnails(images, masks=(), origins=(), cmap=None, contour=('r', 'B'),
     if frame is True and origins:
         frame = '['
 
+    if clim is True:
+        # common colour limits for all images in the stack
+        clim = resolve_clim(np.hstack([np.ravel(image) for image in images]))
+
     stack = []
     for origin, image, mask in itt.zip_longest(origins, images, masks):
-        img = AnsiImage(image, cmap, frame=frame)
+        img = AnsiImage(image, cmap, frame=frame, clim=clim, n_levels=n_levels)
 
         if mask is not None:
             img.overlay(mask, contour)
@@ -283,9 +295,10 @@ def thumbnails(images, masks=(), origins=(), cmap=None, contour=('r', 'B'),
 
 def thumbnails_table(images, masks=(), labels=..., origins=(),
                      cmap=None, contour=('r', 'B'), frame=True,
-                     info=(), **kws):
+                     info=(), clim=None, n_levels=None, **kws):
 
-    thumbs = thumbnails(images, masks, origins, cmap, contour, frame)
+    thumbs = thumbnails(images, masks, origins, cmap, contour, frame,
+                        clim, n_levels)
 
     row_headers = None
     if info:
@@ -299,6 +312,114 @@ def thumbnails_table(images, masks=(), labels=..., origins=(),
                        **kws)
 
 
+# ---------------------------------------------------------------------------- #
+# Colour map lookup tables
+
+# cache of pre-rendered pixels keyed on (cmap name, n_levels, depth)
+_LUT_CACHE = {}
+
+
+def get_level_colours(cmap=None, n_levels=None):
+    """
+    RGB colours for each colour level in the colour map.
+
+    Parameters
+    ----------
+    cmap : str or matplotlib.colors.Colormap, optional
+        The colour map, by default the matplotlib default.
+    n_levels : int, optional
+        Number of discrete colour levels, by default `cmap.N`.
+
+    Returns
+    -------
+    np.ndarray(dtype=uint8)
+        Colours for each of the `n_levels` colour levels, followed by the
+        "under", "over" and "bad" colours of the colour map. Indexed by
+        `get_level_index`.
+    """
+    cmap = colormaps.get_cmap(cmap)
+    n_levels = int(n_levels or cmap.N)
+    levels = (np.arange(n_levels) if n_levels == cmap.N else
+              np.linspace(0, 1, n_levels))
+    return np.vstack([cmap(levels, bytes=True),
+                      # under, over
+                      cmap(np.array([-1, cmap.N]), bytes=True),
+                      # bad
+                      cmap(np.array([np.nan]), bytes=True)])[:, :3]
+
+
+def get_lut(cmap=None, n_levels=None, depth=None):
+    """
+    Pre-rendered ANSI coded pixels for each colour level in the colour map.
+    Lookup tables are cached, so that all images rendered with the same colour
+    map share the escape sequences instead of resolving codes per pixel.
+
+    Parameters
+    ----------
+    cmap : str or matplotlib.colors.Colormap, optional
+        The colour map, by default the matplotlib default.
+    n_levels : int, optional
+        Number of discrete colour levels, by default `cmap.N`.
+    depth : int, optional
+        Colour depth of the rendered escape sequences, by default the currently
+        active colour depth. See `motley.codes.set_depth`.
+
+    Returns
+    -------
+    np.ndarray(dtype=str)
+        Pixels for each of the `n_levels` colour levels, followed by the pixels
+        for the "under", "over" and "bad" colours of the colour map.
+    """
+    cmap = colormaps.get_cmap(cmap)
+    n_levels = int(n_levels or cmap.N)
+    depth = codes.depth.resolve_depth(
+        codes.get_depth() if depth is None else depth
+    )
+    key = (cmap.name, n_levels, depth)
+    if key in _LUT_CACHE:
+        cached, lut = _LUT_CACHE[key]
+        if (cached is cmap) or (cached == cmap):
+            return lut
+
+    rgb = get_level_colours(cmap, n_levels)
+    if depth == codes.depth.NONE:
+        lut = np.full(len(rgb), '  ')
+    else:
+        # vectorized reduction to palette indices for lower colour depths
+        colours = codes.depth.reduce(rgb, depth)
+        if depth != codes.depth.TRUECOLOR:
+            colours = colours.tolist()
+
+        with codes.color_depth(depth):
+            lut = np.array([codes.apply('  ', bg=_) for _ in colours])
+
+    _LUT_CACHE[key] = (cmap, lut)
+    return lut
+
+
+def get_level_index(data, n_levels):
+    """
+    Map normalized image data to integer colour level indices. This follows the
+    indexing convention of `matplotlib.colors.Colormap` so that indices
+    `n_levels`, `n_levels + 1` and `n_levels + 2` represent the "under", "over"
+    and "bad" colours respectively.
+    """
+    bad = np.ma.getmaskarray(data)
+    xa = np.ma.getdata(data).astype(float) * n_levels
+    bad |= np.isnan(xa)
+    xa[xa == n_levels] = n_levels - 1
+    under = xa < 0
+    over = xa >= n_levels
+
+    with np.errstate(invalid='ignore'):
+        index = xa.astype(int)
+
+    index[under] = n_levels
+    index[over] = n_levels + 1
+    index[bad] = n_levels + 2
+    return index
+
+
 # ---------------------------------------------------------------------------- #
 
 
@@ -428,31 +549,35 @@ class AnsiImage(TextImageBase):
     Pixels are represented as two spaces coloured using ansi codes.
     """
 
-    def __init__(self, data, cmap=None, orient=0, frame=True):
+    def __init__(self, data, cmap=None, orient=0, frame=True, clim=None,
+                 n_levels=None):
         # colour map
         self.cmap = colormaps.get_cmap(cmap)
+        self.clim = clim
+        self.n_levels = int(n_levels or self.cmap.N)
         # init base
         TextImageBase.__init__(self, data, orient, frame)
         self.needs_edge = []
         self.mask_color = None
 
     def get_pixels(self, data, orient):
-        from . import codes
-
         #
         data = super().get_pixels(data, orient)
 
         # normalize
         data = data.astype(float)
-        data = Normalize(*resolve_clim(data))(data)
-
-        # get the 24 bit colours
-        shape = data.shape
-        data = self.cmap(data.ravel(), bytes=True)[..., :3]
+        clim = resolve_clim(data) if self.clim is None else self.clim
+        data = Normalize(*clim)(data)
 
         # create "pixels"
-        # a single pixels represented by 2 ansi coded whitespaces.
-        return np.reshape([codes.apply('  ', bg=_) for _ in data], shape)
+        # a single pixels represented by 2 ansi coded whitespaces. These are
+        # pre-rendered for each colour level, so we only need to index the
+        # lookup table here.
+        lut = get_lut(self.cmap, self.n_levels)
+        if stats.enabled:
+            stats.count('image.pixels', data.size)
+
+        return lut[get_level_index(data, self.n_levels)]
 
     def overlay(self, mask, color=None):
         pixels, self.needs_edge = overlay(mask, self.pixels[::-1], color)
@@ -22,6 +22,21 @@ def foo():
     ...
 
 
+@profile(mode='sample', interval=0.001)  # low overhead statistical profiler
+def foo():
+    ...
+
+
+@profile(every=None, at_exit=True)  # accumulate stats, report at exit
+def foo():
+    ...
+
+
+@profile(mode='memory')  # memory allocated per line
+def foo():
+    ...
+
+
 """
 
 from .core import *
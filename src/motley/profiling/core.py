@@ -1,15 +1,21 @@
 # std
+import sys
+import time
+import atexit
 import logging
 import inspect
+import threading
 import functools as ftl
+from collections import defaultdict
 
 # third-party
 import numpy as np
 import line_profiler as lp
 
 # relative
-from .. import codes
-from .printers import ReportStats, ReportStatsTable
+from .. import codes, terminal
+from .memory import MemoryProfiler
+from .printers import ReportMemoryTable, ReportStats, ReportStatsTable
 
 
 # def get_methods(cls_or_obj):
@@ -19,6 +25,43 @@ from .printers import ReportStats, ReportStatsTable
 #     return methods
 
 
+def _add_stats_extras(lstats, fmap):
+    """
+    Calculate some extra stats for `line_profiler.LineStats` and replace the
+    function name in the timing dict keys with the actual function object.
+    """
+    timings = {}
+    grand_total = sum(a for v in lstats.timings.values() for *_, a in v)
+
+    for info, line_times in lstats.timings.items():
+        filename, start_line_no, name = info
+        if len(line_times):
+            # function was executed
+            lnr, hits, times = zip(*line_times)
+
+            # calculate extras
+            times = np.array(times)
+            total = times.sum()
+            total_time = total * lstats.unit
+            per_hit = times / hits
+            foft = times / total  # fraction of function total
+            fogt = times / grand_total  # fraction of grand total
+
+            # remake stats dict
+            stats = dict(zip(lnr, zip(hits, times, per_hit, foft, fogt)))
+        else:
+            total_time = 0
+            stats = {}
+
+        newkey = (filename, start_line_no, fmap[(filename, name)])
+        timings[newkey] = (stats, total_time)
+
+    lstats.timings = timings
+    lstats.grand_total = grand_total
+
+    return lstats
+
+
 class LineProfiler(lp.LineProfiler):
     """
     Extend `line_profiler.LineProfiler` to enable printing timing statistics
@@ -28,10 +71,10 @@ class LineProfiler(lp.LineProfiler):
     # TODO: option to reset after multiple calls.  may sometimes be desired
 
     def __init__(self, *args, **kws):
-        lp.LineProfiler.__init__(self, *args, **kws)
         self.fmap = {}  # name - function mapping
         # add mapping from function names to actual function object. Useful for
         # retrieving source code from interactively defined functions
+        lp.LineProfiler.__init__(self, *args, **kws)
 
     # def print_stats(self, stream=None, output_unit=None, **kws):
     #     # report line timings for each profiled function
@@ -49,40 +92,7 @@ class LineProfiler(lp.LineProfiler):
         """
         Calculate some extra stats. Also add function object in key to stats.
         """
-        lstats = lp.LineProfiler.get_stats(self)
-        # return lstats
-
-        # replace func name in timing dict with actual func object
-        timings = {}
-        grand_total = sum(a for v in lstats.timings.values() for *_, a in v)
-
-        for info, line_times in lstats.timings.items():
-            filename, start_line_no, name = info
-            if len(line_times):
-                # function was executed
-                lnr, hits, times = zip(*line_times)
-
-                # calculate extras
-                times = np.array(times)
-                total = times.sum()
-                total_time = total * lstats.unit
-                per_hit = times / hits
-                foft = times / total  # fraction of function total
-                fogt = times / grand_total  # fraction of grand total
-
-                # remake stats dict
-                stats = dict(zip(lnr, zip(hits, times, per_hit, foft, fogt)))
-            else:
-                total_time = 0
-                stats = {}
-
-            newkey = (filename, start_line_no, self.fmap[(filename, name)])
-            timings[newkey] = (stats, total_time)
-
-        lstats.timings = timings
-        lstats.grand_total = grand_total
-
-        return lstats
+        return _add_stats_extras(lp.LineProfiler.get_stats(self), self.fmap)
 
     def add_all_methods(self, cls, exclude=None):
         """
@@ -116,44 +126,177 @@ class LineProfiler(lp.LineProfiler):
         self.enable_by_count()
 
     def rank_functions(self):
-        from shutil import get_terminal_size
-
-        import numpy as np
-        from recipes.lists import cosort
-
-        from motley.table import Table
-
-        lstats = self.get_stats()
-        totals = {}
-        for (filename, lineno, func), timings in lstats.timings.items():
-            if len(timings):
-                linenos, Nhits, times = zip(*timings)
-                totals[func.__name__] = sum(times)
-
-        # sort timings etc. descending
-        totals, names = cosort(totals.values(), totals.keys(), order=-1)
-
-        # do histogram thing
-        frac = np.divide(totals, max(totals))
-
-        # format totals with space as thousands separator for readability
-        def fmtr(s): return '{:,}'.format(s).replace(',', ' ')
-        # totals = list(map(fmtr, totals))
-        col_headers = ('Function', u'Time (\u00B5s)')
-        table = Table(list(zip(names, totals)),
-                      col_headers=col_headers,
-                      formatters={1: fmtr},
-                      totals=[1])
-
-        termwidth = get_terminal_size()[0]
-        hwidth = termwidth - table.get_width() - 1
-        frac = np.round(frac * hwidth).astype(int)
-        sTable = str(table).split('\n')
-        for i, f in enumerate(frac):
-            hline = codes.apply(' ' * f, bg=ReportStatsTable.bar_color)
-            sTable[i + 2] += hline
-        htable = '\n'.join(sTable)
-        print(htable)
+        print(rank_functions(self.get_stats()))
+
+
+def rank_functions(line_stats):
+    """
+    Table of total time spent in each profiled function, ranked in descending
+    order, with a histogram bar trailing each row.
+    """
+    from recipes.lists import cosort
+
+    from motley.table import Table
+
+    totals = {}
+    for (filename, lineno, func), (stats, total) in line_stats.timings.items():
+        if len(stats):
+            totals[func.__name__] = round(total * 1e6)
+
+    # sort timings etc. descending
+    totals, names = cosort(totals.values(), totals.keys(), order=-1)
+
+    # do histogram thing
+    frac = np.divide(totals, max(totals))
+
+    # format totals with space as thousands separator for readability
+    def fmtr(s): return '{:,}'.format(s).replace(',', ' ')
+    # totals = list(map(fmtr, totals))
+    col_headers = ('Function', u'Time (\u00B5s)')
+    table = Table(list(zip(names, totals)),
+                  col_headers=col_headers,
+                  formatters={1: fmtr},
+                  totals=[1])
+
+    termwidth = terminal.get_width()
+    hwidth = termwidth - table.get_width() - 1
+    frac = np.round(frac * hwidth).astype(int)
+    sTable = str(table).split('\n')
+    for i, f in enumerate(frac):
+        hline = codes.apply(' ' * f, bg=ReportStatsTable.bar_color)
+        sTable[i + 2] += hline
+    return '\n'.join(sTable)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that periodically samples the call stack of all running
+    threads from a background thread, instead of instrumenting every line like
+    `line_profiler` does. The overhead is low enough to leave enabled in
+    production code, at the cost of statistical (rather than exact) timings.
+
+    Time spent on each line of the registered functions is accumulated from the
+    measured interval between consecutive samples. `get_stats` returns the same
+    structure as `LineProfiler.get_stats`, with sample counts as hits, so the
+    report printers work with either profiler.
+    """
+
+    unit = 1e-6
+    """Time unit of the accumulated line timings (microseconds)."""
+
+    def __init__(self, *functions, interval=0.005):
+        """
+        Parameters
+        ----------
+        *functions: callable
+            Functions to profile.
+        interval: float
+            Sampling interval in seconds. The sampler thread has to acquire the
+            GIL to take a sample, so for cpu-bound code the effective interval
+            is bounded below by `sys.getswitchinterval()`.
+        """
+        self.interval = float(interval)
+        self.fmap = {}      # (filename, name) - function mapping
+        self.codes = {}     # code - (filename, first line, name) mapping
+        self.samples = defaultdict(lambda: defaultdict(lambda: [0, 0.]))
+        self.enable_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+        # guards `samples`, which the sampler thread updates while stats may be
+        # collected from other threads
+        self._lock = threading.Lock()
+
+        for func in functions:
+            self.add_function(func)
+
+    def add_function(self, func):
+        code = getattr(func, '__func__', func).__code__
+        filename = inspect.getfile(func)
+        self.fmap[(filename, func.__name__)] = func
+        self.codes[code] = (filename, code.co_firstlineno, func.__name__)
+
+    def enable_by_count(self):
+        if self.enable_count == 0:
+            self.enable()
+        self.enable_count += 1
+
+    def disable_by_count(self):
+        if self.enable_count > 0:
+            self.enable_count -= 1
+            if self.enable_count == 0:
+                self.disable()
+
+    def enable(self):
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f'{type(self).__name__}')
+        self._thread.start()
+
+    def disable(self):
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        ident = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self.sample(sys._current_frames(), now - last, ident)
+            last = now
+
+    def sample(self, frames, dt, ignore=None):
+        """
+        Attribute the time interval `dt` to the current line of each frame
+        of a registered function in the stacks `frames`. Lines that appear
+        more than once in a stack (eg. in recursive calls) are counted once.
+        """
+        codes = self.codes
+        hits = []
+        for thread_id, frame in frames.items():
+            if thread_id == ignore:
+                continue
+
+            seen = set()
+            while frame is not None:
+                if frame.f_code in codes:
+                    seen.add((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            hits.extend(seen)
+
+        with self._lock:
+            for code, lnr in hits:
+                line = self.samples[code][lnr]
+                line[0] += 1
+                line[1] += dt
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def get_stats(self):
+        """
+        Collect sampled line timings into `line_profiler.LineStats`, and
+        calculate extra stats like `LineProfiler.get_stats`. This is safe to
+        call while sampling is running.
+        """
+        with self._lock:
+            samples = {code: [(lnr, *line) for lnr, line in sorted(lines.items())]
+                       for code, lines in self.samples.items()}
+
+        timings = {key: [(lnr, hits, round(dt / self.unit))
+                         for lnr, hits, dt in samples.get(code, ())]
+                   for code, key in self.codes.items()}
+        return _add_stats_extras(lp.LineStats(timings, self.unit), self.fmap)
+
+    def rank_functions(self):
+        print(rank_functions(self.get_stats()))
 
 
 # ****************************************************************************************************
@@ -163,18 +306,38 @@ class LineProfiler(lp.LineProfiler):
 class profile:
     """
     Decorator for printing results from multiple profiled functions in
-    various output formats
+    various output formats.
+
+    By default the report is printed after every call of the decorated
+    function. For functions that are called many times, reporting can be
+    deferred: stats accumulate across calls and the report is printed every
+    `every` calls, every `period` seconds, at interpreter exit, or on demand by
+    calling the `report` method of the decorated function.
     """
 
     # singleton profiler.  All functions will be added to this one.
     profiler = LineProfiler()
 
-    def __init__(self, follow=(), report=None, **kws):
+    def __init__(self, follow=(), report=None, mode='line', interval=0.005,
+                 every=1, period=None, at_exit=False, **kws):
         # decorator for profiling
 
         logging.debug('__init__ %s: %s; %s', self, follow, kws)
 
-        if report is None:
+        if mode in ('sample', 'sampling'):
+            # low overhead statistical profiler
+            self.profiler = SamplingProfiler(interval=interval)
+        elif mode == 'memory':
+            # line memory allocations
+            self.profiler = MemoryProfiler()
+        elif mode != 'line':
+            raise ValueError(f'Invalid profiling mode {mode!r} requested.')
+
+        if mode == 'memory':
+            # memory stats have their own table layout
+            printer = ReportMemoryTable(**kws)
+
+        elif report is None:
             # default report
             printer = ReportStats()
 
@@ -192,22 +355,48 @@ class profile:
         self.printer = printer
         self.follow = follow
 
+        # deferred reporting
+        self.every = int(every or 0)
+        self.period = period
+        self.n_calls = 0
+        self._last_report = time.monotonic()
+        if at_exit:
+            atexit.register(self.report)
+
     def __call__(self, func):
         logging.debug('calling %s with %s', self, func.__name__)
 
+        self.profiler.add_function(func)
+        for f in self.follow:
+            self.profiler.add_function(f)
+
         # ----------------------------------------------------------------------------------------------------
         @ftl.wraps(func)
         def profiled_func(*args, **kwargs):
             # print(func, args, kwargs)
             try:
-                self.profiler.add_function(func)
-                for f in self.follow:
-                    self.profiler.add_function(f)
                 self.profiler.enable_by_count()
                 return func(*args, **kwargs)
             finally:
-                # report line timings for each profiled function
-                self.printer(self.profiler.get_stats())
+                self.profiler.disable_by_count()
+                self.n_calls += 1
+                if self._due():
+                    # report line timings for each profiled function
+                    self.report()
 
         # ----------------------------------------------------------------------------------------------------
+        profiled_func.report = self.report
         return profiled_func
+
+    def _due(self):
+        if self.every and self.n_calls % self.every == 0:
+            return True
+
+        return (self.period is not None and
+                time.monotonic() - self._last_report >= self.period)
+
+    def report(self):
+        """Print the report for the stats accumulated so far."""
+        self._last_report = time.monotonic()
+        if self.n_calls:
+            self.printer(self.profiler.get_stats())
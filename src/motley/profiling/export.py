@@ -0,0 +1,247 @@
+"""
+Export line profiling statistics to machine-readable JSON, collapsed stacks for
+flamegraph tools, and speedscope profiles. Saved JSON profiles can be loaded
+again and re-rendered with the report printers without re-running the code.
+"""
+
+# std
+import json
+from pathlib import Path
+
+# third-party
+import line_profiler as lp
+
+# relative
+from .printers import func2str, get_source_block
+
+
+# ---------------------------------------------------------------------------- #
+FORMAT_VERSION = 1
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+SPEEDSCOPE_UNITS = {1: 'seconds',
+                    1e-3: 'milliseconds',
+                    1e-6: 'microseconds',
+                    1e-9: 'nanoseconds'}
+
+# file name suffix to format mapping
+SUFFIXES = {'.json': 'json',
+            '.speedscope': 'speedscope',
+            '.folded': 'collapsed',
+            '.collapsed': 'collapsed'}
+
+
+# ---------------------------------------------------------------------------- #
+class FunctionRecord:
+    """
+    Stand-in for a profiled function in stats loaded from file. Holds the
+    source code needed by the report printers.
+    """
+
+    def __init__(self, name, filename, start_line_nr, source=()):
+        self.__name__ = name.rsplit('.', 1)[-1]
+        self.__qualname__ = name
+        self.filename = str(filename)
+        self.start_line_nr = int(start_line_nr)
+        self.source_block = (self.filename, self.start_line_nr, tuple(source))
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.__qualname__}>'
+
+
+def _name(func):
+    try:
+        return func2str(func)
+    except Exception:
+        return getattr(func, '__qualname__', str(func))
+
+
+def _source(func):
+    try:
+        return list(get_source_block(func)[2])
+    except (OSError, TypeError):
+        # source unavailable, eg. for functions defined in the interpreter
+        return []
+
+
+def _builtin(value):
+    # numeric stats, or the per-worker times added by `parallel.merge`
+    if isinstance(value, dict):
+        return {str(key): float(val) for key, val in value.items()}
+    return float(value)
+
+
+def _iter_lines(line_stats):
+    # yield function key, name, line number, hits and time for executed lines
+    for (filename, start, func), (stats, _) in line_stats.timings.items():
+        name = _name(func)
+        for lnr, (hits, times, *_) in sorted(stats.items()):
+            yield filename, start, name, int(lnr), int(hits), float(times)
+
+
+# ---------------------------------------------------------------------------- #
+def to_dict(line_stats, source=True):
+    """
+    Convert stats returned by `LineProfiler.get_stats` (or
+    `SamplingProfiler.get_stats`) to a dict of builtin types.
+
+    Parameters
+    ----------
+    line_stats : line_profiler.LineStats
+        Profile statistics.
+    source : bool, optional
+        Whether to include the source code of each function, needed to render
+        the report later, by default True.
+
+    Returns
+    -------
+    dict
+    """
+    functions = []
+    for (filename, start, func), (stats, total) in line_stats.timings.items():
+        functions.append({
+            'name': _name(func),
+            'filename': str(filename),
+            'line': int(start),
+            'total': float(total),
+            # hits, time, per hit, fraction of function total, fraction of
+            # grand total, [time per worker]
+            'lines': {str(lnr): [int(hits), float(times), *map(_builtin, extra)]
+                      for lnr, (hits, times, *extra) in sorted(stats.items())},
+            **({'source': _source(func)} if source else {})
+        })
+
+    return {'version': FORMAT_VERSION,
+            'unit': line_stats.unit,
+            'grand_total': float(getattr(line_stats, 'grand_total', 0)),
+            'functions': functions}
+
+
+def from_dict(data):
+    """
+    Create `line_profiler.LineStats` from a dict created by `to_dict`. Function
+    objects in the timing keys are replaced by `FunctionRecord`s, so the stats
+    can be rendered by the report printers.
+    """
+    timings = {}
+    for info in data['functions']:
+        func = FunctionRecord(info['name'], info['filename'], info['line'],
+                              info.get('source', ()))
+        stats = {int(lnr): tuple(values) for lnr, values in info['lines'].items()}
+        timings[(func.filename, func.start_line_nr, func)] = (stats, info['total'])
+
+    line_stats = lp.LineStats(timings, data['unit'])
+    line_stats.grand_total = data.get('grand_total', 0)
+    return line_stats
+
+
+# ---------------------------------------------------------------------------- #
+def to_json(line_stats, source=True, **kws):
+    """Serialize profile statistics to a JSON string."""
+    return json.dumps(to_dict(line_stats, source), **kws)
+
+
+def to_collapsed(line_stats):
+    """
+    Profile statistics in the collapsed (folded) stack format used by
+    flamegraph tools: one `function;line weight` entry per line. Weights are
+    times in units of `line_stats.unit`.
+    """
+    return '\n'.join(
+        f'{name} ({Path(filename).name}:{start});{name}:{lnr} {round(times)}'
+        for filename, start, name, lnr, _, times in _iter_lines(line_stats)
+    )
+
+
+def to_speedscope(line_stats, name='motley profile'):
+    """
+    Profile statistics as a speedscope sampled profile (as a dict). Each line is
+    a frame nested in the frame of its function, weighted by the time spent on
+    that line.
+    """
+    frames, index = [], {}
+
+    def frame(key, **info):
+        if key not in index:
+            index[key] = len(frames)
+            frames.append(info)
+        return index[key]
+
+    samples, weights = [], []
+    for filename, start, func, lnr, _, times in _iter_lines(line_stats):
+        # function and line frames are keyed separately, since a line number
+        # may coincide with the first line of another (eg. nested) function
+        outer = frame(('func', filename, start), name=func, file=filename,
+                      line=start)
+        inner = frame(('line', filename, lnr), name=f'{func}:{lnr}',
+                      file=filename, line=lnr)
+        samples.append([outer, inner])
+        weights.append(times)
+
+    return {'$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'motley',
+            'shared': {'frames': frames},
+            'profiles': [{'type': 'sampled',
+                          'name': name,
+                          'unit': SPEEDSCOPE_UNITS.get(line_stats.unit, 'none'),
+                          'startValue': 0,
+                          'endValue': sum(weights),
+                          'samples': samples,
+                          'weights': weights}]}
+
+
+# ---------------------------------------------------------------------------- #
+def resolve_format(path, fmt=None):
+    if fmt:
+        return fmt
+
+    suffixes = Path(path).suffixes
+    if '.speedscope' in suffixes:
+        # eg. 'profile.speedscope.json'
+        return 'speedscope'
+
+    for suffix in reversed(suffixes):
+        if suffix in SUFFIXES:
+            return SUFFIXES[suffix]
+
+    raise ValueError(f'Could not infer profile format from file name: {path}. '
+                     f'Please provide one of {set(SUFFIXES.values())}.')
+
+
+def save(line_stats, path, fmt=None, **kws):
+    """
+    Save profile statistics to file.
+
+    Parameters
+    ----------
+    line_stats : line_profiler.LineStats
+        Profile statistics from `get_stats`.
+    path : str or Path
+        File name.
+    fmt : {'json', 'collapsed', 'speedscope'}, optional
+        Output format. By default inferred from the file name, eg.
+        'profile.json', 'profile.folded', 'profile.speedscope.json'.
+    """
+    fmt = resolve_format(path, fmt)
+    if fmt == 'json':
+        # indented for readable diffs
+        text = to_json(line_stats, **{'indent': 1, **kws})
+    elif fmt == 'collapsed':
+        text = to_collapsed(line_stats)
+    elif fmt == 'speedscope':
+        text = json.dumps(to_speedscope(line_stats, **kws))
+    else:
+        raise ValueError(f'Unknown profile format: {fmt!r}.')
+
+    path = Path(path)
+    path.write_text(text)
+    return path
+
+
+def load(path):
+    """
+    Load profile statistics saved in JSON format. The result can be rendered
+    with the report printers, eg: `ReportStatsTable()(load('profile.json'))`.
+    """
+    return from_dict(json.loads(Path(path).read_text()))
@@ -0,0 +1,210 @@
+"""
+Profile the import time of a module, including all nested imports, using the
+interpreter's `-X importtime` option. The target is imported in a subprocess,
+so the timings are those of a cold start, and the results are displayed as a
+ranked, indented tree table with cumulative-time bars.
+
+Examples
+--------
+$ python -m motley.profiling.importtime motley.table --depth 3 --min 1
+"""
+
+# std
+import re
+import sys
+import operator as op
+import subprocess as sub
+from pathlib import Path
+
+# relative
+from .. import codes
+from ..table import Table
+
+
+# ---------------------------------------------------------------------------- #
+REGEX_IMPORT_TIME = re.compile(
+    r'import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<name>.+)')
+
+
+class ImportNode:
+    """
+    A module in the import tree, with import times in microseconds. The
+    cumulative time includes the time taken to import the children.
+    """
+
+    __slots__ = ('name', 'self', 'cumulative', 'depth', 'children')
+
+    def __init__(self, name, self_time, cumulative, depth=0, children=()):
+        self.name = str(name)
+        self.self = int(self_time)
+        self.cumulative = int(cumulative)
+        self.depth = int(depth)
+        self.children = list(children)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}({self.name!r}, self={self.self}, '
+                f'cumulative={self.cumulative}, '
+                f'children={len(self.children)})')
+
+    def walk(self, max_depth=None, min_time=0):
+        """
+        Depth-first iteration through the tree, visiting children in order of
+        descending cumulative time. Nodes below `max_depth`, or taking less than
+        `min_time` microseconds (cumulative) are skipped along with their
+        children.
+        """
+        yield self
+        if max_depth is not None and self.depth >= max_depth:
+            return
+
+        for child in sorted(self.children, key=_cumulative, reverse=True):
+            if child.cumulative >= min_time:
+                yield from child.walk(max_depth, min_time)
+
+
+def _cumulative(node):
+    return node.cumulative
+
+
+# ---------------------------------------------------------------------------- #
+def run(target, python=sys.executable, timeout=None):
+    """
+    Run `target` in a subprocess with `-X importtime`, returning the report
+    written to stderr. The target can either be a module name, which is
+    imported, or the path to a python script, which is run.
+    """
+    if target.endswith('.py') or Path(target).is_file():
+        args = [python, '-X', 'importtime', str(target)]
+    else:
+        args = [python, '-X', 'importtime', '-c', f'import {target}']
+
+    result = sub.run(args, capture_output=True, text=True, timeout=timeout)
+    if result.returncode:
+        raise RuntimeError(f'Running {target!r} failed with exit code '
+                           f'{result.returncode}:\n{result.stderr[-2000:]}')
+    return result.stderr
+
+
+def parse(text):
+    """
+    Parse the output of `python -X importtime` into a tree. Since the
+    interpreter reports each module after its nested imports, children are
+    collected until their parent at the next level up appears.
+
+    Returns
+    -------
+    ImportNode
+        The root of the tree, with the top level imports as children, and times
+        summed over those.
+    """
+    pending = {}    # depth -> nodes awaiting their parent
+    for line in text.splitlines():
+        if not (match := REGEX_IMPORT_TIME.match(line)):
+            continue
+
+        name = match['name']
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        node = ImportNode(name.strip(), match['self'], match['cumulative'],
+                          depth + 1, pending.pop(depth + 1, ()))
+        pending.setdefault(depth, []).append(node)
+
+    top = [node for level in sorted(pending) for node in pending[level]]
+    return ImportNode('<root>', 0, sum(map(_cumulative, top)), 0, top)
+
+
+# ---------------------------------------------------------------------------- #
+def get_table(tree, max_depth=None, min_time=0, bar_width=40, bar_color='g',
+              flat=False, title=None, **kws):
+    """
+    Ranked table of import times.
+
+    Parameters
+    ----------
+    tree : ImportNode
+        Tree from `parse`.
+    max_depth : int, optional
+        Nested imports below this depth are collapsed into their parent. Their
+        times remain included in the parent's cumulative time.
+    min_time : float, optional
+        Hide modules with cumulative import time below this value, in
+        milliseconds.
+    bar_width : int, optional
+        Width of the bar for the slowest import, by default 40.
+    bar_color : str, optional
+        Colour of the cumulative-time bars.
+    flat : bool, optional
+        Rank all modules by their own (self) import time instead of showing the
+        tree, by default False. In this case `min_time` applies to the self
+        time, and `max_depth` is ignored.
+    title : str, optional
+        Table title.
+
+    Returns
+    -------
+    motley.table.Table
+    """
+    min_time = min_time * 1e3
+    if flat:
+        # bars show self time
+        key = op.attrgetter('self')
+        nodes = sorted((node for node in tree.walk()
+                        if node is not tree and node.self >= min_time),
+                       key=key, reverse=True)
+        names = [node.name for node in nodes]
+    else:
+        key = _cumulative
+        nodes = [node for node in tree.walk(max_depth, min_time)
+                 if node is not tree]
+        names = ['  ' * (node.depth - 1) + node.name for node in nodes]
+
+    total = tree.cumulative or 1
+    scale = max(map(key, nodes), default=0) or 1
+    rows = [(name, node.self / 1e3, node.cumulative / 1e3,
+             node.cumulative / total,
+             codes.apply(' ' * round(bar_width * key(node) / scale),
+                         bg=bar_color))
+            for name, node in zip(names, nodes)]
+
+    return Table(rows or [('', '', '', '', '')],
+                 title=title or f'Import time: {total / 1e3:.1f} ms',
+                 col_headers=('Module', 'Self (ms)', 'Cumulative (ms)', '%',
+                              ''),
+                 align='<>>><',
+                 formatters={'Self (ms)': '{:.1f}'.format,
+                             'Cumulative (ms)': '{:.1f}'.format,
+                             '%': '{:.1%}'.format},
+                 **kws)
+
+
+def profile(target, max_depth=None, min_time=0, python=sys.executable, **kws):
+    """
+    Profile import time of `target` module (or script) and return the table.
+    """
+    return get_table(parse(run(target, python)), max_depth, min_time,
+                     title=f'Import time: {target}', **kws)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='motley.profiling.importtime',
+        description='Profile the import time of a module and its nested '
+                    'imports.')
+    parser.add_argument('target', help='Module name or path to script.')
+    parser.add_argument('-d', '--depth', type=int, default=None,
+                        help='Collapse nested imports below this depth.')
+    parser.add_argument('-m', '--min', type=float, default=0,
+                        help='Hide imports faster than this (ms).')
+    parser.add_argument('-f', '--flat', action='store_true',
+                        help='Rank all modules by self time.')
+    parser.add_argument('-p', '--python', default=sys.executable,
+                        help='Python interpreter to use.')
+    args = parser.parse_args(argv)
+
+    print(profile(args.target, args.depth, args.min, args.python,
+                  flat=args.flat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Line-level memory allocation profiling with `tracemalloc`.
+"""
+
+# std
+import dis
+import sys
+import inspect
+import tracemalloc
+from collections import defaultdict
+
+# third-party
+import line_profiler as lp
+
+
+# ---------------------------------------------------------------------------- #
+# python < 3.9 can't reset the peak of traced memory
+_reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+
+# ---------------------------------------------------------------------------- #
+class MemoryProfiler:
+    """
+    Measure memory allocated on each line of the registered functions using
+    `tracemalloc` and a line trace function.
+
+    For each line the following are accumulated over all executions:
+        * hits: number of times the line was executed.
+        * allocated: peak memory allocated while executing the line, above that
+          at the start of the line, in bytes. Memory allocated and released
+          within the line (temporaries) is included here.
+        * net: change in allocated memory after executing the line, in bytes.
+          This is the memory retained by the line, or released if negative.
+        * blocks: number of memory blocks allocated on the line that were still
+          alive when profiling was disabled.
+
+    `get_stats` returns the stats in the same layout as `LineProfiler.get_stats`,
+    to be rendered by `ReportMemoryTable`.
+
+    Memory tracing is started when the profiler is first enabled, and stays
+    active until the stats are collected by `get_stats`, so that the snapshots
+    used to count retained blocks are taken once per report rather than on
+    every call of the profiled functions.
+
+    On python < 3.9, where the peak of traced memory cannot be reset, the peak
+    is only attributed to a line when it sets a new high-water mark. Otherwise
+    the memory allocated on the line is estimated from its net change.
+    """
+
+    unit = 1
+    """Unit of memory (bytes)."""
+
+    def __init__(self, *functions):
+        self.fmap = {}      # (filename, name) - function mapping
+        self.codes = {}     # code - (filename, first line, name) mapping
+        self.lines = defaultdict(lambda: defaultdict(lambda: [0, 0, 0, 0]))
+        self.enable_count = 0
+        self._stack = []
+        self._snapshot = None
+        self._started = False
+        self._watermark = 0
+        self._previous_trace = None
+
+        for func in functions:
+            self.add_function(func)
+
+    def add_function(self, func):
+        code = getattr(func, '__func__', func).__code__
+        filename = inspect.getfile(func)
+        self.fmap[(filename, func.__name__)] = func
+        self.codes[code] = (filename, code.co_firstlineno, func.__name__)
+
+    def enable_by_count(self):
+        if self.enable_count == 0:
+            self.enable()
+        self.enable_count += 1
+
+    def disable_by_count(self):
+        if self.enable_count > 0:
+            self.enable_count -= 1
+            if self.enable_count == 0:
+                self.disable()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+        if self._snapshot is None:
+            # baseline for counting retained blocks, until the next report
+            self._snapshot = tracemalloc.take_snapshot()
+
+        self._previous_trace = sys.gettrace()
+        sys.settrace(self._trace_call)
+
+    def disable(self):
+        sys.settrace(self._previous_trace)
+        self._stack.clear()
+
+    def _stop(self):
+        # count retained blocks and stop tracing if we started it
+        if self._snapshot is not None:
+            self._count_blocks(tracemalloc.take_snapshot())
+            self._snapshot = None
+
+        if self._started and self.enable_count == 0:
+            tracemalloc.stop()
+            self._started = False
+
+    def reset(self):
+        self.lines.clear()
+        self._snapshot = None
+
+    # ------------------------------------------------------------------------ #
+    def _trace_call(self, frame, event, arg):
+        # global trace function: only trace lines in registered functions
+        if event == 'call' and frame.f_code in self.codes:
+            # code, line number, memory at line start, peak during line
+            self._stack.append([frame.f_code, None, 0, 0])
+            return self._trace_line
+        return None
+
+    def _trace_line(self, frame, event, arg):
+        if event not in ('line', 'return'):
+            return self._trace_line
+
+        current, peak = tracemalloc.get_traced_memory()
+        if _reset_peak is None:
+            # the peak is global: it only tells us if a new high-water mark was
+            # set since the last event
+            peak, self._watermark = ((peak if peak > self._watermark else current),
+                                     max(peak, self._watermark))
+
+        # propagate the peak to the lines currently executing in outer frames
+        # before it is reset
+        for state in self._stack:
+            state[3] = max(state[3], peak)
+
+        state = self._stack[-1]
+        code, lineno, start, high = state
+        if lineno is not None:
+            line = self.lines[code][lineno]
+            line[0] += 1
+            line[1] += high - start
+            line[2] += current - start
+
+        if event == 'return':
+            self._stack.pop()
+            return self._trace_line
+
+        # exclude the memory used for the book-keeping above
+        if _reset_peak:
+            _reset_peak()
+        start, self._watermark = tracemalloc.get_traced_memory()
+        state[1:] = frame.f_lineno, start, start
+        return self._trace_line
+
+    def _count_blocks(self, snapshot):
+        # retained blocks per line from snapshot difference
+        if self._snapshot is None:
+            return
+
+        ranges = {}
+        for code in self.codes:
+            last = max((line for _, line in dis.findlinestarts(code) if line),
+                       default=code.co_firstlineno)
+            ranges.setdefault(code.co_filename, []).append(
+                (code, code.co_firstlineno, last))
+
+        filters = [tracemalloc.Filter(True, filename) for filename in ranges]
+        snapshot = snapshot.filter_traces(filters)
+        for stat in snapshot.compare_to(self._snapshot.filter_traces(filters),
+                                        'lineno'):
+            frame = stat.traceback[0]
+            for code, first, last in ranges.get(frame.filename, ()):
+                if first <= frame.lineno <= last:
+                    self.lines[code][frame.lineno][3] += stat.count_diff
+                    break
+
+    # ------------------------------------------------------------------------ #
+    def get_stats(self):
+        """
+        Collect the line memory stats into `line_profiler.LineStats`. The
+        timings dict maps `(filename, first line, function)` to
+        `(stats, total allocated)`, with stats a dict that maps line numbers to
+        `(hits, allocated, net, blocks, fraction of grand total allocated)`.
+        """
+        self._stop()
+
+        grand_total = sum(max(line[1], 0)
+                          for lines in self.lines.values()
+                          for line in lines.values())
+
+        timings = {}
+        for code, (filename, start, name) in self.codes.items():
+            stats = {lnr: (hits, allocated, net, blocks,
+                           allocated / grand_total if grand_total else 0)
+                     for lnr, (hits, allocated, net, blocks)
+                     in sorted(self.lines.get(code, {}).items())}
+            total = sum(allocated for _, allocated, *_ in stats.values())
+            key = (filename, start, self.fmap[(filename, name)])
+            timings[key] = (stats, total)
+
+        lstats = lp.LineStats(timings, self.unit)
+        lstats.grand_total = grand_total
+        return lstats
@@ -0,0 +1,212 @@
+"""
+Profile functions running in worker processes of `multiprocessing` or
+`concurrent.futures` pools, and merge the per-process line timings into a
+single report.
+
+Examples
+--------
+>>> from concurrent.futures import ProcessPoolExecutor
+... from motley.profiling.parallel import profile_workers
+...
+... with profile_workers(work) as profiler:
+...     with ProcessPoolExecutor(4, **profiler.pool_kws) as pool:
+...         results = list(pool.map(work, range(100)))
+...
+... profiler.report()
+
+Worker stats are written when the worker processes exit, so the pool should be
+shut down (`ProcessPoolExecutor.shutdown`, or `Pool.close` followed by
+`Pool.join`) rather than terminated before the report is made.
+"""
+
+# std
+import os
+import json
+import warnings
+import tempfile
+from pathlib import Path
+from multiprocessing import util
+
+# relative
+from .core import LineProfiler, SamplingProfiler
+from .export import from_dict, to_dict
+from .printers import ReportStatsTable
+
+
+# ---------------------------------------------------------------------------- #
+# profiler for the current (worker) process
+_profiler = None
+
+
+def initializer(functions, directory, mode='line', interval=0.005,
+                init=None, initargs=()):
+    """
+    Pool initializer that enables profiling of `functions` in the worker
+    process. Stats are saved to `directory` when the worker exits. An additional
+    initializer `init` may be given, which will be called with `initargs`.
+    """
+    global _profiler
+
+    if mode in ('sample', 'sampling'):
+        _profiler = SamplingProfiler(interval=interval)
+    else:
+        _profiler = LineProfiler()
+
+    for func in functions:
+        _profiler.add_function(func)
+    _profiler.enable_by_count()
+
+    # pool workers exit through `os._exit`, so `atexit` hooks don't run here,
+    # but multiprocessing finalizers do
+    util.Finalize(None, dump, (directory, ), exitpriority=100)
+
+    if init:
+        init(*initargs)
+
+
+def dump(directory):
+    """Save the stats of the current process to `directory`."""
+    if _profiler is None:
+        return
+
+    _profiler.disable_by_count()
+    path = Path(directory) / f'worker-{os.getpid()}.json'
+    path.write_text(json.dumps(to_dict(_profiler.get_stats())))
+    return path
+
+
+def collect(directory):
+    """
+    Load and merge the stats saved by worker processes in `directory`.
+    """
+    files = sorted(Path(directory).glob('worker-*.json'))
+    return merge(*(json.loads(file.read_text()) for file in files),
+                 labels=[file.stem.split('-', 1)[1] for file in files])
+
+
+def merge(*line_stats, labels=()):
+    """
+    Merge line timings from several processes, summing hits and times per
+    (file, function, line). The time contributed by each process is kept as an
+    extra entry in the line stats, which is rendered as an additional column by
+    `ReportStatsTable`.
+
+    Parameters
+    ----------
+    line_stats : line_profiler.LineStats or dict
+        Stats from `get_stats`, or dicts in the format of
+        `motley.profiling.export.to_dict`.
+    labels : sequence, optional
+        Label for each process, by default their index.
+
+    Returns
+    -------
+    line_profiler.LineStats
+    """
+    runs = [data if isinstance(data, dict) else to_dict(data)
+            for data in line_stats]
+    labels = list(map(str, labels or range(len(runs))))
+    if not runs:
+        return from_dict({'unit': 1e-6, 'functions': []})
+
+    unit = min(run['unit'] for run in runs)
+    functions = {}
+    for label, run in zip(labels, runs):
+        scale = run['unit'] / unit
+        for info in run['functions']:
+            key = (info['filename'], info['name'])
+            merged = functions.setdefault(key, {**info, 'lines': {}})
+            for lnr, (hits, time, *extra) in info['lines'].items():
+                line = merged['lines'].setdefault(lnr, [0, 0, {}])
+                line[0] += hits
+                line[1] += time * scale
+                # keep the breakdown of runs that were merged before
+                workers = _get_workers(extra) or {label: time}
+                for worker, wtime in workers.items():
+                    line[2][worker] = line[2].get(worker, 0) + wtime * scale
+
+    # recompute the derived stats from the rescaled line times: function total
+    # (in seconds), time per hit, fraction of function total, fraction of grand
+    # total
+    grand_total = sum(time for info in functions.values()
+                      for _, time, _ in info['lines'].values())
+    for info in functions.values():
+        total = sum(time for _, time, _ in info['lines'].values())
+        info['total'] = total * unit
+        info['lines'] = {
+            lnr: [hits, time,
+                  _ratio(time, hits), _ratio(time, total),
+                  _ratio(time, grand_total), workers]
+            for lnr, (hits, time, workers) in info['lines'].items()
+        }
+
+    return from_dict({'unit': unit,
+                      'grand_total': grand_total,
+                      'functions': list(functions.values())})
+
+
+def _get_workers(extra):
+    # per-worker times of a previously merged run, if any
+    return extra[3] if len(extra) > 3 and isinstance(extra[3], dict) else None
+
+
+def _ratio(a, b):
+    return a / b if b else 0
+
+
+# ---------------------------------------------------------------------------- #
+class profile_workers:
+    """
+    Context manager that sets up profiling of `functions` in pool worker
+    processes. Pass `pool_kws` to the pool constructor. After the pool has been
+    shut down, the merged stats are available from `get_stats` and can be
+    printed with `report`.
+
+    Workers write their stats when they exit, so the pool must be shut down
+    inside the context (eg. by nesting the pool's own context manager). Stats
+    of workers that are still running when the context exits are lost, and a
+    warning is emitted if no worker stats were found at all.
+    """
+
+    def __init__(self, *functions, mode='line', interval=0.005, directory=None,
+                 init=None, initargs=()):
+        self.functions = functions
+        self.mode = mode
+        self.interval = interval
+        self.init = init
+        self.initargs = initargs
+        self._tmp = None
+        self.directory = directory
+        self.stats = None
+
+    def __enter__(self):
+        if self.directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix='motley-profile-')
+            self.directory = self._tmp.name
+        return self
+
+    def __exit__(self, *exc):
+        # collect before the temporary directory is removed
+        if exc[0] is None and not any(Path(self.directory).glob('worker-*.json')):
+            warnings.warn('No stats were saved by pool workers. Make sure the '
+                          'pool is shut down inside the `profile_workers` '
+                          'context.')
+
+        self.stats = self.get_stats()
+        if self._tmp:
+            self._tmp.cleanup()
+            self.directory = self._tmp = None
+
+    @property
+    def pool_kws(self):
+        return dict(initializer=initializer,
+                    initargs=(self.functions, self.directory, self.mode,
+                              self.interval, self.init, self.initargs))
+
+    def get_stats(self):
+        if self.directory is None:
+            return self.stats
+        return collect(self.directory)
+
+    def report(self, printer=None, **kws):
+        (printer or ReportStatsTable(**kws))(self.get_stats())
@@ -4,13 +4,17 @@ Printers for displaying profiled source code
 
 # builtin libs
 # std
+import os
 import re
 import ast
 import sys
 import inspect
+import difflib
+import linecache
 import textwrap
 import functools as ftl
 from io import StringIO
+from pathlib import Path
 
 # third-party
 import numpy as np
@@ -38,6 +42,10 @@ cdot = u'\u00B7'  # '·'
 
 def func2str(func):
 
+    if hasattr(func, 'source_block'):
+        # function record loaded from a saved profile
+        return func.__qualname__
+
     if (cls := get_defining_class(func)) is not None:
         return '.'.join((cls.__name__, func.__name__))
 
@@ -66,6 +74,52 @@ def truncate_block(block, width, dots='...'):
     return list(truncate_block_gen(block, width, dots))
 
 
+def get_source_block(func):
+    """
+    Get filename, starting line number and dedented source code lines for
+    function `func`. Results are cached per source location and modification
+    time of the file, so that repeated reports don't re-read the source,
+    without keeping the function alive, while edits to the file are picked up.
+    """
+    if (block := getattr(func, 'source_block', None)) is not None:
+        # function record loaded from a saved profile
+        return block
+
+    # unwrap decorated functions and methods
+    func = inspect.unwrap(func)
+    code = getattr(func, '__func__', func).__code__
+    filename = code.co_filename
+    return _get_source_block(filename, code.co_firstlineno,
+                             _get_mtime(filename))
+
+
+def _get_mtime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        # not a file on disk, eg. '<stdin>'
+        return None
+
+
+@ftl.lru_cache(maxsize=256)
+def _get_source_block(filename, start_line_nr, mtime):
+    # `mtime` is only part of the cache key. Discard lines cached by linecache
+    # if the file changed
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename)
+    if not lines:
+        raise OSError(f'Could not get source code from {filename!r}.')
+
+    source_code_lines = inspect.getblock(lines[start_line_nr - 1:])
+
+    # strip newlines from source and unindent
+    source = ''.join(source_code_lines)
+    source_code_lines = textwrap.dedent(source).splitlines()
+    # source_code_lines = [line.strip('\n') for line in source_code_lines]
+
+    return filename, start_line_nr, tuple(source_code_lines)
+
+
 def make_bar(line, fraction, line_width, colour):
     if l := int(np.round(fraction * line_width)):
         bar = codes.apply(line[:l], bg=colour)
@@ -73,6 +127,7 @@ def make_bar(line, fraction, line_width, colour):
     return line
 
 
+@ftl.lru_cache(maxsize=256)
 def _ast_func_index(source):
     """
     Parse the function definition. Return line indices for the definition head
@@ -205,15 +260,9 @@ class ReportStats:
 
     def get_block(self, func):
         # get function source
-        filename = inspect.getfile(func)
-        source_code_lines, start_line_nr = inspect.getsourcelines(func)
-
-        # strip newlines from source and unindent
-        source = ''.join(source_code_lines)
-        source_code_lines = textwrap.dedent(source).splitlines()
-        # source_code_lines = [line.strip('\n') for line in source_code_lines]
-
-        return filename, start_line_nr, source_code_lines
+        filename, start_line_nr, source_code_lines = get_source_block(func)
+        # copy, since preprocessing may replace lines
+        return filename, start_line_nr, list(source_code_lines)
 
     def preprocess(self, *args, **kws):
         """
@@ -256,7 +305,7 @@ class ReportStats:
         stream = stream or sys.stdout
         empty = ('',) * 5
         for lineNo, line in self.enumerate():
-            nhits, time, per_hit, fof, fot = stats.get(lineNo, empty)
+            nhits, time, per_hit, fof, fot, *_ = stats.get(lineNo, empty)
             txt = self.template.format(
                 lineNo, nhits, time, per_hit, fof, fot, line)
             stream.write(txt)
@@ -391,7 +440,7 @@ class ReportStatsTable(ReportStats):
         if self.smallest:
             # strip any line times smaller than smallest
             line_nrs_stats, data = zip(*stats.items())
-            *stuff, fractions = zip(*data)
+            fractions = [values[4] for values in data]
             small = np.less(fractions, self.smallest)
             line_nrs_small = np.array(line_nrs_stats)[small]
             ignore.extend(line_nrs_small)
@@ -432,6 +481,13 @@ class ReportStatsTable(ReportStats):
                                                   self.max_line_width,
                                                   self.dots)
 
+    @staticmethod
+    def _format_workers(workers, time, shares=None):
+        # fraction of line time per worker
+        if not (time and shares):
+            return ''
+        return ' '.join(f'{shares.get(label, 0) / time:.0%}' for label in workers)
+
     def preamble(self, filename, func_name, start_line_nr, total_time,
                  stream=None):
         # intercept the preamble text so we can use it as a table header
@@ -451,10 +507,15 @@ class ReportStatsTable(ReportStats):
         """
         stream = stream or sys.stdout
 
-        empty = ('',) * 5
+        # time contributed by each worker process for merged multi-process
+        # stats (see `motley.profiling.parallel.merge`)
+        workers = sorted({label for values in stats.values()
+                          for label in (values[5] if len(values) > 5 else ())})
+
+        empty = ('',) * (5 + bool(workers))
         n = len(self.sourceCodeLines) - len(self.ignoreLines) + \
             len(self.where_gaps)
-        table = np.empty((n, 7), 'O')
+        table = np.empty((n, 7 + bool(workers)), 'O')
 
         lineLength = min(max(map(len, self.sourceCodeLines)), 80)
         # at this point all lines are the same length (NOT ALWAYS~!!)
@@ -463,14 +524,17 @@ class ReportStatsTable(ReportStats):
         i = 0
 
         for lineNo, line in self.enumerate():
-            nhits, time, per_hit, fof, fot = stats.get(lineNo, empty)
+            nhits, time, per_hit, fof, fot, *extra = stats.get(lineNo, empty)
             # Convert fraction to percentage
             # pof, pot = fof * 100, fot * 100
             # make time indicator bar
             if time:  # might be empty str
                 line = make_bar(line, fof, lineLength, self.bar_color)
             # populate table
-            table[i] = lineNo, nhits, time, per_hit, fof, fot, line
+            row = lineNo, nhits, time, per_hit, fof, fot
+            if workers:
+                row += (self._format_workers(workers, time, *extra[:1]), )
+            table[i] = *row, line
             i += 1
 
             # print separator lines to segment code blocks
@@ -488,6 +552,9 @@ class ReportStatsTable(ReportStats):
 
         # right align numbered columns
         align = list('>>>>>><')
+        if workers:
+            colhead.insert(6, '% Per Worker')
+            align.insert(6, '>')
 
         # assign column formatters
         #    = '#', 'Hits', 'Time', 'Per Hit', '% Func', '% Total', 'Source'
@@ -560,3 +627,248 @@ class ReportDynamicFunction(ReportStatsTable):
     def get_block(self, func):
         source_code_lines = self._source_lib[func].splitlines()
         return '__main__', 1, source_code_lines
+
+
+class ReportDiff(ReportStatsTable):
+    """
+    Compare the line timings of two profiling runs of the same code, eg. before
+    and after an optimisation. Functions are matched by name and file name, and
+    lines are aligned by their source text, so that edits to the code between
+    the runs are handled. Per-line time differences and speed-up ratios are
+    shown, with bars behind the source code indicating the size of the change:
+    green for faster, red for slower. A ranking of functions by change in total
+    time (biggest regressions first) follows the per-function tables.
+
+    Stats can be live (from `get_stats`) or loaded from file with
+    `motley.profiling.export.load`.
+    """
+
+    column_headers = ('#', 'Before (μs)', 'After (μs)', 'Δ (μs)', 'Speed-up',
+                      'Line Contents')
+    faster_color = 'g'
+    slower_color = 'r'
+
+    def __call__(self, before, after, rank=True, stream=None):
+        stream = stream or sys.stdout
+
+        previous = self._index(before)
+        for key, (func1, *run1) in self._index(after).items():
+            if key in previous:
+                func0, *run0 = previous[key]
+                self.show_diff(func0, run0, before.unit,
+                               func1, run1, after.unit, stream)
+                stream.write('\n')
+
+        if rank:
+            stream.write(self.rank(before, after))
+            stream.write('\n')
+
+    @staticmethod
+    def _index(line_stats):
+        # key on file and function name, since line numbers may change
+        return {(Path(filename).name, func2str(func)): (func, stats, total)
+                for (filename, _, func), (stats, total)
+                in line_stats.timings.items()}
+
+    @staticmethod
+    def _align(lines0, start0, lines1, start1):
+        # map line numbers in the new source to those in the old source,
+        # matching identical lines, and similar lines in edited blocks
+        matcher = difflib.SequenceMatcher(None, lines0, lines1, autojunk=False)
+        lookup = {}
+        for tag, a0, a1, b0, b1 in matcher.get_opcodes():
+            if tag == 'equal':
+                lookup.update(zip(range(start1 + b0, start1 + b1),
+                                  range(start0 + a0, start0 + a1)))
+            elif tag == 'replace':
+                for b in range(b0, b1):
+                    ratios = [difflib.SequenceMatcher(None, lines0[a],
+                                                      lines1[b]).ratio()
+                              for a in range(a0, a1)]
+                    if ratios and max(ratios) >= 0.6:
+                        a = a0 + int(np.argmax(ratios))
+                        lookup[start1 + b] = start0 + a
+                        a0 = a + 1  # keep order
+        return lookup
+
+    def show_diff(self, func0, run0, unit0, func1, run1, unit1, stream=None):
+        """
+        Show the line-by-line differences between two runs of a function.
+        """
+        stream = stream or sys.stdout
+        (stats0, total0), (stats1, total1) = run0, run1
+
+        _, start0, lines0 = self.get_block(func0)
+        filename, start1, lines1 = self.get_block(func1)
+        lookup = self._align(lines0, start0, lines1, start1)
+
+        # layout from the new source
+        self.start = start1
+        self.ignoreLines = []
+        self.where_gaps = []
+        self.sourceCodeLines = lines1
+        self.unit = unit1
+        self.preprocess(stats1, start1, start1 + len(lines1))
+
+        # line times in microseconds
+        def get_time(stats, lnr, unit):
+            if lnr in stats:
+                return stats[lnr][1] * unit / 1e-6
+            return 0
+
+        rows = []
+        for lnr, line in self.enumerate():
+            t0 = get_time(stats0, lookup.get(lnr), unit0)
+            t1 = get_time(stats1, lnr, unit1)
+            rows.append((lnr, t0, t1, line))
+            if lnr in self.where_gaps:
+                rows.append((self.dots, None, None, self.dots))
+
+        deltas = [t1 - t0 for _, t0, t1, _ in rows if t0 is not None]
+        scale = max(map(abs, deltas), default=0) or 1
+        width = min(max(map(len, self.sourceCodeLines), default=0), 80)
+
+        table = []
+        for lnr, t0, t1, line in rows:
+            if t0 is None:
+                table.append((lnr, '', '', '', '', line))
+                continue
+
+            delta = t1 - t0
+            if delta:
+                line = make_bar(line, abs(delta) / scale, width,
+                                self.slower_color if delta > 0 else
+                                self.faster_color)
+            table.append((lnr, *self._format_change(t0, t1), line))
+
+        title = '\n'.join((
+            f'File: {codes.apply(filename, "y")}',
+            f'Function: {codes.apply(func2str(func1), "b")} at line {start1}',
+            f'Total time: {total0:g} s → {total1:g} s '
+            f'({self._format_speedup(total0, total1)})'
+        ))
+        self._table = Table(np.array(table, 'O'),
+                            title=title,
+                            title_align='left',
+                            title_style=dict(text='bold', bg='dark gray'),
+                            col_headers=self.column_headers,
+                            col_head_style=dict(text=('bold', 'w'), bg='b'),
+                            align='>>>>><')
+        stream.write(str(self._table))
+
+    def rank(self, before, after):
+        """
+        Table of functions ranked by the change in total time between the two
+        runs, biggest regressions first.
+        """
+        totals0 = {key: total for key, (*_, total) in self._index(before).items()}
+        totals1 = {key: total for key, (*_, total) in self._index(after).items()}
+        # to microseconds
+        rows = [(key[1], totals0[key] * 1e6, total * 1e6)
+                for key, total in totals1.items() if key in totals0]
+        if not rows:
+            return ''
+
+        rows.sort(key=lambda row: row[2] - row[1], reverse=True)
+        return str(Table([(name, *self._format_change(t0, t1))
+                          for name, t0, t1 in rows],
+                         title='Change in total time per function',
+                         col_headers=('Function', *self.column_headers[1:5]),
+                         align='<>>>>'))
+
+    def _format_change(self, t0, t1):
+        delta = t1 - t0
+        colour = (self.slower_color if delta > 0 else
+                  self.faster_color if delta < 0 else None)
+        # format with space as thousands separator for readability
+        def fmt(t, spec=',.0f'): return format(t, spec).replace(',', ' ')
+
+        change = fmt(delta, '+,.0f')
+        if colour:
+            change = codes.apply(change, colour)
+        return fmt(t0), fmt(t1), change, self._format_speedup(t0, t1)
+
+    @staticmethod
+    def _format_speedup(t0, t1):
+        if not t0:
+            return '-'
+        if not t1:
+            return '∞×'
+        return f'{t0 / t1:.2f}×'
+
+
+def format_bytes(n):
+    """Format a number of bytes with binary prefix, eg. '1.5 MiB'."""
+    prefixes = ('', 'Ki', 'Mi', 'Gi', 'Ti')
+    i = 0
+    while abs(n) >= 1024 and i < len(prefixes) - 1:
+        n /= 1024
+        i += 1
+    return f'{n:.1f} {prefixes[i]}B' if i else f'{n:.0f} B'
+
+
+class ReportMemoryTable(ReportStatsTable):
+    """
+    Display memory allocation statistics from
+    `motley.profiling.memory.MemoryProfiler` next to the source code, with bars
+    behind the lines that allocate the most memory.
+    """
+
+    column_headers = ('#', 'Hits', 'Allocated', 'Net', 'Blocks', '% Total',
+                      'Line Contents')
+    bar_color = 'm'
+
+    def preamble(self, filename, func_name, start_line_nr, total, stream=None):
+        self._preamble = StringIO()
+        self._preamble.write('\n'.join((
+            f'File: {codes.apply(filename, "y")}',
+            f'Function: {codes.apply(func_name, "b")} at line {start_line_nr}',
+            f'Total allocated: {format_bytes(total)}'
+        )))
+
+    def table(self, stats, show_fot=True, stream=None):
+        """
+        make the memory table and write to stream
+        """
+        stream = stream or sys.stdout
+
+        total = sum(max(allocated, 0) for _, allocated, *_ in stats.values())
+        width = min(max(map(len, self.sourceCodeLines), default=0), 80)
+        empty = ('',) * 5
+
+        rows = []
+        for lineNo, line in self.enumerate():
+            if lineNo in stats:
+                hits, allocated, net, blocks, fot = stats[lineNo]
+                if allocated > 0 and total:
+                    line = make_bar(line, allocated / total, width,
+                                    self.bar_color)
+                rows.append((lineNo, hits, format_bytes(allocated),
+                             format_bytes(net), blocks, fot, line))
+            else:
+                rows.append((lineNo, *empty, line))
+
+            if lineNo in self.where_gaps:
+                # insert blank line to indicate gap!
+                rows.append((self.dots, *empty, self.dots))
+
+        colhead = list(self.column_headers)
+        align = list('>>>>>><')
+        table = np.array(rows, 'O')
+        if not show_fot:
+            table = np.delete(table, 5, 1)
+            del colhead[5], align[5]
+
+        self._preamble.seek(0)
+        self._table = Table(np.ma.MaskedArray(table, table == ''),
+                            title=self._preamble.read(),
+                            title_align='left',
+                            title_style=dict(text='bold', bg='dark gray'),
+                            col_headers=colhead,
+                            col_head_style=dict(text=('bold', 'w'), bg='b'),
+                            hlines=[0, len(rows)],
+                            align=align,
+                            formatters={'#': str,
+                                        '% Total': '{:.1%}'.format},
+                            masked='')
+        stream.write(str(self._table))
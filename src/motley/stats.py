@@ -0,0 +1,149 @@
+"""
+Opt-in instrumentation of motley's own hot paths.
+
+Counts and times internal operations such as style resolution, applying ANSI
+codes, field formatting, table construction and image encoding. Collection is
+disabled by default, and the instrumented call sites only check the module
+flag `enabled`, so the cost is negligible when not in use.
+
+Examples
+--------
+>>> from motley import stats
+... with stats.collect():
+...     print(table)
+... stats.report()
+"""
+
+
+# std
+import time
+import contextlib as ctx
+from collections import defaultdict
+
+
+# ---------------------------------------------------------------------------- #
+enabled = False
+"""Whether statistics are being collected."""
+
+# name -> count
+counters = defaultdict(int)
+# name -> [number of calls, total seconds]
+timers = defaultdict(lambda: [0, 0.])
+
+
+# ---------------------------------------------------------------------------- #
+def enable():
+    """Start collecting statistics."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stop collecting statistics. Collected values are kept until `reset`."""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Discard all collected statistics."""
+    counters.clear()
+    timers.clear()
+
+
+@ctx.contextmanager
+def collect(clear=True):
+    """
+    Context manager that enables collection within its scope, and restores the
+    previous state on exit. Previously collected statistics are discarded on
+    entry if `clear` is True.
+    """
+    previous = enabled
+    if clear:
+        reset()
+
+    enable()
+    try:
+        yield counters, timers
+    finally:
+        if not previous:
+            disable()
+
+
+# ---------------------------------------------------------------------------- #
+def count(name, n=1):
+    """Increment counter `name` by `n`."""
+    counters[name] += n
+
+
+def add_time(name, seconds, n=1):
+    """Add `n` calls taking `seconds` in total to timer `name`."""
+    timer = timers[name]
+    timer[0] += n
+    timer[1] += seconds
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self.name, time.perf_counter() - self.start)
+
+
+_null = ctx.nullcontext()
+
+
+def timer(name):
+    """
+    Context manager that adds the time spent in its scope to timer `name`. When
+    collection is disabled, a shared no-op context is returned.
+    """
+    return _Timer(name) if enabled else _null
+
+
+# ---------------------------------------------------------------------------- #
+def _format_time(value):
+    # counters have no timing
+    return value if value == '' else f'{value:.3f}'
+
+
+def get_table(title='motley stats', **kws):
+    """
+    Summary of the collected statistics.
+
+    Returns
+    -------
+    motley.table.Table
+    """
+    from .table import Table
+
+    rows = [(name, n, '', '') for name, n in sorted(counters.items())]
+    rows.extend((name, n, seconds * 1e3, seconds / n * 1e6 if n else 0)
+                for name, (n, seconds) in sorted(timers.items()))
+
+    return Table(rows or [('', '', '', '')],
+                 title=title,
+                 col_headers=('Operation', 'Count', 'Total (ms)',
+                              'Per Call (μs)'),
+                 align='<>>>',
+                 formatters={'Total (ms)': _format_time,
+                             'Per Call (μs)': _format_time},
+                 **kws)
+
+
+def report(**kws):
+    """Print the summary table of the collected statistics."""
+    # collecting while rendering the summary would skew the results
+    global enabled
+    previous, enabled = enabled, False
+    try:
+        print(get_table(**kws))
+    finally:
+        enabled = previous
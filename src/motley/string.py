@@ -1,9 +1,16 @@
 # std
+import functools as ftl
+import itertools as itt
+from operator import itemgetter
 from collections import UserString
 
+# third-party
+from wcwidth import wcwidth
+
 # relative
 from . import codes
 from .formatter import formatter
+from .codes.utils import REGEX_ANSI, _SGRState
 
 
 # f"{String('Hello world'):rBI_/k}"
@@ -27,3 +34,405 @@ class String(UserString):
 
 
 Str = String
+
+
+# ---------------------------------------------------------------------------- #
+# Interned styles. Each distinct SGR parameter string is stored once and spans
+# refer to it by integer id. Id 0 is the unstyled state.
+_STYLES = ['']
+_STYLE_IDS = {'': 0}
+
+
+def intern_style(params):
+    """Get the integer id for the SGR parameter string `params`."""
+    if (sid := _STYLE_IDS.get(params)) is None:
+        sid = _STYLE_IDS[params] = len(_STYLES)
+        _STYLES.append(params)
+    return sid
+
+
+@ftl.lru_cache()
+def _compose(sid, params):
+    # id of the style resulting from stacking `params` on top of style `sid`.
+    # The combined state is interned in canonical form, as in `_parse`, so
+    # that equal styles have equal ids regardless of how they were built.
+    if not params:
+        return sid
+
+    state = _SGRState()
+    if old := _STYLES[sid]:
+        state.update(old)
+    state.update(params)
+    return intern_style(state.params())
+
+
+def _char_width(char):
+    return max(wcwidth(char), 0)
+
+
+def _text_width(text):
+    # sum of character widths, so that widths agree with column slicing.
+    # Control characters (eg. newline, tab) have zero width.
+    return sum(map(_char_width, text))
+
+
+class StyledText:
+    """
+    Immutable styled text made of (text, style id) spans. Styles are interned,
+    so spans are cheap to copy and compare. Concatenation is lazy: joining two
+    pieces creates a node referencing both, and the spans are flattened only
+    once, when first needed. ANSI codes are rendered only when converting to
+    `str`.
+
+    Examples
+    --------
+    >>> s = StyledText('Hello', 'r') + ' ' + StyledText('world', 'B', bg='g')
+    >>> s.width
+    11
+    >>> str(s[6:])
+    '\x1b[;1;42mworld\x1b[0m'
+    """
+
+    __slots__ = ('_spans', '_left', '_right', '_width', '_str')
+
+    def __init__(self, text='', *effects, **kws):
+        if isinstance(text, StyledText):
+            spans = text.spans
+        else:
+            text = str(text)
+            spans = self._parse(text) if codes.has_ansi(text) else ((text, 0), )
+
+        if params := codes.get_code_str(*effects, **kws):
+            spans = tuple((txt, _compose(sid, params)) for txt, sid in spans)
+
+        self._spans = _merge(spans)
+        self._left = self._right = None
+        self._width = self._str = None
+
+    @staticmethod
+    def _parse(text):
+        # Track the SGR state through the string, so that nested, unbalanced
+        # or multi-line styled text is handled correctly. Non-SGR sequences are
+        # dropped.
+        spans = []
+        state = _SGRState()
+        sid = idx = 0
+        for mo in REGEX_ANSI.finditer(text):
+            spans.append((text[idx:mo.start()], sid))
+            idx = mo.end()
+            if mo['final_byte'] != 'm':
+                continue
+
+            # parameters are consumed left to right, so that the arguments of
+            # extended colours (eg. '38;5;0') are not mistaken for resets
+            state.update(mo['params'])
+            sid = intern_style(state.params())
+
+        spans.append((text[idx:], sid))
+        return tuple(spans)
+
+    @classmethod
+    def _from_spans(cls, spans):
+        new = object.__new__(cls)
+        new._spans = _merge(spans)
+        new._left = new._right = None
+        new._width = new._str = None
+        return new
+
+    @classmethod
+    def _concat(cls, left, right):
+        new = object.__new__(cls)
+        new._spans = None
+        new._left, new._right = left, right
+        new._width = new._str = None
+        if left._width is not None and right._width is not None:
+            new._width = left._width + right._width
+        return new
+
+    # ------------------------------------------------------------------------ #
+    @property
+    def spans(self):
+        """Tuple of (text, style id) pairs."""
+        if self._spans is None:
+            # flatten the concatenation tree iteratively to avoid recursion
+            # limits for long chains
+            spans = []
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if node._spans is None:
+                    stack.extend((node._right, node._left))
+                else:
+                    spans.extend(node._spans)
+
+            self._spans = _merge(spans)
+            self._left = self._right = None
+
+        return self._spans
+
+    @property
+    def plain(self):
+        """The text without any styling."""
+        return ''.join(txt for txt, _ in self.spans)
+
+    @property
+    def width(self):
+        """Display width of the text in the terminal (cached)."""
+        if self._width is None:
+            self._width = sum(_text_width(txt) for txt, _ in self.spans)
+        return self._width
+
+    def __len__(self):
+        return sum(len(txt) for txt, _ in self.spans)
+
+    def __str__(self):
+        # cache rendered string for the active colour mode
+        use_color = codes.use_color()
+        if self._str is None or self._str[0] != use_color:
+            self._str = (use_color, self.render())
+        return self._str[1]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({str(self)!r})'
+
+    def __format__(self, spec):
+        return formatter.format_field(str(self), spec)
+
+    def __eq__(self, other):
+        # Not equal to `str`, since the rendered string depends on the colour
+        # mode, and hashes could not agree. Compare `str(self)` instead.
+        if isinstance(other, StyledText):
+            return self.spans == other.spans
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.spans)
+
+    def __add__(self, other):
+        if isinstance(other, str):
+            other = StyledText(other)
+        elif not isinstance(other, StyledText):
+            return NotImplemented
+        return self._concat(self, other)
+
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return self._concat(StyledText(other), self)
+        return NotImplemented
+
+    def __getitem__(self, key):
+        """Slice by display column."""
+        if isinstance(key, int):
+            width = self.width
+            if key < 0:
+                key += width
+            if not 0 <= key < width:
+                raise IndexError('StyledText index out of range.')
+            key = slice(key, key + 1)
+
+        if not isinstance(key, slice):
+            raise TypeError(f'Invalid index type {type(key)}.')
+
+        start, stop, step = key.indices(self.width)
+        if step != 1:
+            raise ValueError('StyledText slicing does not support steps.')
+
+        return self._from_spans(self._slice_columns(start, stop))
+
+    def _slice_columns(self, start, stop):
+        col = 0
+        for txt, sid in self.spans:
+            if col >= stop:
+                break
+
+            width = _text_width(txt)
+            if col >= start and col + width <= stop:
+                # entire span inside slice
+                yield txt, sid
+                col += width
+                continue
+
+            chars = []
+            for char in txt:
+                w = _char_width(char)
+                if col >= start and col + w <= stop:
+                    chars.append(char)
+                col += w
+                if col >= stop:
+                    break
+
+            if chars:
+                yield ''.join(chars), sid
+
+    # ------------------------------------------------------------------------ #
+    def style(self, *effects, **kws):
+        """Apply additional effects to the entire text."""
+        return StyledText(self, *effects, **kws)
+
+    def render(self):
+        """Render the text with ANSI codes."""
+        if not codes.use_color():
+            return self.plain
+
+        return ''.join(f'{codes.CSI};{_STYLES[sid]}m{txt}{codes.END}' if sid
+                       else txt
+                       for txt, sid in self.spans)
+
+    @classmethod
+    def join(cls, sep, items):
+        """Join `items` with separator `sep` in a single pass."""
+        sep = StyledText(sep).spans
+        spans = []
+        for i, item in enumerate(items):
+            if i:
+                spans.extend(sep)
+            spans.extend(item.spans if isinstance(item, StyledText) else
+                         StyledText(item).spans)
+        return cls._from_spans(spans)
+
+
+def _merge(spans):
+    # merge adjacent spans with the same style, drop empty spans
+    return tuple((''.join(map(itemgetter(0), group)), sid)
+                 for sid, group in itt.groupby(filter(itemgetter(0), spans),
+                                               itemgetter(1)))
+
+
+# ---------------------------------------------------------------------------- #
+# Display-width aware truncation, wrapping and slicing of strings that may
+# contain ANSI codes and wide or combining characters. Plain (printable ASCII)
+# strings take a fast path that uses ordinary str operations.
+
+DOTS = '…'  # single character ellipsis u"…" to indicate truncation
+
+
+def _is_plain(text):
+    # all characters printable ASCII, so display width equals length
+    return text.isascii() and text.isprintable()
+
+
+def get_width(text):
+    """Display width of the longest line in `text`."""
+    text = str(text)
+    if _is_plain(text):
+        return len(text)
+
+    return max(line.width for line in _split_lines(StyledText(text)))
+
+
+def _split_lines(styled):
+    # split styled text on newlines, keeping the style of each piece
+    lines = [[]]
+    for txt, sid in styled.spans:
+        first, *rest = txt.split('\n')
+        lines[-1].append((first, sid))
+        lines.extend([(part, sid)] for part in rest)
+
+    return [StyledText._from_spans(line) for line in lines]
+
+
+def slice_columns(text, start=0, stop=None):
+    """
+    Slice `text` by display column. Styles are kept balanced, so the result
+    is valid styled text.
+
+    Examples
+    --------
+    >>> slice_columns(codes.apply('hello world', 'r'), 6)
+    '\x1b[;31mworld\x1b[0m'
+    """
+    text = str(text)
+    if _is_plain(text):
+        return text[start:stop]
+
+    return str(StyledText(text)[start:stop])
+
+
+def truncate(text, width, dots=DOTS):
+    """
+    Truncate `text` to at most `width` display columns, marking truncated lines
+    with `dots`, which take on the style of the text they replace. Each line of
+    multi-line text is truncated separately.
+
+    Examples
+    --------
+    >>> truncate('hello world', 8)
+    'hello w…'
+    """
+    text = str(text)
+    if _is_plain(text) and _is_plain(dots):
+        if len(text) <= width:
+            return text
+        return text[:max(width - len(dots), 0)] + dots
+
+    lines = _split_lines(StyledText(text))
+    if max(line.width for line in lines) <= width:
+        return text
+
+    return '\n'.join(map(str, (_truncate_line(line, width, dots)
+                               for line in lines)))
+
+
+def _truncate_line(line, width, dots):
+    if line.width <= width:
+        return line
+
+    dots = StyledText(dots)
+    head = line[:max(width - dots.width, 0)]
+    if (spans := head.spans) and not dots.spans[1:] and not dots.spans[0][1]:
+        # dots continue in the style of the last visible character
+        return StyledText._from_spans((*spans, (dots.plain, spans[-1][1])))
+    return head + dots
+
+
+def wrap(text, width):
+    """
+    Wrap `text` to lines of at most `width` display columns, breaking at
+    whitespace where possible. Styles are kept balanced on each line.
+
+    Returns
+    -------
+    list of str
+    """
+    text = str(text)
+    if _is_plain(text):
+        return [text[i:j] for i, j in _wrap_breaks(text, [1] * len(text), width)]
+
+    lines = []
+    for line in _split_lines(StyledText(text)):
+        plain = line.plain
+        widths = list(map(_char_width, plain))
+        # column of each character
+        cols = list(itt.accumulate(widths, initial=0))
+        lines.extend(str(line[cols[i]:cols[j]])
+                     for i, j in _wrap_breaks(plain, widths, width))
+    return lines
+
+
+def _wrap_breaks(plain, widths, width):
+    # Greedy line breaking. Yields (start, stop) character indices of lines.
+    n = len(plain)
+    i = 0
+    while True:
+        # skip leading whitespace on continuation lines
+        while i and i < n and plain[i] == ' ':
+            i += 1
+
+        # find the furthest character that fits
+        j, w = i, 0
+        while j < n and w + widths[j] <= width:
+            w += widths[j]
+            j += 1
+
+        if j >= n:
+            yield i, n
+            return
+
+        # break at the last space, if any, otherwise mid-word
+        if (k := plain.rfind(' ', i, j + 1)) > i:
+            yield i, len(plain[i:k].rstrip(' ')) + i
+            i = k
+        else:
+            j = max(j, i + 1)  # always make progress
+            yield i, j
+            i = j
@@ -0,0 +1,163 @@
+"""
+Column aggregates for table footer rows. Numeric columns are cast once to a
+typed array and all requested aggregates are computed in a single vectorized
+pass. The `Accumulator` can also be updated incrementally with blocks of rows,
+so the same aggregates are available when rows are streamed.
+"""
+
+
+# std
+import numbers
+
+# third-party
+import numpy as np
+
+# relative
+from .utils import as_float
+
+
+# ---------------------------------------------------------------------------- #
+AGGREGATES = ('sum', 'mean', 'min', 'max', 'std', 'count', 'non-null')
+
+ALIASES = {
+    'total':    'sum',
+    'totals':   'sum',
+    'avg':      'mean',
+    'average':  'mean',
+    'minimum':  'min',
+    'maximum':  'max',
+    'n':        'count',
+    'nonnull':  'non-null',
+    'non_null': 'non-null',
+    'valid':    'non-null'
+}
+
+# default row headers for the footer rows
+LABELS = {
+    'sum':      'Totals',
+    'mean':     'Mean',
+    'min':      'Min',
+    'max':      'Max',
+    'std':      'Std',
+    'count':    'Count',
+    'non-null': 'Non-null'
+}
+
+# aggregates that are defined for columns of any type
+ANY_TYPE = {'count', 'non-null'}
+
+
+def resolve_aggregate(name):
+    """Resolve aliases for aggregate names."""
+    key = name.lower()
+    key = ALIASES.get(key, key)
+    if key in AGGREGATES:
+        return key
+
+    raise ValueError(f'Unknown aggregate {name!r}. Valid choices are: '
+                     f'{AGGREGATES}.')
+
+
+def is_numeric(types):
+    """Check whether the set of column data `types` are all real numbers."""
+    return bool(types) and all(issubclass(t, numbers.Real) for t in types)
+
+
+# ---------------------------------------------------------------------------- #
+
+class Accumulator:
+    """
+    Incremental column aggregates. Blocks of rows are combined using the
+    parallel algorithm of Chan et al. for the mean and variance, so updating
+    row-by-row or with the entire column at once gives the same result.
+
+    Examples
+    --------
+    >>> acc = Accumulator(2)
+    >>> for row in rows:
+    ...     acc.update(row)
+    >>> acc.result('mean')
+    """
+
+    def __init__(self, n_cols):
+        self.count = 0                      # number of rows
+        self.n = np.zeros(n_cols, int)      # number of non-null values
+        self.total = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)          # sum of squared deviations
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+
+    def update(self, block):
+        """
+        Update the aggregates with a row, or a 2D block of rows. Masked, None
+        or non-numeric entries are counted as null.
+        """
+        block = np.atleast_2d(as_float(block))
+        if not block.size:
+            return self
+
+        valid = ~np.isnan(block)
+        n_b = valid.sum(0)
+        zeroed = np.where(valid, block, 0)
+        sum_b = zeroed.sum(0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = sum_b / n_b
+            m2_b = np.square(np.where(valid, block - mean_b, 0)).sum(0)
+
+            # combine with previous blocks
+            n = self.n + n_b
+            delta = mean_b - self.mean
+            mean = self.mean + delta * n_b / n
+            m2 = self.m2 + m2_b + np.square(delta) * self.n * n_b / n
+
+        has = (n_b > 0)
+        self.mean = np.where(has, mean, self.mean)
+        self.m2 = np.where(has, m2, self.m2)
+        self.total += sum_b
+        self.min = np.fmin(self.min, np.where(valid, block, np.inf).min(0))
+        self.max = np.fmax(self.max, np.where(valid, block, -np.inf).max(0))
+        self.n = n
+        self.count += len(block)
+        return self
+
+    def result(self, name, ddof=0):
+        """Get the aggregate `name` for all columns."""
+        name = resolve_aggregate(name)
+        if name == 'count':
+            return np.full(len(self.n), self.count)
+
+        if name == 'non-null':
+            return self.n.copy()
+
+        if name == 'sum':
+            return self.total.copy()
+
+        empty = (self.n == 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            value = {'mean': self.mean,
+                     'min':  self.min,
+                     'max':  self.max,
+                     'std':  np.sqrt(self.m2 / (self.n - ddof))}[name]
+
+        return np.where(empty, np.nan, value)
+
+    def results(self, names, ddof=0):
+        """Get a dict of aggregates for each of `names`."""
+        return {(name := resolve_aggregate(_)): self.result(name, ddof)
+                for _ in names}
+
+
+def aggregate(data, names, ddof=0):
+    """
+    Compute aggregates `names` for all columns of the 2D array `data` in a
+    single pass.
+
+    Returns
+    -------
+    dict
+        Keys are aggregate names, values are arrays of results per column.
+    """
+    data = np.ma.atleast_2d(data) if np.ma.isMA(data) else np.atleast_2d(data)
+    return Accumulator(data.shape[1]).update(data).results(names, ddof)
@@ -17,7 +17,7 @@ from pyxides.vectorize import AttrTabulate
 from ..utils import make_group_title, resolve_alignment
 from .table import Table
 from .column import Column
-from .xlsx import XlsxWriter
+from .xlsx import XlsxWriter, write_sheets
 
 
 # ---------------------------------------------------------------------------- #
@@ -357,12 +357,19 @@ class AttrTable:
 
         data = container.attrs(*attrs)
         # cols = list(zip(*data))
+        return self._make_table(data, attrs, self.get_flags(container),
+                                **{'title': container.__class__.__name__,
+                                   **kws})
+
+    def get_flags(self, container):
+        return {colname: list(map(flag, container) if callable(flag) else flag)
+                for colname, flag in self.flags.items()}
+
+    def _make_table(self, data, attrs, flags, title=None, **kws):
         col_headers = self.get_headers(attrs)
-        flags = {colname: list(map(flag, container) if callable(flag) else flag)
-                 for colname, flag in self.flags.items()}
         align = {k: v for k, v in self.align.items() if k in col_headers}
         return Table(data, **{**self.kws,  # defaults
-                              **{**dict(title=container.__class__.__name__,
+                              **{**dict(title=title,
                                         align=align,
                                         col_headers=col_headers,
                                         col_groups=self.get_groups(attrs),
@@ -504,20 +511,140 @@ class AttrTable:
         # tables.update(empty)
         return tables
 
+    def get_grouped_table(self, groups, attrs=None, titled=True,
+                          filler_text='EMPTY', **kws):
+        """
+        Get a single table for the containers in `groups`. The rows of all
+        groups are formatted together, so column widths are measured in a
+        single pass and the heading is rendered only once, with the group
+        titles inserted as merged rows above each group's section. This is
+        much cheaper than stacking the tables from `get_tables` when there are
+        many groups. Note that column totals are computed over all groups.
+
+        Returns
+        -------
+        motley.table.Table
+        """
+
+        ncc = kws.pop('summary', False)  # number of columns in summary part
+        kws['summary'] = False
+
+        if titled is True:
+            titled = make_group_title
+
+        attrs, compactable, headers, units, totals = self.prepare(groups)
+
+        data = []
+        items = []
+        insert = defaultdict(list)
+        first = None
+        for gid, group in groups.items():
+            lines = insert[len(data)]
+            if titled:
+                lines.append((titled(gid), '^', 'underline'))
+
+            if group is None or len(group) == 0:
+                lines.append(filler_text)
+                continue
+
+            if first is None:
+                first = group
+            data.extend(group.attrs(*attrs))
+            items.extend(group)
+
+        if not data:
+            # all groups empty
+            return Table([filler_text],
+                         title=kws.get('title', self.__class__.__name__))
+
+        # flags evaluated once over the rows of all groups
+        tbl = self._make_table(data, attrs, self.get_flags(items),
+                               **{**dict(title=self.__class__.__name__,
+                                         totals=totals,
+                                         units=units,
+                                         insert=dict(insert)),
+                                  **kws})
+
+        # HACK summary repr
+        if ncc and first is not None and tbl.summary.allow():
+            tbl.summarize = ncc
+            tbl.summary.items = dict(zip(
+                list(compactable),
+                self.get_table(first[:1], compactable,
+                               chead=None, cgroups=None,
+                               row_nrs=False, **kws).pre_table[0]
+            ))
+            tbl.inset = tbl.summary()
+
+        return tbl
+
     def to_xlsx(self, path, sheet=None, formats=(), widths=None, overwrite=False,
-                **kws):
+                stream=False, **kws):
 
         if widths is None:
             widths = {}
-            
-        data = np.array(self.get_data(self.parent.sort_by('t.t0')))
+
+        tmp = self._get_xlsx_table(self.parent.sort_by('t.t0'))
+
+        # may need to set widths manually eg. for cells that contain formulae
+        # tmp.col_widths = get_col_widths(tmp) if widths is None else widths
+        # table = tmp()
+        align = {**self.align, **kws.pop('align', {})}
+        return XlsxWriter(tmp, widths, align=align, **kws).write(
+            path, sheet, formats, overwrite, stream)
+
+    def to_xlsx_sheets(self, path, groups=None, titled=True, formats=(),
+                       widths=None, overwrite=False, workers=1, **kws):
+        """
+        Export each group in `groups` to a separate sheet of a single workbook.
+        Sheet contents can be built concurrently in worker processes, see
+        `motley.table.xlsx.write_sheets`.
+
+        Parameters
+        ----------
+        path : str or Path
+            Output file.
+        groups : pyxides.grouping.Groups, optional
+            The grouped containers, by default the parent object.
+        titled : bool or callable, optional
+            Function that makes the sheet name from the group id, by default
+            `make_group_title`.
+        workers : int, optional
+            Number of worker processes, by default 1 (no workers). See
+            `motley.table.xlsx.write_sheets`.
+
+        Returns
+        -------
+        openpyxl.Workbook
+        """
+        if groups is None:
+            groups = self.parent
+
+        if titled is True:
+            titled = make_group_title
+
+        names, tables = [], []
+        for gid, group in groups.items():
+            if group is None or len(group) == 0:
+                continue
+
+            names.append(titled(gid) if titled else None)
+            tables.append(self._get_xlsx_table(group))
+
+        return write_sheets(path, tables, names, formats, overwrite, workers,
+                            widths=({} if widths is None else widths),
+                            align={**self.align, **kws.pop('align', {})},
+                            **kws)
+
+    def _get_xlsx_table(self, container):
+        data = np.array(self.get_data(container))
 
         # FIXME: better to use get_table here, but then we need to keep
         # table.data as objects not convert to str prematurely!
         # PLEASE FIX THIS UNGODLY HACK
 
         col_headers = self.get_headers()
-        tmp = AttrDict(
+        return _XlsxTable(
             data=data,
             col_groups=self.get_groups(),
             col_headers=col_headers,
@@ -530,10 +657,10 @@ class AttrTable:
             n_cols= len(self.attrs)
         )
 
-        # may need to set widths manually eg. for cells that contain formulae
-        # tmp.col_widths = get_col_widths(tmp) if widths is None else widths
-        # table = tmp()
-        align = {**self.align, **kws.pop('align', {})}
-        tmp.resolve_input = ftl.partial(Table.resolve_input, tmp)
-        return XlsxWriter(tmp, widths, align=align, **kws).write(
-            path, sheet, formats, overwrite)
+
+class _XlsxTable(AttrDict):
+    # Table-like mapping exported by `AttrTable.to_xlsx`. Defined at module
+    # level so that it can be pickled and sent to worker processes.
+
+    def resolve_input(self, *args, **kws):
+        return Table.resolve_input(self, *args, **kws)
@@ -1,6 +1,7 @@
 
 # std
 import numbers
+import datetime
 import warnings as wrn
 import functools as ftl
 import contextlib as ctx
@@ -121,6 +122,74 @@ def _(key, headers, ncols, what, emit):
 def _(key, headers, ncols, what, emit):
     return list(range(ncols))
 
+# ---------------------------------------------------------------------------- #
+# Type inference
+
+# data type kinds for which the element type can be inferred from the dtype
+_TYPED_KINDS = set('biufcUSmM')
+
+
+def get_datetime_type(dtype):
+    """
+    Type of the elements of a datetime64 or timedelta64 array of `dtype` in
+    an object array. Units that convert to `datetime.date` or
+    `datetime.timedelta` give those types. Finer units (which convert to int)
+    and generic units are kept as `np.datetime64` or `np.timedelta64`.
+    """
+    value = np.zeros(1, dtype)[0]
+    item = value.item()
+    if isinstance(item, (datetime.date, datetime.timedelta)):
+        return type(item)
+    return type(value)
+
+
+def infer_types(data, dtype=None, sample=None):
+    """
+    Infer the set of types of the (unmasked) elements in the column `data`.
+
+    For typed arrays, the types are inferred from the `dtype` without scanning
+    the data. Note that `dtype` can be passed explicitly in case the data have
+    been converted to an object array. For object arrays, if `sample` is given,
+    the types of `sample` evenly spaced elements are inspected instead of the
+    entire column.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Column data.
+    dtype : np.dtype, optional
+        The original data type of the column, by default `data.dtype`.
+    sample : int, optional
+        Number of elements to inspect for object arrays. By default all
+        elements are inspected.
+
+    Returns
+    -------
+    types : set
+        Types of the (sampled) elements in the column.
+    verified : bool
+        Whether all elements in the column were inspected.
+    """
+    dtype = np.dtype(data.dtype if dtype is None else dtype)
+    if dtype.kind in _TYPED_KINDS:
+        if np.ma.count(data) == 0:
+            return set(), True
+
+        if dtype.kind in 'mM':
+            return {get_datetime_type(dtype)}, True
+
+        # type that elements have when converted to object array
+        return {type(np.zeros(1, dtype)[0].item())}, True
+
+    values = np.ma.compressed(data) if np.ma.isMA(data) else np.ravel(data)
+    n = len(values)
+    if sample is None or n <= sample:
+        return set(map(type, values)), True
+
+    index = np.unique(np.linspace(0, n - 1, sample).astype(int))
+    return set(map(type, values[index])), False
+
+
 # ---------------------------------------------------------------------------- #
 
 
@@ -131,6 +200,7 @@ class Column(LoggingMixin):
                  width=None, total=False, group=None):
         # TODO: fmt = '{:. 14.5?f|gBi_/teal}'
         self.title = title
+        dtype = getattr(data, 'dtype', None)
         self.data = np.atleast_1d(np.asanyarray(data, 'O').squeeze())
         assert self.data.ndim == 1
 
@@ -138,7 +208,7 @@ class Column(LoggingMixin):
         self.width = width
         self.align = resolve_alignment(align)
         self.total = self.data.sum() if total else None
-        self.dtypes = set(map(type, np.ma.compressed(self.data)))
+        self.dtypes, _ = infer_types(self.data, dtype)
 
         if fmt is None:
             fmt = self.get_default_formatter()
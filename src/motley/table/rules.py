@@ -0,0 +1,229 @@
+"""
+Column styling rules. Rules compute integer style indices for an entire column
+of raw (unformatted) data in a single vectorized pass. The indices select from
+a lookup table of pre-rendered ANSI code prefixes, so that colouring large
+tables requires no per-cell code resolution.
+"""
+
+
+# std
+from abc import ABC, abstractmethod
+
+# third-party
+import numpy as np
+
+# relative
+from .. import codes
+from .utils import as_float
+
+
+# ---------------------------------------------------------------------------- #
+
+def get_prefix(style):
+    """Pre-rendered ANSI code prefix for `style`."""
+    if style is None:
+        return ''
+
+    if isinstance(style, dict):
+        params = codes.get_code_str(**style)
+    else:
+        params = codes.get_code_str(style)
+
+    return f'{codes.CSI};{params}m' if params else ''
+
+
+def render_lut(styles):
+    """
+    Lookup table of pre-rendered code prefixes for `styles`. An additional
+    empty prefix is appended so that index -1 maps to unstyled cells.
+    """
+    return np.array([*map(get_prefix, styles), ''], 'O')
+
+
+def stylize(cells, states, lut):
+    """
+    Apply the pre-rendered styles in `lut` to the string array `cells`.
+
+    Parameters
+    ----------
+    cells : np.ndarray
+        Formatted cell contents (str).
+    states : np.ndarray
+        Integer indices into `lut`. Index -1 means no style.
+    lut : np.ndarray
+        Object array of code prefixes, as returned by `render_lut`.
+
+    Returns
+    -------
+    np.ndarray(dtype='O')
+    """
+    cells = np.asarray(cells, 'O')
+    out = cells.copy()
+    if not codes.use_color():
+        return out
+
+    prefix = lut[states]
+    styled = (prefix != '')
+    if not styled.any():
+        return out
+
+    # cells that already contain codes need to be re-parsed to stack styles
+    coded = np.fromiter(map(codes.has_ansi, cells[styled]), bool)
+    idx = np.argwhere(styled)[coded]
+    for i in map(tuple, idx):
+        out[i] = _stack(cells[i], prefix[i])
+
+    # plain cells: single vectorized concatenation
+    plain = styled.copy()
+    plain[styled] = ~coded
+    out[plain] = prefix[plain] + cells[plain] + codes.END
+    return out
+
+
+def _stack(s, prefix):
+    # stack the codes in `prefix` onto those already present in `s`, the same
+    # way that `codes.apply` does
+    new = prefix[len(codes.CSI) + 1:-1]
+    return ''.join(f'{codes.CSI}{params};{new}m{w}{codes.END}'
+                   for _, params, _, w, _ in codes.parse(s))
+
+
+# ---------------------------------------------------------------------------- #
+
+class Rule(ABC):
+    """
+    Base class for column styling rules. Subclasses implement `get_states`,
+    which maps raw column data to integer indices into `styles`, with -1
+    indicating no style.
+    """
+
+    styles = ()
+
+    @abstractmethod
+    def get_states(self, values):
+        """Integer indices into `styles` for the raw column data `values`."""
+
+    @property
+    def lut(self):
+        if (lut := getattr(self, '_lut', None)) is None:
+            lut = self._lut = render_lut(self.styles)
+        return lut
+
+    def __call__(self, cells, values):
+        """
+        Style the formatted `cells` based on the raw column data `values`.
+        """
+        return stylize(cells, self.get_states(values), self.lut)
+
+
+class Threshold(Rule):
+    """
+    Style cells by the interval between threshold values that contains them.
+
+    Examples
+    --------
+    >>> Threshold([0, 10], ['r', None, 'g'])  # red < 0 <= plain < 10 <= green
+    """
+
+    def __init__(self, edges, styles, right=False):
+        edges = np.atleast_1d(edges)
+        if len(styles) != len(edges) + 1:
+            raise ValueError(f'Require {len(edges) + 1} styles for '
+                             f'{len(edges)} threshold values.')
+        self.edges = edges
+        self.styles = list(styles)
+        self.right = bool(right)
+
+    def get_states(self, values):
+        values = as_float(values)
+        states = np.digitize(values, self.edges, self.right)
+        states[np.isnan(values)] = -1
+        return states
+
+
+class Mask(Rule):
+    """
+    Style cells where a boolean mask is True. The mask can be given explicitly,
+    or as a vectorized function of the column data.
+
+    Examples
+    --------
+    >>> Mask(lambda x: x < 0, 'r')
+    """
+
+    def __init__(self, mask, style):
+        self.mask = mask
+        self.styles = [None, style]
+
+    def get_states(self, values):
+        mask = self.mask
+        if callable(mask):
+            mask = mask(np.ma.getdata(values))
+        mask = np.asarray(mask, bool)
+        return mask.astype(int) & ~np.ma.getmaskarray(values)
+
+
+class ColourMap(Rule):
+    """
+    Map numeric values to background colours via a matplotlib colour map.
+
+    Parameters
+    ----------
+    cmap : str or matplotlib.colors.Colormap, optional
+        The colour map, by default the matplotlib default.
+    clim : tuple, optional
+        Colour limits (vmin, vmax), by default the range of the column data.
+    n_levels : int, optional
+        Number of discrete colour levels, by default `cmap.N`.
+    fg : str or tuple, optional
+        Text colour. If 'auto' (the default), black or white is chosen for
+        each level based on the luminance of the background colour.
+    """
+
+    def __init__(self, cmap=None, clim=None, n_levels=None, fg='auto'):
+        from matplotlib import colormaps
+
+        self.cmap = colormaps.get_cmap(cmap)
+        self.clim = clim
+        self.n_levels = int(n_levels or self.cmap.N)
+        self.fg = fg
+
+    @property
+    def styles(self):
+        from ..image import get_level_colours
+
+        # bad values are left unstyled
+        rgb = get_level_colours(self.cmap, self.n_levels)[:-1]
+
+        fg = self.fg
+        if fg == 'auto':
+            luminance = rgb @ (0.2126, 0.7152, 0.0722)
+            fg = np.where(luminance > 128, 'k', 'w')
+        else:
+            fg = [fg] * len(rgb)
+
+        return [dict(fg=f, bg=tuple(map(int, c))) for f, c in zip(fg, rgb)]
+
+    def get_states(self, values):
+        from ..image import get_level_index
+
+        values = as_float(values)
+        bad = np.isnan(values)
+        vmin, vmax = self.clim or (np.nanmin(values, initial=np.inf,
+                                             where=~bad),
+                                   np.nanmax(values, initial=-np.inf,
+                                             where=~bad))
+        with np.errstate(invalid='ignore'):
+            if vmax == vmin:
+                values = np.where(bad, np.nan, 0.)
+            else:
+                values = (values - vmin) / (vmax - vmin)
+
+        # bad values are left unstyled
+        states = get_level_index(values, self.n_levels)
+        states[bad] = -1
+        return states
+
+
+# alias
+ColorMap = ColourMap
@@ -5,13 +5,13 @@ Pretty printed tables for small data sets
 
 # std
 import os
+import time
 import typing
 import numbers
 import unicodedata
 import warnings as wrn
 import functools as ftl
 import itertools as itt
-from shutil import get_terminal_size
 from collections import UserString, abc, defaultdict
 
 # third-party
@@ -26,13 +26,15 @@ from recipes.functionals import always, echo0, raises as bork
 from recipes.utils import EnsureWrapped, is_null, is_scalar, not_null
 
 # relative
-from .. import codes
+from .. import codes, stats, terminal
+from ..formatters import TypeGuard
 from ..utils import get_width, resolve_alignment
 from ..formatter import Formattable, format as mformat
-from . import summary as sm
+from . import aggregate as agg, summary as sm
 from .utils import *
 from .xlsx import XlsxWriter
-from .column import resolve_columns
+from .rules import render_lut, stylize
+from .column import get_datetime_type, infer_types, resolve_columns
 
 
 # from .utils import _underline
@@ -336,6 +338,55 @@ def check_flag(obj):
 # ---------------------------------------------------------------------------- #
 
 
+# aggregates that are computed exactly (as python int) for integer columns
+INTEGER_AGGREGATES = {'sum': sum, 'min': min, 'max': max}
+
+
+def _integer_aggregate(column, name):
+    # aggregate integer column without converting to float, which would lose
+    # precision above 2 ** 53
+    values = [int(value) for value in np.ma.compressed(column)
+              if value is not None]
+    return INTEGER_AGGREGATES[name](values) if values else np.ma.masked
+
+
+class _Invalidating:
+    """
+    Attribute descriptor that invalidates the rendered output of the table when
+    the attribute is set.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = f'_{name}'
+
+    def __get__(self, obj, kls=None):
+        return self if obj is None else getattr(obj, self.name)
+
+    def __set__(self, obj, value):
+        setattr(obj, self.name, value)
+        obj.invalidate()
+
+
+class _StageClock:
+    """
+    Times consecutive named stages of table construction and rendering. Each
+    call ends the current stage and starts the next.
+    """
+
+    __slots__ = ('table', 'start')
+
+    def __init__(self, table):
+        self.table = table
+        self.start = time.perf_counter()
+
+    def __call__(self, name, shape):
+        now = time.perf_counter()
+        self.table._on_stage(name, now - self.start, *shape)
+        self.start = now
+
+
+# ---------------------------------------------------------------------------- #
+
 class Table(LoggingMixin):
     # TODO split ConsoleWriter(TableWriter)
     """
@@ -357,6 +408,29 @@ class Table(LoggingMixin):
     #  4 - rhs border
     unit_fmt = '[{}]'
 
+    # Number of elements inspected to infer the types of object columns. The
+    # inferred types are verified during formatting. Set to None to inspect
+    # all elements.
+    type_sample = 1000
+
+    # attributes that affect the rendered output. Note that in-place changes
+    # to these (eg. adding items to `highlight`, or editing cells of
+    # `pre_table`) require calling `invalidate`.
+    title = _Invalidating()
+    subtitle = _Invalidating()
+    insert = _Invalidating()
+    hlines = _Invalidating()
+    highlight = _Invalidating()
+    data = _Invalidating()
+    pre_table = _Invalidating()
+    align = _Invalidating()
+    borders = _Invalidating()
+
+    # Callbacks for timing of construction and rendering stages. Hooks added
+    # here are called for all tables, in addition to those passed to the
+    # initializer as `on_stage`.
+    stage_hooks = []
+
     # foot_fmt = None  # '{flag} : {info}'
     _merge_repeat_groups = True
     _nrs_header = '#'
@@ -593,13 +667,16 @@ class Table(LoggingMixin):
                  too_wide='split',
                  whitespace=1,
                  totals=None,
+                 aggregates=None,
 
                  flags=None,
                  flag_fmt='{}',
                  insert=None,
                  highlight=None,  # FIXME: deprecate in favour of formatters
+                 rules=None,
                  footnotes='',
                  foot_fmt=None,
+                 on_stage=None,
                  **kws):
 
         # TODO: style='matrix', 'bare', 'spreadsheet'
@@ -716,6 +793,13 @@ class Table(LoggingMixin):
             # todo maybe just ignore if non-numeric?
             This will only be done if the table contains more than one row of
             data.
+        aggregates : str or sequence or dict, optional
+            Aggregates to compute for numeric columns, each of which is added
+            as a footer row below the totals. Any of 'sum', 'mean', 'min',
+            'max', 'std', 'count', 'non-null'. A str or sequence of names
+            computes the aggregates for all (numeric) columns, while a dict
+            maps aggregate names to the columns for which they are required.
+            All aggregates are computed in a single vectorized pass.
 
         formatters : function or dict or array_like, optional
             Formatter(s) to use to create the str representation of objects in
@@ -763,6 +847,12 @@ class Table(LoggingMixin):
         highlight: dict, optional
             Highlight these rows by applying the given effects to the entire
             row.  The dict should be keyed on integer which is the line number
+        rules: motley.table.rules.Rule or dict, optional
+            Column styling rules. Either a single rule that will be applied to
+            all columns, or a dict of rules (or sequences of rules) keyed on
+            column names or indices. Rules are evaluated on the raw column data
+            in a single vectorized pass, eg:
+            >>> Table(data, rules={'flux': rules.ColourMap('viridis')})
 
         footnotes: str, list, dict
             Any footnote that will be added to the bottom of the table.
@@ -774,6 +864,16 @@ class Table(LoggingMixin):
             appear in the table will be appended, each with the description 
             provided by the same key in the `footnotes` dict.
 
+        on_stage: callable or list of callable, optional
+            Hook(s) called at the end of each stage of table construction and
+            rendering with signature `on_stage(name, duration, rows, cols)`.
+            Duration is in seconds, and `rows`, `cols` give the shape of the
+            table data at that stage. The construction stages are: 'convert',
+            'types', 'setup', 'aggregate', 'flags', 'format', 'headers',
+            'summary', 'widths' and 'layout'. Rendering adds a 'build' or
+            'split' stage. Stage durations are also accumulated in the
+            `stage_times` dict, and summarized by `get_stage_table`.
+
         # TODO: list attributes here
         """
 
@@ -787,6 +887,16 @@ class Table(LoggingMixin):
         # pprint.mapping(locals(), ignore=['self'])
         # logger.debug('SUMMARY {!r}.', summary)
 
+        # rendered output, keyed on layout
+        self._render_cache = {}
+
+        # stage timing
+        self.on_stage = ([] if on_stage is None else
+                         list(on_stage) if isinstance(on_stage, (list, tuple)) else
+                         [on_stage])
+        self.stage_times = {}
+        stage = _StageClock(self)
+
         # special case: dict
         if isinstance(data, dict):
             data, kws = self._parse_from_dict(data, **kws)
@@ -805,7 +915,17 @@ class Table(LoggingMixin):
             if units is None:
                 units = units_
 
-        # convert to object array
+        # keep the original data type for type inference
+        dtype = getattr(data, 'dtype', None)
+
+        # convert to object array. Datetimes that do not convert to Python
+        # objects are kept as numpy scalars instead of turning into int
+        if (dtype is not None and dtype.kind in 'mM'
+                and issubclass(get_datetime_type(dtype), np.generic)):
+            obj = np.empty(np.shape(data), 'O')
+            obj.flat[:] = list(np.ravel(data))
+            data = obj
+
         try:
             data = np.asanyarray(data, 'O')
         except ValueError as err:  # FIXME
@@ -826,6 +946,8 @@ class Table(LoggingMixin):
         if dim > 2:
             raise ValueError(f'Only 2D data can be tabled! Data is {dim}D')
 
+        stage('convert', data.shape)
+
         # FIXME: make this table base for data manipulation and have separate
         # console formatter for ansi...
         # self._object_array = data
@@ -846,11 +968,17 @@ class Table(LoggingMixin):
         self.subtitle_style = subtitle_style or self.title_style
         self.subtitle_align = subtitle_align or self.title_align
 
-        # get data types of elements for automatic formatting / alignment
+        # get data types of elements for automatic formatting / alignment.
+        # Types of typed arrays are inferred from the dtype, while object
+        # columns are sampled and verified during formatting.
         self.col_data_types = []
+        self._col_types_verified = []
         for col in data.T:
-            use = ~col.mask if np.ma.is_masked(col) else ...
-            self.col_data_types.append(set(map(type, col[use])))
+            types, verified = infer_types(col, dtype, self.type_sample)
+            self.col_data_types.append(types)
+            self._col_types_verified.append(verified)
+
+        stage('types', data.shape)
 
         # headers
         self.col_headers = col_headers
@@ -887,9 +1015,25 @@ class Table(LoggingMixin):
             args=(precision, minimalist, data)
         )
 
-        # calculate column totals if required
+        stage('setup', data.shape)
+
+        # calculate column totals and other aggregates if required
+        aggregates = self.resolve_aggregates(aggregates)
+        if (cols := aggregates.pop('sum', None)) is not None:
+            # sums are displayed in the totals row
+            if totals in (None, False):
+                totals = cols
+            elif totals is not True:
+                totals = [*ensure_list(totals), *ensure_list(cols)]
+
         self.totals = self.get_totals(data, totals)
         self.has_totals = (self.totals is not None)
+        self.aggregates = self.get_aggregates(data, aggregates)
+        self.footer_labels = [*(['Totals'] * self.has_totals),
+                              *map(agg.LABELS.get, self.aggregates)]
+        self.n_footer = len(self.footer_labels)
+
+        stage('aggregate', data.shape)
 
         # get flags
         flags = self.resolve_input(flags, n_cols, 'flags', check_flag)
@@ -914,17 +1058,37 @@ class Table(LoggingMixin):
         elif footnotes:
             self.footnotes = list(footnotes)
 
+        stage('flags', data.shape)
+
         # FIXME: ALL STUFF BELOW HERE SHOULD BE DYNAMIC!!
 
+        # evaluate styling rules on the raw data
+        self.rules = self.resolve_input(rules, n_cols, 'rules', ensure_list)
+        rule_states = {i: [rule.get_states(data[:, i]) for rule in col_rules]
+                       for i, col_rules in self.rules.items()}
+
         # do formatting
         data = self.formatted(data, self.formatters, str(masked), flags, flag_info)
 
+        # apply styling rules
+        for i, states in rule_states.items():
+            for rule, state in zip(self.rules[i], states):
+                data[:, i] = stylize(data[:, i], state, rule.lut)
+
         # add totals row
         if self.has_totals:
             # copy this so we keep totals as numeric types for later work.
             totals = self.formatted(self.totals.copy(), self.formatters, '')
             data = np.vstack((data, totals))
 
+        # add aggregate rows
+        for name, row in self.aggregates.items():
+            formatters = (dict.fromkeys(self.formatters, str)
+                          if name in agg.ANY_TYPE else self.formatters)
+            data = np.vstack((data, self.formatted(row.copy(), formatters, '')))
+
+        stage('format', data.shape)
+
         # column borders
         # print(f'{col_borders = }')
         self.borders = self.resolve_borders(col_borders, frame, n_cols)
@@ -956,10 +1120,12 @@ class Table(LoggingMixin):
         self.borders = np.array(self.borders)
 
         self.whitespace = int(whitespace)
+        stage('headers', self.pre_table.shape)
 
         # summarize / compactify
         self.summary = sm.SummaryTable.from_table_api(self, summary)
         self._idx_shown = self.summary.index_shown
+        stage('summary', self.pre_table.shape)
 
         # Next get column widths (without borders)
         # These are either those input by the user, or determined from the
@@ -967,11 +1133,12 @@ class Table(LoggingMixin):
         if width is None:
             self.col_widths = self.measure_column_widths()  # + self.whitespace
         else:
-            self.col_widths = self.resolve_widths(width)
+            widths = self.resolve_widths(width)
             # if requested widths are smaller than that required to fully
             # display widest item in the column, truncate all too-wide items
             # in that column
-            self.truncate_cells(self.col_widths)
+            self.truncate_cells(widths)
+            self.col_widths = widths
 
         # NOTE: next block needs to happen after `self.col_widths` assigned
         self.inset = None
@@ -1004,6 +1171,8 @@ class Table(LoggingMixin):
                     self.col_widths[next(idx)] += 1
                     d -= 1
 
+        stage('widths', self.pre_table.shape)
+
         # add summarized columns as footnotes if requested
         if (self.summary.loc == 1) and self.summary.items:
             # add footnote table
@@ -1041,8 +1210,9 @@ class Table(LoggingMixin):
             if self.has_col_head:
                 hlines.append(-1)
 
-            if self.has_totals and hlines:
-                hlines.append(n_rows - self.has_col_head - self.has_units - 2)
+            if self.n_footer and hlines:
+                hlines.append(n_rows - self.has_col_head - self.has_units - 1
+                              - self.n_footer)
 
         if self.frame:
             hlines.append(n_rows - self.has_col_head - self.has_units - 1)
@@ -1085,6 +1255,7 @@ class Table(LoggingMixin):
         # self.max_column_width = self.handle_too_wide.get('columns')
 
         self.show_colourbar = False
+        stage('layout', self.pre_table.shape)
 
     def resolve_borders(self, col_borders, frame, n_cols):
         # col borders (rhs)
@@ -1176,7 +1347,7 @@ class Table(LoggingMixin):
 
     @property
     def max_width(self):
-        return self._max_width or get_terminal_size()[0]
+        return self._max_width or terminal.get_width()
 
     @max_width.setter
     def max_width(self, value):
@@ -1245,6 +1416,22 @@ class Table(LoggingMixin):
 
     def get_default_formatter(self, col_idx, precision, short, data):
         """
+        Select a formatter based on the types of objects in the column. If the
+        types were inferred from a sample of the column, the formatter verifies
+        the type of each cell, and falls back to `ppr.PrettyPrinter` for cells
+        of types that were missed by the sample.
+        """
+        fmt = self._get_default_formatter(col_idx, precision, short, data)
+
+        if self._col_types_verified[col_idx]:
+            return fmt
+
+        types = self.col_data_types[col_idx]
+        fallback = ppr.PrettyPrinter(precision=precision, minimalist=short)
+        return TypeGuard(fmt, types, fallback.pformat)
+
+    def _get_default_formatter(self, col_idx, precision, short, data):
+        """
 
         Parameters
         ----------
@@ -1286,7 +1473,7 @@ class Table(LoggingMixin):
         else:  # real numbers
             # if short and (self.align[col_idx] in '<>'):
             #     right_pad = precision + 1
-            sign = (' ' * int(np.any(data[:, col_idx] < 0)))
+            sign = (' ' * int(np.any(as_float(data[:, col_idx]) < 0)))
 
         # print(col_idx,type_, precision, short, sign, right_pad)
 
@@ -1343,6 +1530,9 @@ class Table(LoggingMixin):
         if dot_align:
             result = ppr.align_dot(result)
 
+        if stats.enabled:
+            stats.count('table.cells.formatted', len(result))
+
         return result, used_flags
 
     def formatted(self, data, formatters, masked_str='--', flags=None, flag_info=None):
@@ -1408,18 +1598,27 @@ class Table(LoggingMixin):
             foot_fmt(flag=flag, info=info, grp=grp, hdr=hdr, tbl=self)
         )
 
-    def truncate_cells(self, widths, dots=''):
-        # this will probably be quite slow ...
-        # note textwrap.shorten does this, but won't handle ANSI
+    def truncate_cells(self, widths, dots='', measured=None):
+        """
+        Truncate cells that are wider than the column `widths`. Only columns
+        whose `measured` width (by default the current `col_widths`, if any)
+        exceeds the requested width are measured cell by cell.
+        """
+        widths = np.asarray(widths)
+        n = len(widths)
+        if measured is None:
+            if (measured := getattr(self, 'col_widths', None)) is None:
+                measured = measure_column_widths(self.pre_table[:, :n])
+            else:
+                measured = np.asarray(measured)[:n] - self.whitespace
 
-        ict, = np.where(widths < self.col_widths)
-        # fixme: if cells contain coded strings???
-        ix = lengths(self.pre_table[:, ict]) > widths[ict]
+        for j in np.flatnonzero(measured[:n] > widths):
+            cells = self.pre_table[:, j]
+            too_wide = np.vectorize(get_width, [int])(cells) > widths[j]
+            for i in np.flatnonzero(too_wide):
+                self.pre_table[i, j] = truncate(cells[i], widths[j], dots)
 
-        for l, j, in zip(ix.T, ict):
-            w = widths[j]
-            for i in np.where(l)[0]:
-                self.pre_table[i, j] = truncate(self.pre_table[i, j], w, dots)
+        self.invalidate()
 
     def resolve_widths(self, width):
         # width_min = 0
@@ -1472,6 +1671,9 @@ class Table(LoggingMixin):
         if data is None:
             data = self.pre_table
 
+        if stats.enabled:
+            stats.count('table.cells.measured', np.size(data))
+
         # get width of columns - widest element in column
         w = measure_column_widths(data, count_hidden=count_hidden) + self.whitespace
 
@@ -1558,22 +1760,129 @@ class Table(LoggingMixin):
         if col_indices is True:
             col_indices = np.arange(n_cols)
 
-        totals = np.ma.masked_all(n_cols, 'O')
+        indices = set()
         for i in col_indices:
-            for i in self.resolve_columns(i, n_cols, 'totals'):
-                if totals[i]:
-                    continue
+            indices.update(self.resolve_columns(i, n_cols, 'totals'))
 
-                # attempt to compute total
-                try:
-                    totals[i] = np.sum(list(filter(None, data[:, i])))
-                except Exception as err:
-                    wrn.warn(
-                        f'Could not compute total for column {i} due to the '
-                        f'following exception: {err}')
+        # numeric columns are summed in a single vectorized pass, except
+        # integer columns, which are summed exactly
+        totals = np.ma.masked_all(n_cols, 'O')
+        numeric = [i for i in sorted(indices)
+                   if agg.is_numeric(self.col_data_types[i])]
+        real = []
+        for i in numeric:
+            if self._is_integral(i):
+                totals[i] = _integer_aggregate(data[:, i], 'sum')
+            else:
+                real.append(i)
+
+        if real:
+            sums = agg.aggregate(data[:, real], ['sum'])['sum']
+            for i, total in zip(real, sums):
+                totals[i] = self._cast_aggregate(total, i, 'sum')
+
+        for i in sorted(indices - set(numeric)):
+            # attempt to compute total
+            try:
+                totals[i] = np.sum(list(filter(None, data[:, i])))
+            except Exception as err:
+                wrn.warn(
+                    f'Could not compute total for column {i} due to the '
+                    f'following exception: {err}')
 
         return totals  # np.ma.array(totals, object)
 
+    def resolve_aggregates(self, aggregates):
+        """
+        Resolve requested aggregates to a dict keyed on aggregate names, with
+        values being the columns for which it should be computed (True for all
+        columns).
+        """
+        if not aggregates:
+            return {}
+
+        if isinstance(aggregates, str):
+            aggregates = [aggregates]
+
+        if not isinstance(aggregates, abc.Mapping):
+            aggregates = dict.fromkeys(aggregates, True)
+
+        return {agg.resolve_aggregate(name): cols
+                for name, cols in aggregates.items()}
+
+    def get_aggregates(self, data, aggregates):
+        """
+        Compute aggregates for footer rows. All numeric columns are cast to a
+        typed array once, and all aggregates are computed in a single pass.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            Table data.
+        aggregates : dict
+            Aggregate names mapped to the columns for which they are required.
+            See `resolve_aggregates`.
+
+        Returns
+        -------
+        dict
+            Keys are aggregate names, values are (masked) object arrays with
+            results for each column.
+        """
+        # suppress aggregates for tables with single row
+        if not aggregates or data.shape[0] <= 1:
+            return {}
+
+        n_cols = data.shape[1]
+        numeric = [i for i in range(n_cols)
+                   if agg.is_numeric(self.col_data_types[i])]
+        results = agg.aggregate(data[:, numeric], aggregates) if numeric else {}
+
+        out = {}
+        for name, cols in aggregates.items():
+            if cols is True:
+                cols = range(n_cols)
+
+            indices = set()
+            for i in ensure_list(cols):
+                indices.update(self.resolve_columns(i, n_cols, name))
+
+            row = np.ma.masked_all(n_cols, 'O')
+            for i, value in zip(numeric, results.get(name, ())):
+                if i not in indices or np.isnan(value):
+                    continue
+
+                if name in INTEGER_AGGREGATES and self._is_integral(i):
+                    # exact for integers beyond float precision
+                    row[i] = _integer_aggregate(data[:, i], name)
+                else:
+                    row[i] = self._cast_aggregate(value, i, name)
+
+            if name == 'non-null':
+                # non-numeric columns
+                for i in indices - set(numeric):
+                    col = data[:, i]
+                    row[i] = int(np.sum(~np.ma.getmaskarray(col) &
+                                        (np.ma.getdata(col) != None)))
+            elif name == 'count':
+                for i in indices - set(numeric):
+                    row[i] = data.shape[0]
+
+            out[name] = row
+
+        return out
+
+    def _is_integral(self, i):
+        return all(issubclass(t, numbers.Integral)
+                   for t in self.col_data_types[i])
+
+    def _cast_aggregate(self, value, i, name):
+        # exact integer sums and extrema are computed by `_integer_aggregate`
+        if name in agg.ANY_TYPE:
+            return int(value)
+
+        return value
+
     # @expose.args()
     # @staticmethod
 
@@ -1602,8 +1911,8 @@ class Table(LoggingMixin):
         has_row_head = not_null(row_headers)
         has_col_head = not_null(col_headers)
 
-        if has_row_head and self.has_totals:
-            row_headers = [*row_headers, 'Totals']
+        if has_row_head and self.n_footer:
+            row_headers = [*row_headers, *self.footer_labels]
 
         if has_col_head:
             cheads.append(col_headers)
@@ -1632,15 +1941,83 @@ class Table(LoggingMixin):
             rheads.append([*([self._nrs_header] * has_col_head),
                            *([''] * self.has_units),
                            *np.arange(nr, self.nrows + nr).astype(str),
-                           *([''] * self.has_totals)])
+                           *([''] * self.n_footer)])
 
             self.borders = [self.borders[0], *self.borders]
 
         return rheads, cheads
     # ------------------------------------------------------------------------ #
 
-    def format(self):
-        """Construct the table and return it as as one long str"""
+    def invalidate(self):
+        """Clear the cached rendered output of the table."""
+        self._render_cache = {}
+
+    def __getstate__(self):
+        # Stage hooks and rendered output are local to this process, and are
+        # not pickled (eg. when building xlsx sheets in worker processes).
+        state = self.__dict__.copy()
+        state.update(on_stage=[], _render_cache={})
+        return state
+
+    def _render_key(self):
+        # inputs that determine the layout of the rendered table
+        return (np.asarray(self.col_widths).tobytes(), self.max_width,
+                tuple(self._idx_shown), self.show_colourbar,
+                codes.use_color(), codes.get_depth())
+
+    # ------------------------------------------------------------------------ #
+    def _on_stage(self, name, duration, rows, cols):
+        # record stage duration and dispatch to hooks
+        self.stage_times[name] = self.stage_times.get(name, 0) + duration
+
+        if stats.enabled:
+            stats.add_time(f'table.stage.{name}', duration)
+
+        for hook in (*self.stage_hooks, *self.on_stage):
+            hook(name, duration, rows, cols)
+
+    def get_stage_table(self, **kws):
+        """
+        Table of the time spent in each stage of construction and rendering of
+        this table.
+
+        Returns
+        -------
+        motley.table.Table
+        """
+        total = sum(self.stage_times.values())
+        return Table([(name, duration * 1e3, duration / total if total else 0)
+                      for name, duration in self.stage_times.items()],
+                     title=f'Table stages: {total * 1e3:.3f} ms',
+                     col_headers=('Stage', 'Time (ms)', '%'),
+                     align='<>>',
+                     formatters={'Time (ms)': '{:.3f}'.format,
+                                 '%': '{:.1%}'.format},
+                     **kws)
+
+    def format(self, heading=True):
+        """
+        Construct the table and return it as as one long str. The result is
+        cached and will only be rebuilt if the layout (column widths, maximum
+        width, or shown columns) changes, or if `invalidate` is called.
+
+        Parameters
+        ----------
+        heading: bool or {'title'}, optional
+            Whether to include the heading block. See `_build`.
+        """
+        key = (*self._render_key(), heading)
+        if (table := self._render_cache.get(key)) is None:
+            table = self._format(heading)
+            # building the table may adjust column widths, so we cache the
+            # result on the final layout as well
+            self._render_cache = {key: table,
+                                  (*self._render_key(), heading): table}
+
+        return table
+
+    def _format(self, heading=True):
+        # Construct the table and return it as as one long str
 
         # TODO: truncation
         # here data should be an array of str objects.  To do the
@@ -1651,20 +2028,28 @@ class Table(LoggingMixin):
         table_width = sum(self.col_widths[self._idx_shown] +
                           self.lcb[self._idx_shown]) + 1
 
+        stage = _StageClock(self)
+        shape = (len(self.pre_table), len(self._idx_shown))
         if table_width <= self.max_width:
-            return '\n'.join(self._build())
+            with stats.timer('table._build'):
+                table = '\n'.join(self._build(heading=heading))
+
+            stage('build', shape)
+            return table
 
         # if self.handle_too_wide == 'split':
         # if self.has_title:
         #     self.title += '\n'  # to indicate continuation under title line
         #
-        split_tables = self.split()
+        split_tables = self.split(heading=heading)
 
         if self.show_colourbar:
             split_tables[-1] = self.add_colourbar(split_tables[-1])
+
+        stage('split', shape)
         return '\n\n'.join(split_tables)
 
-    def split(self, max_width=None):
+    def split(self, max_width=None, heading=True):
         # TODO: return Table objects??
 
         max_width = max_width or self.max_width
@@ -1695,9 +2080,12 @@ class Table(LoggingMixin):
             idx_show = np.r_[self._idx_shown[:self.n_head_col],
                              self._idx_shown[splix:endix]]
 
-            split_tables.append(
-                '\n'.join(map(str, self._build(idx_show, not first and bool(splix))))
-            )
+            with stats.timer('table._build'):
+                split_tables.append(
+                    '\n'.join(map(str, self._build(idx_show,
+                                                   not first and bool(splix),
+                                                   heading)))
+                )
 
             if endix is None:
                 break
@@ -1714,7 +2102,7 @@ class Table(LoggingMixin):
 
         # return '\n'.join(title, subtitle
 
-    def _get_heading_lines(self, idx, table_width, continued):
+    def _get_title_lines(self, table_width, continued=False):
         # title
         if self.has_title:
             yield self.make_title(table_width, continued)
@@ -1724,6 +2112,9 @@ class Table(LoggingMixin):
                                         self.subtitle_align,
                                         self.subtitle_style)
 
+    def _get_heading_lines(self, idx, table_width, continued):
+        yield from self._get_title_lines(table_width, continued)
+
         # FIXME: problems with too-wide column
 
         # summarized columns
@@ -1784,7 +2175,7 @@ class Table(LoggingMixin):
 
             yield line
 
-    def _build(self, column_indices=None, continued=False):
+    def _build(self, column_indices=None, continued=False, heading=True):
         """
         Build partial or full table.
 
@@ -1794,6 +2185,11 @@ class Table(LoggingMixin):
             Column indices that will be used
         continued: bool, optional
             whether or not continuation of split table
+        heading: bool or {'title'}, optional
+            Whether to include the heading block (top frame line, title, column
+            groups, column headers and units). If 'title', only the title and
+            subtitle lines are included. This is used to build sections of
+            vertically stacked tables that share the heading of the first.
 
         Returns
         -------
@@ -1804,19 +2200,27 @@ class Table(LoggingMixin):
         part_table = self.pre_table[:, idx]
         table_width = self.get_width(idx)
 
-        if self.frame:
-            # top line
-            # NOTE: ANSI overline not supported (linux terminal) use underlined
-            #  whitespace
-            top_line = _underline(' ' * table_width)
-            table.append(top_line)
-
-        # header block
-        table.extend(self._get_heading_lines(idx, table_width, continued))
-
         # make rows
         start = -(self.has_col_head + self.has_units)
 
+        if heading is True:
+            if self.frame:
+                # top line
+                # NOTE: ANSI overline not supported (linux terminal) use
+                #  underlined whitespace
+                top_line = _underline(' ' * table_width)
+                table.append(top_line)
+
+            # header block
+            table.extend(self._get_heading_lines(idx, table_width, continued))
+        else:
+            if heading == 'title':
+                table.extend(self._get_title_lines(table_width, continued))
+
+            # skip column header rows
+            part_table = part_table[-start:]
+            start = 0
+
         widths = self.col_widths[idx]
         alignment = itt.chain(itt.repeat(self.col_head_align[idx], -start),
                               itt.repeat(self.align[idx]))
@@ -1836,13 +2240,13 @@ class Table(LoggingMixin):
                 table.extend(self.insert_lines(insert, table_width))
                 used.add(i)
 
-            row_props = self.highlight.get(i)
+            row_props = self.highlight.get(i) if codes.use_color() else None
             underline = (i in self.hlines)
-            table.extend(
-                codes.apply(row, row_props)
-                for row in self._row_lines(
-                    row_cells, widths, next(alignment), borders, underline)
-            )
+            rows = self._row_lines(row_cells, widths, next(alignment), borders,
+                                   underline)
+            if row_props:
+                rows = (codes.apply(row, row_props) for row in rows)
+            table.extend(rows)
             # fixme: maybe don't apply to border symbols
 
         # check if all insert lines have been consumed
@@ -1953,7 +2357,10 @@ class Table(LoggingMixin):
         # if (pad := (len(text) - width)) > 0:
         #     width += pad
         # TODO: maybe faster to capture pad sizes when splitting the cell content....
-        width += codes.length_codes(text) + sum(map(unicodedata.combining, text))
+        # cell data may contain codes even when colours are off
+        if '\x1b' in text:
+            width += codes.length_codes(text)
+        width += sum(map(unicodedata.combining, text))
         return self.cell_fmt.format(text, align, width, lhs, rhs)
 
     # def expand_dtype(self, data):
@@ -1989,25 +2396,25 @@ class Table(LoggingMixin):
         #  all remaining higher states will be assigned the same colour
         #
 
-        # increase item size of array dtype to accommodate ansi codes
-        x = self.pre_table.dtype.itemsize // 4
-        self.pre_table = self.pre_table.astype(f'U{x + 15}')
-
         prop_iter = itt.zip_longest(colours, background, fillvalue='default')
-        for i, (txt, bg) in enumerate(prop_iter, 1):
-            where = (states == i)
-            if np.any(where):
-                vapply = np.vectorize(codes.apply)
-                self.data[where] = vapply(self.data[where], txt, bg=bg)
-            self.state_props.append((txt, dict(bg=bg)))
+        props = [(txt, dict(bg=bg)) for txt, bg in prop_iter]
+        self.state_props.extend(props)
+
+        # style all cells in a single pass using pre-rendered codes. State 0
+        # (and any state without properties) is left unstyled
+        styles = [None, *(dict(fg=txt, **kws) for txt, kws in props)]
+        states = np.asarray(states, int)
+        self.states = np.unique(states)
+        lut_index = np.where((states > 0) & (states < len(styles)), states, -1)
+        self.data = stylize(self.data, lut_index, render_lut(styles))
 
         # plonk data into pre_table
         # r0 = int(self.has_col_head)
         # c0 = int(self.has_row_head + self.has_row_nrs)
         # self.pre_table[r0:, c0:] = self.data
 
-        self.states = np.unique(states)
         self.show_colourbar = False
+        self.invalidate()
 
         return self.data
 
@@ -2080,6 +2487,8 @@ class Table(LoggingMixin):
     # to_xlsx = XlsxWriter().write
 
     def to_xlsx(self, path=None, sheet=None, formats=(), widths=(),
-                overwrite=False, **kws):
+                overwrite=False, stream=False, **kws):
         # may need to set widths manually eg. for cells that contain formulae
-        return XlsxWriter(self, widths, **kws).write(path, sheet, formats, overwrite)
+        # stream: use write-only mode for large tables (new file only)
+        return XlsxWriter(self, widths, **kws).write(path, sheet, formats,
+                                                     overwrite, stream)
@@ -1,6 +1,7 @@
 
 
 # std
+import numbers
 import functools as ftl
 from typing import OrderedDict
 from collections import abc, defaultdict
@@ -15,7 +16,7 @@ from recipes import duplicate_if_scalar, pprint as ppr
 from recipes.functionals import always, echo0, raises as bork
 
 # relative
-from .. import codes, formatters
+from .. import codes, formatters, string
 from ..utils import get_width, resolve_alignment
 from .column import resolve_columns
 
@@ -32,12 +33,13 @@ __all__ = ('str2tup',
            'resolve_converters',
            'highlight',
            'truncate',
+           'as_float',
            'is_astropy_table',
            'convert_astropy_table',
            '_underline')
 
 # ---------------------------------------------------------------------------- #
-DOTS = '…'  # single character ellipsis u"\u2026" to indicate truncation
+DOTS = string.DOTS
 
 COL_ALIGN_FUNCS = {'<': np.char.ljust,
                    '>': np.char.rjust}
@@ -348,18 +350,28 @@ def highlight(array, condition, props, formatter=ppr.numeric, **kws):
 
 
 def truncate(item, width, dots=DOTS):
-    # TODO: if DOTS more than 1 chr long
-    cw = 0  # cumulative width
-    s = ''
-    for parts in codes.parse(str(item), named=True):
-        *pre, text, end = parts
-        cw += len(text)
-        if cw > width:
-            s += ''.join((*pre, text[:width - len(dots)], dots, end))
-            break
-
-        s += ''.join(parts)
-    return s
+    """
+    Truncate `item` to at most `width` display columns. ANSI codes are kept
+    balanced, and wide characters are accounted for.
+    """
+    return string.truncate(item, width, dots)
+
+
+def as_float(values):
+    """
+    Convert (possibly masked) object array to float array with nans for masked
+    or non-numeric entries.
+    """
+    mask = np.ma.getmaskarray(values)
+    values = np.ma.getdata(values)
+    try:
+        out = np.array(values, float)
+    except (TypeError, ValueError):
+        out = np.array([float(v) if isinstance(v, numbers.Real) else np.nan
+                        for v in np.ravel(values)]).reshape(np.shape(values))
+
+    out[mask] = np.nan
+    return out
 
 
 # ---------------------------------------------------------------------------- #
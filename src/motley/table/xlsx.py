@@ -3,27 +3,33 @@ Output tables to Excel spreadsheet
 """
 
 # std
+import re
+import pickle
+import itertools as itt
+import functools as ftl
 import contextlib as ctx
 from copy import copy
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 # third-party
 import numpy as np
 import more_itertools as mit
-from openpyxl.cell import Cell
+from loguru import logger
+from openpyxl.utils import get_column_letter
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
 
 # local
 from recipes import op
 from recipes.string import sub
 from recipes.dicts import AttrDict
 from recipes.logging import LoggingMixin
-from recipes.iter import cofilter, duplicates
-from recipes.lists import unique, where_duplicate
+from recipes.lists import unique
 from recipes.string.brackets import BracketParser
-from recipes.utils import duplicate_if_scalar, ensure
+from recipes.utils import ensure
 
 
 # ---------------------------------------------------------------------------- #
@@ -34,6 +40,130 @@ square_brackets = BracketParser('[]')
 _xl_fmt_nondisplay = {'"': '', '@': ''}
 
 
+def cell_range(c0, r0, c1=None, r1=None):
+    """
+    Excel range string for (zero-based) column indices `c0`, `c1` and (one-based)
+    row numbers `r0`, `r1`.
+
+    Examples
+    --------
+    >>> cell_range(0, 1, 27, 10)
+    'A1:AB10'
+    """
+    c1 = c0 if c1 is None else c1
+    r1 = r0 if r1 is None else r1
+    return f'{get_column_letter(c0 + 1)}{r0}:{get_column_letter(c1 + 1)}{r1}'
+
+
+def factorise(values):
+    """
+    Integer codes for the (1D) sequence `values`, such that equal values have
+    equal codes.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'O' and len(set(map(type, values))) == 1:
+        # homogeneous object array: factorise with a typed array
+        typed = np.array(values.tolist())
+        if typed.ndim == 1:
+            values = typed
+
+    if values.dtype.kind != 'O':
+        return np.unique(values, return_inverse=True)[1].ravel()
+
+    # mixed types
+    lookup = {}
+    return np.fromiter((lookup.setdefault(v, len(lookup)) for v in values),
+                       int, len(values))
+
+
+def get_runs(codes):
+    """
+    Start and stop indices (inclusive) of runs of contiguous equal values in
+    the integer array `codes`.
+    """
+    codes = np.asarray(codes)
+    if codes.size == 0:
+        return np.empty((2, 0), int)
+
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    stops = np.r_[starts[1:] - 1, len(codes) - 1]
+    return np.array([starts, stops])
+
+
+def get_row_merges(column, trigger=2):
+    """
+    Runs of duplicate values in `column` that should be merged. Values that
+    occur in more than one (non-contiguous) run are not merged.
+
+    Returns
+    -------
+    np.ndarray
+        Start and stop indices (inclusive) of each run as columns.
+    """
+    codes = factorise(column)
+    starts, stops = get_runs(codes)
+    # number of runs for each distinct value
+    n_runs = np.bincount(codes[starts])[codes[starts]]
+    keep = (n_runs == 1) & (stops - starts + 1 >= max(trigger, 2))
+    return np.array([starts[keep], stops[keep]])
+
+
+def get_cell_merges(data, trigger=2):
+    """
+    Merge regions for (header) rows in the 2D array `data`. Contiguous runs of
+    equal values in each row are merged if they span at least `trigger`
+    columns. Cells are merged downward to the bottom row if all cells below
+    them are empty.
+
+    Returns
+    -------
+    list of tuple
+        (row, col) indices of the (top left, bottom right) corners of the
+        merged regions as (r0, c0, r1, c1).
+    """
+    data = np.atleast_2d(np.array(data, str))
+    nrows, ncols = data.shape
+    blank = (data == '')
+
+    # run boundaries: value changes, and blank cells are never merged across
+    change = np.ones((nrows, ncols), bool)
+    change[:, 1:] = (data[:, 1:] != data[:, :-1]) | blank[:, 1:] | blank[:, :-1]
+
+    # all cells below are blank
+    below = np.ones((nrows, ncols), bool)
+    below[:-1] = np.flip(np.logical_and.accumulate(np.flip(blank[1:], 0), 0), 0)
+
+    merges = []
+    covered = np.zeros(ncols, bool)   # cells covered by merges from above
+    for r in range(nrows):
+        starts = np.flatnonzero(change[r])
+        stops = np.r_[starts[1:] - 1, ncols - 1]
+        sizes = stops - starts + 1
+        down = np.logical_and.reduceat(below[r], starts) & (r < nrows - 1)
+        ok = (down | ((sizes >= trigger) & ((sizes > 1) | (nrows > 1))))
+        ok &= ~(covered[starts] & (sizes == 1))
+        for j, k, s in zip(starts[ok], stops[ok], down[ok]):
+            merges.append((r, j, nrows - 1 if s else r, k))
+            if s:
+                covered[j:k + 1] = True
+
+    return merges
+
+
+def check_overwrite(path, overwrite=False):
+    if Path(path).exists() and not overwrite:
+        raise FileExistsError(f'File at: {path} exists. Overwrite is False.')
+
+
+def get_sum_formulae(columns, ncols, r0, r1):
+    """Row of Excel formulae summing rows `r0` to `r1` for `columns`."""
+    totals = [''] * ncols
+    for i in columns:
+        c = get_column_letter(i + 1)
+        totals[i] = f'=SUM({c}{r0}:{c}{r1})'
+    return totals
+
+
 # class hyperlink:
 #     template = '=HYPERLINK("{}", "{}")'
 
@@ -114,6 +244,41 @@ def set_block_style(cells, **kws):
 #         yield max(hwidth, width, minimum)
 
 
+class _RunTracker:
+    """
+    Track runs of contiguous equal values in a column of streamed rows. Values
+    that occur in more than one run are not merged (as with
+    `XlsxWriter.merge_duplicate_rows`), so only the first run of each value is
+    kept, and memory scales with the number of distinct values.
+    """
+
+    def __init__(self):
+        self.runs = {}      # value -> (start, stop) or None if non-contiguous
+        self.value = None
+        self.start = 0
+        self.n = 0
+
+    def update(self, value):
+        if self.n and value != self.value:
+            self.close()
+            self.start = self.n
+        self.value = value
+        self.n += 1
+
+    def close(self):
+        if self.n > self.start:
+            value = self.value
+            self.runs[value] = None if value in self.runs else (self.start,
+                                                                self.n - 1)
+            self.start = self.n
+
+    def result(self, trigger=2):
+        self.close()
+        for run in self.runs.values():
+            if run and (run[1] - run[0] + 1 >= max(trigger, 2)):
+                yield run
+
+
 class XlsxWriter(LoggingMixin):
 
     # -------------------------------------------------------------------- #
@@ -215,8 +380,10 @@ class XlsxWriter(LoggingMixin):
         # logger.debug(i, header, hwidth, fwidth, width, minimum)
         return max(hwidth, width, minimum)
 
-    def write(self, path, sheet=None, formats=(), overwrite=False):
+    def write(self, path, sheet=None, formats=(), overwrite=False, stream=False):
         # ('rows', 'cells')
+        if stream:
+            return self.stream(path, sheet, formats, overwrite)
 
         if path and Path(path).exists():
             workbook = load_workbook(path)
@@ -249,7 +416,6 @@ class XlsxWriter(LoggingMixin):
 
         table = self.table
         nrows, ncols = table.data.shape
-        j = ncols + 65  # column index: ord(65) == 'A'
 
         # -------------------------------------------------------------------- #
         # headers
@@ -266,15 +432,7 @@ class XlsxWriter(LoggingMixin):
 
         # -------------------------------------------------------------------- #
         # Totals
-        totals = [''] * ncols
-        # HACK
-        if isinstance(table, AttrDict):
-            for i in table.totals:
-                totals[i] = f'=SUM({(c:=i+65):c}{r0}:{c:c}{r})'
-        elif table.totals:
-            for t, i in zip(*cofilter(None, table.totals, range(ncols))):
-                totals[i] = f'=SUM({(c:=i+65):c}{r0}:{c:c}{r})'
-
+        totals = self.get_totals(r0, r)
         if any(totals):
             #           data    row style
             self.append(totals, **self.style['totals'])
@@ -282,18 +440,13 @@ class XlsxWriter(LoggingMixin):
 
         # -------------------------------------------------------------------- #
         # Set number formats
-        formats = {**table.formatters,
-                   **self.table.resolve_input(formats, what='formats')}
-
-        for idx, fmt in formats.items():
-            if isinstance(fmt, str):
-                col = chr(idx + 65)
-                # logger.debug(col, fmt)
-                set_block_style(ws[f'{col}{r0}:{col}{r}'],
-                                number_format=fmt)
+        for idx, fmt in self.get_formats(formats).items():
+            # logger.debug(col, fmt)
+            set_block_style(ws[cell_range(idx, r0, idx, r)],
+                            number_format=fmt)
 
         # style for "data" cells
-        set_block_style(ws[f'A{r0}:{j-1:c}{r}'], **self.style['data'])
+        set_block_style(ws[cell_range(0, r0, ncols - 1, r)], **self.style['data'])
 
         # set col widths
         # double_rows = defaultdict(bool)
@@ -301,7 +454,7 @@ class XlsxWriter(LoggingMixin):
         for idx, width in enumerate(self.col_widths):
             # logger.debug(idx, table.col_headers[idx], width)
 
-            ws.column_dimensions[chr(idx + 65)].width = width
+            ws.column_dimensions[get_column_letter(idx + 1)].width = width
             # double_rows[z] |= ('\n' in table.col_headers[idx])
             # double_rows[z + 1] |= ('\n' in table.col_groups[idx])
 
@@ -311,9 +464,8 @@ class XlsxWriter(LoggingMixin):
 
         # borders
         if table.col_groups:
-            for val, (*_, index) in unique(table.col_groups[0]).items():
-                col = chr(index + 65)
-                set_block_style(ws[f'{col}1:{col}{r}'],
+            for index in self.get_group_edges():
+                set_block_style(ws[cell_range(index, 1, index, r)],
                                 border=Border(right=self.rule2))
 
             # if val in self.merge_unduplicate:
@@ -327,8 +479,8 @@ class XlsxWriter(LoggingMixin):
                     indices = table.resolve_columns(h, table.n_cols, 'merge region')
                     self.merge_duplicate_rows(table.data, r0, indices, nrows)
 
-        if self.bottomrule and not table.totals:
-            set_block_style(ws[f'A{r+1}:{ncols + 64:c}{r+1}'],
+        if self.bottomrule and not any(totals):
+            set_block_style(ws[cell_range(0, r + 1, ncols - 1)],
                             border=Border(top=self.rule2))
 
         if path:
@@ -338,6 +490,95 @@ class XlsxWriter(LoggingMixin):
 
         return workbook
 
+    # ------------------------------------------------------------------------ #
+    # write-only mode
+
+    def stream(self, path, sheet=None, formats=(), overwrite=False, rows=None):
+        """
+        Write the table to a new workbook in write-only mode. Rows are written
+        to file as they are produced, and cells share a small set of named
+        styles instead of each holding its own style copies, so memory use stays
+        flat for very large tables.
+
+        Parameters
+        ----------
+        path : str or Path
+            Output file. Write-only workbooks cannot be appended to, so an
+            existing file at this location is replaced if `overwrite` is True.
+        sheet : str, optional
+            Name of the worksheet.
+        formats : dict, optional
+            Excel number formats for columns.
+        overwrite : bool, optional
+            Whether to replace an existing file, by default False.
+        rows : iterable, optional
+            Rows of data to write, by default the rows of the table data. May be
+            a generator, in which case rows are consumed lazily.
+
+        Returns
+        -------
+        openpyxl.Workbook
+        """
+        check_overwrite(path, overwrite)
+        writer = WorkbookStreamer()
+        self.worksheet = writer.add_sheet(self.get_payload(sheet, formats, rows))
+        return writer.save(path, overwrite)
+
+    def get_payload(self, sheet=None, formats=(), rows=None):
+        """
+        Collect the content and layout of the worksheet for this table: header
+        rows, converted data, number formats, column widths, and merge ranges.
+        Unless `rows` is given, the result contains only plain (picklable)
+        objects, so it can be built in a worker process.
+
+        Returns
+        -------
+        dict
+        """
+        table = self.table
+        nrows, ncols = table.data.shape
+        headers = [list(row) for row in self.get_header_rows()]
+        r0 = len(headers) + 2  # first data row
+
+        # merged header cells
+        # merged title and header cells as (row, col) corners
+        cell_merges = [(1, 0, 1, ncols - 1)] if ncols > 1 else []
+        if 'headers' in self.merge_unduplicate:
+            cell_merges.extend((r + 2, j, s + 2, k)
+                               for r, j, s, k in get_cell_merges(headers))
+
+        # columns for which to merge cells with duplicate values
+        merge_columns = ()
+        if how := (ensure(set, self.merge_unduplicate) - {'headers'}):
+            merge_columns = range(ncols)
+            if 'data' not in how:
+                merge_columns = sorted(
+                    {i for h in how
+                     for i in table.resolve_columns(h, ncols, 'merge region')})
+
+        # data merges can be computed up front unless rows are streamed
+        row_merges = None
+        if rows is None:
+            rows = table.data.tolist()
+            row_merges = [(r0 + j, i, r0 + k, i)
+                          for i in merge_columns
+                          for j, k in get_row_merges(table.data[:, i], nrows).T]
+
+        return dict(sheet=sheet,
+                    title=table.title,
+                    ncols=ncols,
+                    headers=headers,
+                    header_styles=list(self.get_header_styles(len(headers))),
+                    rows=rows,
+                    totals=self.get_total_columns(),
+                    formats=self.get_formats(formats),
+                    widths=self.col_widths.tolist(),
+                    alignments=dict(self.alignments),
+                    edges=sorted(self.get_group_edges()),
+                    cell_merges=cell_merges,
+                    row_merges=row_merges,
+                    merge_columns=list(merge_columns))
+
     def append(self, data, **style):
         if data is None:
             return
@@ -345,7 +586,7 @@ class XlsxWriter(LoggingMixin):
         sheet = self.worksheet
         sheet.append(list(data))
         r = sheet._current_row
-        cells = sheet[f'A{r}:{len(data) + 64:c}{r}'][0]
+        cells = sheet[cell_range(0, r, len(data) - 1)][0]
 
         # if self.alignments:
         for i, cell in enumerate(cells):
@@ -375,7 +616,18 @@ class XlsxWriter(LoggingMixin):
         r = self.worksheet._current_row
 
         # headers
+        headers = self.get_header_rows()
+        styles = self.get_header_styles(len(headers))
+        for row, style in zip(headers, styles):
+            self.make_header_row(row, False, **style)
+
+        if 'headers' in self.merge_unduplicate:
+            # for i, header in enumerate(headers, r + 1):
+            self.merge_duplicate_cells(headers, r + 1)
+
+    def get_header_rows(self):
         # headers = table.get_headers()
+        table = self.table
         cgroups = table.col_groups
         if isinstance(table, AttrDict):
             col_headers = list(map(self.header_formatter, table.col_headers))
@@ -391,26 +643,62 @@ class XlsxWriter(LoggingMixin):
         if table.units:
             headers.append(table.units)
 
-        # final_style = dict(self.style['headers' if table.units else 'headers'])
+        return headers
+
+    def get_header_styles(self, n):
+        # style for each of the `n` header rows
+        table = self.table
         style = dict(self.style['headers'])
-        for i, row in enumerate(headers):
+        for i in range(n):
             if i == 1:
                 f = style['font'] = copy(style.pop('font'))
                 f.size -= 2
 
-            self.make_header_row(row, False, **style)
+            if i == n - 1:
+                # header borders
+                yield {**self.style['units' if table.units or table.col_groups
+                                    else 'headers'],
+                       'border': Border(bottom=self.rule2)}
+            else:
+                yield dict(style)
 
-        # header borders
-        q = self.worksheet._current_row
-        set_block_style(
-            self.worksheet[f'A{q}:{64 + ncols:c}{q}'],
-            **self.style['units' if table.units or cgroups else 'headers'],
-            border=Border(bottom=self.rule2)
-        )
+    def get_total_columns(self):
+        # indices of columns with totals
+        table = self.table
+        # HACK
+        if isinstance(table, AttrDict):
+            return list(table.totals)
 
-        if 'headers' in self.merge_unduplicate:
-            # for i, header in enumerate(headers, r + 1):
-            self.merge_duplicate_cells(headers, r + 1)
+        if table.totals is not None:
+            # masked array with totals for requested columns
+            return np.flatnonzero(~np.ma.getmaskarray(table.totals)).tolist()
+
+        return []
+
+    def get_totals(self, r0, r):
+        # Excel formulae for column totals
+        return get_sum_formulae(self.get_total_columns(), self.table.data.shape[1],
+                                r0, r)
+
+    def get_formats(self, formats=()):
+        # Excel number formats per column
+        formats = {**self.table.formatters,
+                   **self.table.resolve_input(formats, what='formats')}
+        return {idx: fmt for idx, fmt in formats.items() if isinstance(fmt, str)}
+
+    def get_group_edges(self):
+        # index of last column in each column group
+        if self.table.col_groups:
+            for _, (*_, index) in unique(self.table.col_groups[0]).items():
+                yield index
+
+    def merge(self, cells):
+        ws = self.worksheet
+        if hasattr(ws, 'merge_cells'):
+            ws.merge_cells(cells)
+        else:
+            # write-only worksheets only record the merged ranges
+            ws.merged_cells.add(cells)
 
     def make_header_row(self, data, merge_duplicate_cells=2, **style):
         if data is None:
@@ -425,48 +713,20 @@ class XlsxWriter(LoggingMixin):
             self.merge_duplicate_cells(data, r, merge_duplicate_cells)
 
         # set style
-        set_block_style(sheet[f'A{r}:{len(data) + 64:c}{r}'],
+        set_block_style(sheet[cell_range(0, r, len(data) - 1)],
                         **{**self.style['headers'], **style})
 
     def merge_duplicate_cells(self, data, row_index, trigger=2):
 
-        data = np.atleast_2d(data)
         # logger.debug('data = {}.', data)
-
-        nrows, _ = data.shape
         r0 = row_index
         merged = defaultdict(set)
-        for r in range(nrows):
-            r1 = r0 + r
-            row = data[r]
-
-            unique = {}
-            duplicate = dict(duplicates(row))
-            duplicate.pop('', '')
-            if nrows > 1:
-                unique = zip(set(range(len(row))) - set(sum(duplicate.values(), [])))
-
-            to_merge = []
-            for idx in (*duplicate.values(), *unique):
-                if idx := (set(idx) - set(merged[r])):
-                    to_merge.append(idx)
-
-            # logger.debug('Row {}: to_merge {}.', r, to_merge)
-            # select(to_)
-            for idx in to_merge:
-                j, *_, k = duplicate_if_scalar(sorted(idx), raises=False)
-                # logger.debug('{}.', data[r + 1:, j:k + 1])
-                extend_down = np.all(data[r + 1:, j:k + 1] == '')
-                s = (nrows - r - 1) * extend_down
-
-                # logger.debug('{}.', ( ((k - j >= trigger) | s > 0), j, k, trigger, s))
-                if ((k - j + 1 >= trigger) | s > 0):
-                    cells = f'{j+65:c}{r1}:{k+65:c}{r1 + s}'
-                    # logger.debug('merge: {}.', cells)
-                    self.worksheet.merge_cells(cells)
-
-                    for t in range(s + 1):
-                        merged[r + t] |= idx
+        for r, j, s, k in get_cell_merges(data, trigger):
+            cells = cell_range(j, r0 + r, k, r0 + s)
+            # logger.debug('merge: {}.', cells)
+            self.merge(cells)
+            for t in range(r, s + 1):
+                merged[t] |= set(range(j, k + 1))
 
         # logger.debug(row, self.should_double_height(row, merged))
         # if self.should_double_height(data, merged):
@@ -485,18 +745,271 @@ class XlsxWriter(LoggingMixin):
             if (align := self.alignments.get(i)):
                 col_style.update(alignment=align)
 
-            for idx in where_duplicate(col):
-                j, *_, k = idx
-                # logger.debug(idx, j, k + 1)
-                if idx != list(range(j, k + 1)):
-                    # not sorted!
-                    continue
+            for j, k in get_row_merges(col, trigger).T:
+                # logger.debug(f'merging {i:c}{j + r0}:{i:c}{k + r0}')
+                cells = cell_range(i, j + r0, i, k + r0)
+                set_style(self.worksheet[cells.split(':')[0]], **col_style)
+                self.merge(cells)
 
-                if len(idx) < trigger:
-                    continue
 
-                # logger.debug(i, j, k, r0)
-                # logger.debug(f'merging {i:c}{j + r0}:{i:c}{k + r0}')
-                cell0, cell1 = (f'{(c:=i+65):c}{j + r0}', f'{c:c}{k + r0}')
-                set_style(self.worksheet[cell0], **col_style)
-                self.worksheet.merge_cells(f'{cell0}:{cell1}')
+class WorkbookStreamer(LoggingMixin):
+    """
+    Write worksheets from payloads (see `XlsxWriter.get_payload`) to a single
+    write-only workbook. Cell styles are registered once per workbook as named
+    styles that are shared by all cells (and sheets) with the same style.
+    """
+
+    def __init__(self, style=None, bottomrule=None):
+        self.workbook = Workbook(write_only=True)
+        self.style = XlsxWriter.style if style is None else style
+        self.bottomrule = XlsxWriter.bottomrule if bottomrule is None else bottomrule
+        self._named_styles = {}
+
+    def add_sheet(self, payload):
+        """Write the worksheet described by `payload`."""
+
+        ws = self.workbook.create_sheet(payload['sheet'])
+        ncols = payload['ncols']
+        edges = set(payload['edges'])
+
+        self.logger.debug('Streaming sheet {!r}.', ws.title)
+
+        # column widths need to be set before any rows are written
+        for idx, width in enumerate(payload['widths']):
+            ws.column_dimensions[get_column_letter(idx + 1)].width = width
+
+        # -------------------------------------------------------------------- #
+        # title
+        ws.append([self._styled_cell(ws, payload['title'] if i == 0 else None,
+                                     i in edges, **self.style['title'])
+                   for i in range(ncols)])
+
+        # headers
+        for row, style in zip(payload['headers'], payload['header_styles']):
+            style = {**self.style['headers'], **style}
+            ws.append([self._styled_cell(ws, value, i in edges, **style)
+                       for i, value in enumerate(row)])
+
+        # -------------------------------------------------------------------- #
+        # data
+        r0 = len(payload['headers']) + 2  # first data row
+        formats, alignments = payload['formats'], payload['alignments']
+        cells = []
+        for i in range(ncols):
+            style = dict(self.style['data'])
+            if align := alignments.get(i):
+                style['alignment'] = align
+            if i in formats:
+                style['number_format'] = formats[i]
+
+            cells.append(self._styled_cell(ws, None, i in edges, **style))
+
+        # track runs of duplicate values if merges were not computed up front
+        runs = {}
+        if (row_merges := payload['row_merges']) is None:
+            runs = {i: _RunTracker() for i in payload['merge_columns']}
+
+        # the same (styled) cells are re-used for each row, since rows are
+        # serialized as soon as they are appended
+        nrows = 0
+        for nrows, row in enumerate(payload['rows'], 1):
+            for cell, value in zip(cells, row):
+                cell.value = value
+            ws.append(cells)
+
+            for i, tracker in runs.items():
+                tracker.update(row[i])
+
+        r = r0 + nrows - 1  # last data row
+
+        # -------------------------------------------------------------------- #
+        # Totals
+        if payload['totals']:
+            totals = get_sum_formulae(payload['totals'], ncols, r0, r)
+            ws.append([self._styled_cell(ws, value, i in edges,
+                                         **self.style['totals'])
+                       for i, value in enumerate(totals)])
+        elif self.bottomrule:
+            ws.append([self._styled_cell(ws, None, i in edges,
+                                         border=Border(top=XlsxWriter.rule2))
+                       for i in range(ncols)])
+
+        # -------------------------------------------------------------------- #
+        # merged ranges are written at the end of the sheet
+        if row_merges is None:
+            row_merges = [(r0 + j, i, r0 + k, i)
+                          for i, tracker in runs.items()
+                          for j, k in tracker.result(nrows)]
+
+        for r1, c1, r2, c2 in (*payload['cell_merges'], *row_merges):
+            ws.merged_cells.add(cell_range(c1, r1, c2, r2))
+
+        return ws
+
+    def save(self, path, overwrite=False):
+        check_overwrite(path, overwrite)
+        self.workbook.save(path)
+        self.logger.success('Spreadsheet saved at {!s}.', path)
+        return self.workbook
+
+    def _styled_cell(self, ws, value, edge=False, **style):
+        # write-only cell with shared named style
+        cell = WriteOnlyCell(ws, value)
+        cell.style = self._get_named_style(edge, **style)
+        return cell
+
+    def _get_named_style(self, edge=False, **style):
+        if edge:
+            # right border for last column in column group
+            border = style.get('border') or Border()
+            style['border'] = Border(left=border.left, right=XlsxWriter.rule2,
+                                     top=border.top, bottom=border.bottom)
+
+        key = tuple(sorted(style.items()))
+        if (named := self._named_styles.get(key)) is None:
+            named = NamedStyle(f'motley.{len(self._named_styles)}', **style)
+            self._named_styles[key] = named
+            self.workbook.add_named_style(named)
+
+        return named
+
+
+# ---------------------------------------------------------------------------- #
+# batch export
+
+REGEX_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+# Minimum total number of table cells for which `write_sheets` builds sheets in
+# worker processes when the number of workers is not given. This is a
+# conservative default, since small workbooks cannot amortize the cost of
+# starting the pool and sending tables and payloads between processes. Use
+# tests/profiling/bench_xlsx.py to find the break-even point for your data.
+PARALLEL_MIN_CELLS = 500_000
+
+# errors raised by `pickle.dumps` for objects that cannot be pickled
+PICKLING_ERRORS = (pickle.PicklingError, AttributeError, TypeError)
+
+
+def sheet_names(names, n):
+    """
+    Valid, unique Excel worksheet names. Invalid characters are replaced, and
+    names are truncated to the maximum 31 characters allowed.
+    """
+    names = list(names or ())
+    names += [None] * (n - len(names))
+
+    used = set()
+    for i, name in enumerate(names, 1):
+        if name is None:
+            name = f'Sheet{i}'
+
+        name = base = REGEX_INVALID_SHEET_CHARS.sub('_', str(name))[:31] or 'Sheet'
+        for j in itt.count(2):
+            if name.lower() not in used:
+                break
+            suffix = f' ({j})'
+            name = base[:31 - len(suffix)] + suffix
+
+        used.add(name.lower())
+        yield name
+
+
+def _get_payload(table, sheet, formats=(), kws=None):
+    # build the worksheet payload for `table`
+    return XlsxWriter(table, **(kws or {})).get_payload(sheet, formats)
+
+
+def _get_payload_pickled(build, table, sheet):
+    # build the worksheet payload from pickled builder and table (in a worker
+    # process)
+    return pickle.loads(build)(pickle.loads(table), sheet)
+
+
+def write_sheets(path, tables, sheets=(), formats=(), overwrite=False,
+                 workers=1, **kws):
+    """
+    Write several tables to separate sheets of a single workbook. The sheet
+    contents (data conversion, number formats, column widths and merge ranges)
+    can be built concurrently in worker processes, and are written in the
+    order of `tables` with a single save.
+
+    Parameters
+    ----------
+    path : str or Path
+        Output file.
+    tables : sequence of motley.table.Table
+        Tables to export.
+    sheets : sequence of str, optional
+        Worksheet names, by default 'Sheet1', 'Sheet2', ...
+    formats : dict, optional
+        Excel number formats for columns, applied to all tables.
+    overwrite : bool, optional
+        Whether to replace an existing file, by default False.
+    workers : int, optional
+        Number of worker processes. By default (1), sheets are built in the
+        current process. If None, the number of CPUs is used when the tables
+        have at least `PARALLEL_MIN_CELLS` cells in total. Sheets for tables
+        that cannot be pickled (eg. due to local function formatters), and
+        those following them, are built in the current process. Errors raised
+        while building sheets in the workers are propagated.
+    **kws
+        Keyword arguments passed to `XlsxWriter` for each table.
+
+    Returns
+    -------
+    openpyxl.Workbook
+    """
+    check_overwrite(path, overwrite)
+
+    tables = list(tables)
+    sheets = list(sheet_names(sheets, len(tables)))
+    build = ftl.partial(_get_payload, formats=formats, kws=kws)
+    writer = WorkbookStreamer()
+
+    if workers is None:
+        n_cells = sum(table.data.size for table in tables)
+        workers = None if n_cells >= PARALLEL_MIN_CELLS else 1
+
+    done = 0
+    if workers != 1 and len(tables) > 1:
+        done = _write_parallel(writer, build, tables, sheets, workers)
+
+    for payload in map(build, tables[done:], sheets[done:]):
+        writer.add_sheet(payload)
+
+    return writer.save(path, overwrite)
+
+
+def _write_parallel(writer, build, tables, sheets, workers):
+    # Build sheets in worker processes, returning the number of sheets added.
+    # Tables are pickled here before submission, so that pickling errors are
+    # told apart from errors raised in the workers, which propagate. Sheets
+    # from the first table that cannot be pickled onwards are left to the
+    # caller to build in this process. Results are collected in order of
+    # submission, so sheet order is deterministic.
+    try:
+        build = pickle.dumps(build)
+    except PICKLING_ERRORS as err:
+        _warn_sequential(sheets[0], err)
+        return 0
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = []
+        for table, sheet in zip(tables, sheets):
+            try:
+                table = pickle.dumps(table)
+            except PICKLING_ERRORS as err:
+                _warn_sequential(sheet, err)
+                break
+
+            futures.append(pool.submit(_get_payload_pickled, build, table, sheet))
+
+        for future in futures:
+            writer.add_sheet(future.result())
+
+    return len(futures)
+
+
+def _warn_sequential(sheet, err):
+    logger.warning('Could not send worksheet {!r} to worker process due to: '
+                   '{}. Building remaining worksheets sequentially.', sheet, err)
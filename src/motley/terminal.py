@@ -0,0 +1,122 @@
+"""
+Cached terminal geometry.
+
+Querying the terminal size costs a system call, which adds up when rendering
+many tables or boxes in a loop. The size is therefore cached for a short
+time-to-live. Applications that want resizes to take effect immediately can
+opt in to `watch`, which installs a (single, process-wide) SIGWINCH handler
+that invalidates the cache when the terminal is resized. The time-to-live
+still applies in that case, so a handler that is later replaced cannot leave
+a stale size in place.
+"""
+
+
+# std
+import time
+import shutil
+import signal
+import weakref
+import threading
+
+
+# ---------------------------------------------------------------------------- #
+FALLBACK_SIZE = (80, 24)
+
+# geometries invalidated by the resize handler
+_watchers = weakref.WeakSet()
+_installed = False
+
+
+def _on_resize(previous):
+    def handler(signum, frame):
+        for geometry in list(_watchers):
+            geometry.invalidate()
+        if callable(previous):
+            previous(signum, frame)
+    return handler
+
+
+def _install():
+    # install the resize handler once per process
+    global _installed
+
+    if _installed:
+        return True
+
+    sig = getattr(signal, 'SIGWINCH', None)
+    if sig is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    try:
+        signal.signal(sig, _on_resize(signal.getsignal(sig)))
+    except (ValueError, OSError):
+        return False
+
+    _installed = True
+    return True
+
+
+class TerminalGeometry:
+    """
+    Provider for the (cached) terminal size.
+    """
+
+    ttl = 1.0
+    """Seconds before the cached size is refreshed."""
+
+    def __init__(self, ttl=ttl, fallback=FALLBACK_SIZE):
+        self.ttl = float(ttl)
+        self.fallback = tuple(fallback)
+        self._size = None
+        self._stamp = 0
+
+    def get_size(self):
+        """
+        Terminal size as `os.terminal_size` named tuple `(columns, lines)`.
+        """
+        if (self._size is None or
+                time.monotonic() - self._stamp > self.ttl):
+            self._size = shutil.get_terminal_size(self.fallback)
+            self._stamp = time.monotonic()
+
+        return self._size
+
+    def get_width(self):
+        """Number of columns in the terminal."""
+        return self.get_size().columns
+
+    def get_height(self):
+        """Number of lines in the terminal."""
+        return self.get_size().lines
+
+    def invalidate(self, *_):
+        """Discard the cached size so that it is queried again on next use."""
+        self._size = None
+
+    def watch(self):
+        """
+        Invalidate the cache when the terminal is resized. The SIGWINCH handler
+        is installed only once per process, and any previously installed
+        handler is still called. Returns whether the handler is installed. This
+        is only possible from the main thread on platforms that support the
+        signal.
+        """
+        if _install():
+            _watchers.add(self)
+            return True
+        return False
+
+    def unwatch(self):
+        """Stop invalidating the cache on resize."""
+        _watchers.discard(self)
+
+
+# singleton
+geometry = TerminalGeometry()
+
+# API
+get_size = geometry.get_size
+get_width = geometry.get_width
+get_height = geometry.get_height
+invalidate = geometry.invalidate
+watch = geometry.watch
@@ -15,7 +15,7 @@ from recipes.utils import duplicate_if_scalar
 from recipes.string import backspaced, justify
 
 # relative
-from . import apply, format, underline
+from . import apply, underline
 from .utils import get_width, resolve_width
 
 
@@ -300,6 +300,9 @@ BOLD_OK = {'heavy', 'thick', 'bold', 'b', '*'}
 # null singleton for default identification
 EMPTY = object()
 
+# stand-in for the text when pre-rendering line styles
+PLACEHOLDER = '\0'
+
 # ---------------------------------------------------------------------------- #
 
 
@@ -343,6 +346,24 @@ def resolve_linestyle(linestyle):
     return linestyle, heavy
 
 
+def pad(line, width, align='^'):
+    """
+    Pad `line` with whitespace to `width` display columns. Equivalent to
+    `format(line, f'{align}{width}')`, but ignores ANSI codes in the width.
+    """
+    if (space := width - get_width(line)) <= 0:
+        return line
+
+    if align == '<':
+        return line + ' ' * space
+
+    if align == '>':
+        return ' ' * space + line
+
+    left = space // 2
+    return ''.join((' ' * left, line, ' ' * (space - left)))
+
+
 def make_hline(characters, corners, width, color):
     # draw horizontal frame edge
     n = sum((len(s) - unicodedata.combining(s) for s in characters))
@@ -440,11 +461,23 @@ class TextBox:
     #                      '{line: {align}{width}|{style.fg}/{style.bg}}'
     #                      '{right:|{linecolor[3]}}')
 
+    # cache for `for_style`, cleared when new subclasses are defined
+    _style_classes = {}
+
+    def __init_subclass__(cls, **kws):
+        super().__init_subclass__(**kws)
+        TextBox._style_classes.clear()
+
     @classmethod
     def for_style(cls, style):
-        return next((kls for kls in itr.subclasses(cls)
-                     if style in kls._supported_linestyles),
-                    TextBox)
+        key = (cls, style)
+        if (kls := TextBox._style_classes.get(key)) is None:
+            kls = TextBox._style_classes[key] = next(
+                (kls for kls in itr.subclasses(cls)
+                 if style in kls._supported_linestyles),
+                TextBox
+            )
+        return kls
 
     def __init__(self,
                  #  fmt='{text: {align}{width}|{fg}/{bg}}'
@@ -478,10 +511,12 @@ class TextBox:
         linestyles = kws.get('color', linestyles) or ''
         self.linestyles = list(duplicate_if_scalar(linestyles, 4))
 
-        # stylize(line_fmt_template,
-        self.line_fmt = ''.join((apply(left, self.linestyles[0]),
-                                 apply('{line: {align}{width}}', **self.style),
-                                 apply(right, self.linestyles[2])))
+        # Pre-render the escape sequences around each line of text, so that
+        # lines can be emitted by padding and concatenation only
+        styled = apply(PLACEHOLDER, **self.style)
+        style_start, style_end = styled.split(PLACEHOLDER)
+        self._line_start = apply(left, self.linestyles[0]) + style_start
+        self._line_end = style_end + apply(right, self.linestyles[2])
 
     def __call__(self, text='', width=None, height=None, align='^'):
         text = str(text)
@@ -501,15 +536,14 @@ class TextBox:
     #     'mid': '{left:|{linestyles[2]}}{line: {align}{width}}{right:|{linestyles[3]}}'
     # }
 
-    def _iter_lines(self, text, width, align, **kws):
+    def _iter_lines(self, text, width, align):
         width = width - len(self.left) - len(self.right)
-        kws = {**locals(), **vars(self), **kws}
-        kws.pop('self')
         # lc0, lc1 = self.linestyles
         yield make_hline(self.top, self.corners[:2], width, self.linestyles[1])
 
+        start, end = self._line_start, self._line_end
         for line in text.splitlines():
-            yield format(self.line_fmt, **kws, line=line)
+            yield ''.join((start, pad(line, width, align), end))
 
         if self.bottom:
             yield make_hline(self.bottom, self.corners[2:], width, self.linestyles[-1])
@@ -530,7 +564,7 @@ class AnsiBox(TextBox):
                             **kws})
         self.linestyles[2] = (self.linestyles[2], self.style.fg)
 
-    def _iter_lines(self, text, width, align, **kws):
+    def _iter_lines(self, text, width, align):
         itr = super()._iter_lines(text, width, align)
         itr = mit.islice_extended(itr)
         upto = text.count('\n') + bool(self.top) - bool(self.bottom)  # - 1
@@ -550,7 +584,7 @@ class GridFrameBox(AnsiBox):
                                    corners=(' ', MAJOR_TICK_BOTTOM, '', '')),
                             **kws})
 
-    def _iter_lines(self, text, width, align, **kws):
+    def _iter_lines(self, text, width, align):
         bottom = self.bottom
         self.bottom = ' '
         yield from super()._iter_lines(text, width, align)
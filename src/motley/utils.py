@@ -6,7 +6,6 @@ Utility functions and classes.
 # std
 import os
 import numbers
-import functools as ftl
 from collections import abc
 
 # third-party
@@ -16,11 +15,11 @@ from wcwidth import wcswidth
 # local
 from recipes import op, string
 from recipes.dicts import invert
-from recipes.shell import terminal
 from recipes.oo.singleton import Singleton
 
 # relative
-from . import codes, formatter
+from . import codes, formatter, terminal
+from .string import StyledText
 from .codes import utils as ansi
 
 
@@ -38,9 +37,8 @@ def resolve_alignment(align):
     return align
 
 
-@ftl.lru_cache()
 def resolve_width(width):
-    return terminal.get_size()[0] if width is None else int(width)
+    return terminal.get_width() if width is None else int(width)
 
 
 # @ftl.lru_cache()
@@ -68,7 +66,8 @@ def get_width(text, raw=False):
     # length = ansi.length_raw if raw else ansi.length_seen
     # length = ftl.partial(, length_func=length)
     text = str(text)
-    if raw:
+    if raw or (text.isascii() and text.isprintable()):
+        # plain text: display width equals length
         return max(map(len,  text.split(os.linesep)))
 
     # get longest line for cell elements that contain newlines
@@ -155,6 +154,7 @@ class _vstack(Singleton):  # NOTE this could just be a module...
             raise ValueError(f'Cannot stack tables with unequal number of '
                              f'columns: {ncols}.')
 
+        # shared column widths in a single reduction
         col_widths = np.max([tbl.col_widths for tbl in tables], 0)
         return ('\n' * (spacing + 1)).join(
             self._istack(tables, col_widths, strip_headers, strip_titles)
@@ -162,22 +162,19 @@ class _vstack(Singleton):  # NOTE this could just be a module...
 
     def _istack(self, tables, col_widths, strip_headers, strip_titles):
         for i, table in enumerate(tables):
-            yield '\n'.join(
-                self.__istack(i, table, col_widths, strip_headers, strip_titles)
-            )
-
-    def __istack(self, i, table, col_widths, strip_headers, strip_titles):
-        table.col_widths = col_widths  # set all column widths equal
-        nnl = table.n_head_lines * bool(i and strip_headers)
-
-        *head, r = str(table).split('\n', nnl)
-        if head:
-            if not strip_titles:
-                yield from head[table.frame:(-table.n_head_rows or None)]
-            if not strip_headers:
-                yield from head[(table.frame + table.has_title):]
-
-        yield r
+            # only the first table gets the heading
+            heading = True
+            if i and strip_headers:
+                heading = not strip_titles and 'title'
+
+            # render with all column widths equal, restoring the table's own
+            # widths afterwards
+            widths = table.col_widths
+            table.col_widths = col_widths.copy()
+            try:
+                yield table.format(heading)
+            finally:
+                table.col_widths = widths
 
     @staticmethod
     def compact(tables):
@@ -233,7 +230,7 @@ class _vstack(Singleton):  # NOTE this could just be a module...
             tbl = groups[gid]
             braces += ('\n' * bool(i) +
                        vbrace(tbl.data.shape[0], gid) +
-                       '\n' * (tbl.has_totals + vspace))
+                       '\n' * (tbl.n_footer + vspace))
 
         # vertical offset
         offsets = stack[0].n_head_lines
@@ -325,20 +322,24 @@ def overlay(text, background='', align='^', width=None):
     -------
     [type]
         [description]
-
-    Raises
-    ------
-    NotImplementedError
-        [description]
     """
 
-    if ansi.has_ansi(background):
-        raise NotImplementedError(
-            '# FIXME: will not work if background has coded strings')
-
     align = resolve_alignment(align)
+    if not ansi.has_ansi(background):
+        return string.overlay(text, background, align, width)
 
-    return string.overlay(text, background, align, width)
+    # coded background: splice by display column so styles stay balanced
+    background = StyledText(background)
+    width = background.width if width is None else int(width)
+    if background.width < width:
+        background += ' ' * (width - background.width)
+
+    text = StyledText(text)
+    pos = {'<': 0,
+           '>': width - text.width,
+           '^': (width - text.width) // 2}.get(align, 0)
+    pos = max(pos, 0)
+    return str(background[:pos] + text + background[pos + text.width:width])
 
 
 def banner(text, width=None, align='^', fg=None, bg=None, **kws):
@@ -370,10 +371,6 @@ def banner(text, width=None, align='^', fg=None, bg=None, **kws):
 
     from .textbox import textbox
 
-    if width is None:
-        width = terminal.get_size()[0]
-    width = int(width)
-
     # fill whitespace (so background props reflect for entire block of banner)
     # title = f'{text: {align}{width - 2 * len(side)}}'
     width = resolve_width(width)
@@ -0,0 +1,65 @@
+"""
+Compare the cost of formatting with colours disabled to that of plain
+`str.format`, and the cost of rendering a table with colours disabled and
+enabled.
+
+Usage: python bench_color.py [n]
+"""
+
+# std
+import sys
+import timeit
+
+# third-party
+import numpy as np
+
+# local
+import motley
+from motley import codes
+from motley.table import Table
+
+
+def best(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main(n=100_000):
+    words = [f'word{i}' for i in range(100)]
+
+    def plain():
+        for word in words:
+            '{:>10}'.format(word)
+
+    def styled():
+        for word in words:
+            motley.format('{:>10|r}', word)
+
+    def applied():
+        for word in words:
+            codes.apply(word, 'r')
+
+    number = max(n // len(words), 1)
+    base = best(plain, number)
+    print(f'str.format          : {base * 1e6:.1f} μs / {len(words)} words')
+    with codes.color_mode('never'):
+        for name, func in (('motley.format', styled),
+                           ('codes.apply', applied)):
+            elapsed = best(func, number)
+            print(f'{name:<20}: {elapsed * 1e6:.1f} μs '
+                  f'({elapsed / base - 1:+.1%} vs str.format)')
+
+    # table rendering
+    data = np.random.randn(1000, 10)
+    highlight = dict.fromkeys(range(0, 1000, 2), 'g')
+    times = {}
+    for mode in ('always', 'never'):
+        with codes.color_mode(mode):
+            times[mode] = best(
+                lambda: str(Table(data, highlight=highlight)), 1, 3)
+            print(f'table, colour {mode:<6}: {times[mode] * 1e3:.1f} ms')
+
+    print(f'no-colour table: {times["never"] / times["always"] - 1:+.1%}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
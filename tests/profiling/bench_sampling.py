@@ -0,0 +1,57 @@
+"""
+Measure the overhead of the sampling profiler on cpu-bound code, compared to
+running unprofiled and to the instrumenting line profiler.
+
+Usage: python bench_sampling.py [interval]
+"""
+
+# std
+import sys
+import time
+import statistics
+
+# local
+from motley.profiling.core import LineProfiler, SamplingProfiler
+
+
+def work(n=2_000_000):
+    total = 0
+    for i in range(n):
+        total += i % 7
+    return total
+
+
+def timed(repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def overhead(profiler, rounds=5):
+    # interleave runs to even out drifts in machine load
+    ratios = []
+    for _ in range(rounds):
+        base = timed()
+        profiler.enable_by_count()
+        on = timed()
+        profiler.disable_by_count()
+        ratios.append(on / base - 1)
+    return statistics.median(ratios)
+
+
+def main(interval=0.005):
+    sampler = SamplingProfiler(work, interval=interval)
+    print(f'sampling ({interval * 1e3:g} ms): {overhead(sampler):+.2%}')
+    print(f'line profiler: {overhead(LineProfiler(work)):+.2%}')
+
+    # the profile is still meaningful
+    stats = sampler.get_stats()
+    (_, _, func), (lines, total) = next(iter(stats.timings.items()))
+    print(f'{func.__name__}: {total:.3f} s sampled over {len(lines)} lines')
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""
+Compare time and peak memory of the default and write-only (streaming) xlsx
+writers, and the time taken to write several sheets with and without worker
+processes.
+
+Usage: python bench_xlsx.py [n_rows] [n_sheets]
+"""
+
+# std
+import sys
+import time
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+# third-party
+import numpy as np
+
+# local
+from motley.table import Table
+from motley.table.xlsx import write_sheets
+
+
+def make_table(n_rows, n_cols=10):
+    return Table(np.random.randn(n_rows, n_cols),
+                 title='Benchmark',
+                 col_headers=[f'c{i}' for i in range(n_cols)])
+
+
+def bench(table, path, stream):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    table.to_xlsx(path, overwrite=True, stream=stream)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_sheets(tables, path, workers):
+    t0 = time.perf_counter()
+    write_sheets(path, tables, overwrite=True, workers=workers)
+    return time.perf_counter() - t0
+
+
+def main(n_rows=100_000, n_sheets=8):
+    table = make_table(n_rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        for stream in (False, True):
+            path = Path(tmp, f'bench-{stream}.xlsx')
+            elapsed, peak = bench(table, path, stream)
+            print(f'{"stream" if stream else "default":<8}: {n_rows} rows in '
+                  f'{elapsed:.2f} s, peak memory {peak / 2 ** 20:.1f} MiB')
+
+        # multiple sheets, serial vs worker processes
+        tables = [make_table(n_rows // n_sheets) for _ in range(n_sheets)]
+        for workers in (1, None):
+            elapsed = bench_sheets(tables, Path(tmp, 'bench-sheets.xlsx'),
+                                   workers)
+            print(f'{n_sheets} sheets, workers={workers}: {elapsed:.2f} s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
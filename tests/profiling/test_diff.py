@@ -0,0 +1,46 @@
+
+# std
+import io
+
+# local
+from motley.profiling.export import from_dict
+from motley.profiling.printers import ReportDiff
+
+
+SOURCE = ['def work():',
+          '    setup()',
+          '    compute(0.02)',
+          '    return 1']
+EDITED = ['def work():',
+          '    # setup is cached now',
+          '    setup()',
+          '    compute(0.01)',
+          '    return 1']
+
+
+def make_stats(source, times):
+    lines = {str(lnr): [1, t, t, t / sum(times.values()), 0]
+             for lnr, t in times.items()}
+    return from_dict({'unit': 1e-6,
+                      'functions': [{'name': 'work',
+                                     'filename': 'work.py',
+                                     'line': 1,
+                                     'total': sum(times.values()) * 1e-6,
+                                     'lines': lines,
+                                     'source': source}]})
+
+
+def test_align():
+    lookup = ReportDiff._align(SOURCE, 1, EDITED, 1)
+    assert lookup == {1: 1, 3: 2, 4: 3, 5: 4}
+
+
+def test_report_diff():
+    before = make_stats(SOURCE, {2: 500, 3: 2000})
+    after = make_stats(EDITED, {3: 500, 4: 1000})
+
+    stream = io.StringIO()
+    ReportDiff(strip=())(before, after, stream=stream)
+    text = stream.getvalue()
+    assert '2.00×' in text      # compute line twice as fast
+    assert 'Change in total time per function' in text
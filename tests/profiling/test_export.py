@@ -0,0 +1,59 @@
+
+# std
+import json
+import time
+
+# local
+from motley.profiling.core import SamplingProfiler
+from motley.profiling.export import load, save, to_collapsed, to_dict
+
+
+def sleepy():
+    time.sleep(0.02)
+    time.sleep(0.04)
+
+
+def get_stats():
+    profiler = SamplingProfiler(sleepy, interval=0.001)
+    profiler.enable()
+    sleepy()
+    profiler.disable()
+    return profiler.get_stats()
+
+
+def test_json_roundtrip(tmp_path):
+    lstats = get_stats()
+    path = save(lstats, tmp_path / 'profile.json')
+    loaded = load(path)
+
+    assert to_dict(loaded) == to_dict(lstats)
+    (_, start, func), (stats, total) = next(iter(loaded.timings.items()))
+    assert func.__name__ == 'sleepy'
+    assert func.source_block[2][0] == 'def sleepy():'
+
+
+def test_collapsed_speedscope(tmp_path):
+    lstats = get_stats()
+    lines = to_collapsed(lstats).splitlines()
+    assert all(line.startswith('sleepy (test_export.py:') for line in lines)
+
+    path = save(lstats, tmp_path / 'profile.speedscope.json')
+    profile, = json.loads(path.read_text())['profiles']
+    assert profile['unit'] == 'microseconds'
+    assert len(profile['samples']) == len(profile['weights']) == len(lines)
+
+
+def test_speedscope_frame_keys():
+    from motley.profiling.export import from_dict, to_speedscope
+
+    # line 5 of `outer` is the first line of `inner`
+    functions = [{'name': name, 'filename': 'f.py', 'line': start, 'total': 2,
+                  'lines': {str(lnr): [1, 1] for lnr in lines}}
+                 for name, start, lines in (('outer', 1, (2, 5)),
+                                            ('inner', 5, (6, )))]
+    profile = to_speedscope(from_dict({'unit': 1e-6, 'functions': functions}))
+    frames = profile['shared']['frames']
+    assert [frames[i]['name'] for i, _ in profile['profiles'][0]['samples']] == \
+        ['outer', 'outer', 'inner']
+    assert [frames[j]['name'] for _, j in profile['profiles'][0]['samples']] == \
+        ['outer:2', 'outer:5', 'inner:6']
@@ -0,0 +1,36 @@
+
+# local
+from motley.profiling.importtime import get_table, parse, run
+
+
+OUTPUT = '''\
+import time: self [us] | cumulative | imported package
+import time:       200 |        200 |   _io
+import time:       500 |        500 |   posix
+import time:       400 |       1100 | _frozen_importlib_external
+import time:        50 |         50 |     _codecs
+import time:       400 |        450 |   codecs
+import time:       700 |       1150 | encodings
+'''
+
+
+def test_parse():
+    tree = parse(OUTPUT)
+    assert tree.cumulative == 2250
+    assert [node.name for node in tree.children] == \
+        ['_frozen_importlib_external', 'encodings']
+
+    encodings = tree.children[1]
+    codecs, = encodings.children
+    assert (codecs.name, codecs.depth, codecs.self) == ('codecs', 2, 400)
+    assert codecs.children[0].name == '_codecs'
+
+    # ranked by cumulative time, depth limited
+    names = [node.name for node in tree.walk(max_depth=1)]
+    assert names == ['<root>', 'encodings', '_frozen_importlib_external']
+
+
+def test_run():
+    tree = parse(run('json'))
+    assert 'json' in [node.name for node in tree.walk()]
+    assert get_table(tree, max_depth=2, min_time=0.01).data.shape[0] > 1
@@ -0,0 +1,55 @@
+
+# std
+import tracemalloc
+
+# third-party
+import pytest
+
+# local
+from motley.profiling import memory
+from motley.profiling.memory import MemoryProfiler
+from motley.profiling.printers import format_bytes
+
+
+def build(n):
+    keep = []
+    for i in range(n):
+        tmp = bytearray(10_000)
+        keep.append(bytearray(1000))
+    return keep
+
+
+@pytest.mark.parametrize('reset_peak', [True, False])
+def test_memory_profiler(monkeypatch, reset_peak):
+    if not reset_peak:
+        # emulate python < 3.9
+        monkeypatch.setattr(memory, '_reset_peak', None)
+
+    profiler = MemoryProfiler(build)
+    # stats accumulate over calls, tracing stays active until collected
+    result = []
+    for _ in range(2):
+        profiler.enable_by_count()
+        result.extend(build(10))
+        profiler.disable_by_count()
+
+    lstats = profiler.get_stats()
+    assert not tracemalloc.is_tracing()
+    (_, start, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert func is build
+
+    # hits, allocated, net, blocks, fraction of total
+    temporary, retained = stats[start + 3], stats[start + 4]
+    assert temporary[0] == retained[0] == 20
+    assert temporary[1] > 20 * 9000
+    assert retained[2] > 20 * 900
+    assert retained[3] >= 20
+    assert temporary[1] > retained[1]
+    assert total >= temporary[1] + retained[1]
+    del result
+
+
+def test_format_bytes():
+    assert format_bytes(10) == '10 B'
+    assert format_bytes(1536) == '1.5 KiB'
+    assert format_bytes(-3 * 2 ** 20) == '-3.0 MiB'
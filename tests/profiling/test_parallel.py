@@ -0,0 +1,76 @@
+
+# std
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# third-party
+import pytest
+
+# local
+from motley.profiling.parallel import merge, profile_workers
+
+
+def work(x):
+    time.sleep(0.005)
+    return x * x
+
+
+def make_run(times, unit=1e-6):
+    return {'unit': unit,
+            'functions': [{'name': 'work',
+                           'filename': 'work.py',
+                           'line': 1,
+                           'total': sum(times) * unit,
+                           'lines': {str(i): [1, t] for i, t in enumerate(times, 2)},
+                           'source': ['def work():', '    a', '    b']}]}
+
+
+def test_merge():
+    lstats = merge(make_run([1, 3]), make_run([3, 1]), labels=['a', 'b'])
+    (*_, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert func.__name__ == 'work'
+    hits, time, per_hit, foft, fogt, workers = stats[2]
+    assert (hits, time, per_hit, foft) == (2, 4, 2, 0.5)
+    assert workers == {'a': 1, 'b': 3}
+
+
+def test_merge_units():
+    # runs timed with different units are rescaled to the finest unit
+    lstats = merge(make_run([1, 3]), make_run([10, 30], 1e-7), labels=['a', 'b'])
+    (*_, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert lstats.unit == 1e-7
+    assert stats[2][1] == 20
+    assert stats[2][-1] == {'a': 10, 'b': 10}
+    assert total == pytest.approx(8e-6)
+
+
+def test_merge_nested(tmp_path):
+    from motley.profiling.export import load, save
+
+    lstats = merge(merge(make_run([1, 3]), make_run([3, 1]), labels=['a', 'b']),
+                   make_run([2, 2]), labels=['ab', 'c'])
+    (*_, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert stats[2][0] == 3
+    assert stats[2][-1] == {'a': 1, 'b': 3, 'c': 2}
+
+    # per-worker times survive a round trip through json
+    loaded = load(save(lstats, tmp_path / 'merged.json'))
+    (*_, func), (stats, total) = next(iter(loaded.timings.items()))
+    assert stats[2][-1] == {'a': 1, 'b': 3, 'c': 2}
+
+
+def test_merge_zero_timings():
+    lstats = merge(make_run([0, 0]), make_run([0, 0]))
+    (*_, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert stats[2][:5] == (2, 0, 0, 0, 0)
+
+
+def test_profile_workers():
+    with profile_workers(work) as profiler:
+        with ProcessPoolExecutor(2, **profiler.pool_kws) as pool:
+            assert list(pool.map(work, range(10))) == [x * x for x in range(10)]
+
+    (*_, func), (stats, total) = next(iter(profiler.get_stats().timings.items()))
+    assert func.__name__ == 'work'
+    # all calls counted across workers
+    assert max(hits for hits, *_ in stats.values()) == 10
@@ -1,12 +1,15 @@
 # std
+import gc
+import os
 import time
+import weakref
 
 # third-party
 from more_itertools import pairwise
 
 # local
 from motley.profiling import profile
-from motley.profiling.printers import _ast_func_index
+from motley.profiling.printers import _ast_func_index, get_source_block
 
 
 @profile(report='bars')
@@ -106,3 +109,36 @@ sources = [
                         
                         ) -> "??":    "this is the docstring?!?"; 1+1
     ''']
+
+
+def test_source_block():
+    def local(x):
+        return x + 1
+
+    filename, start, lines = get_source_block(local)
+    assert filename == __file__
+    assert lines == ('def local(x):', '    return x + 1')
+
+    # cache does not keep the function alive
+    ref = weakref.ref(local)
+    del local
+    gc.collect()
+    assert ref() is None
+
+
+def test_get_source_block_edited(tmp_path):
+    path = tmp_path / 'edited.py'
+
+    def load(body):
+        path.write_text(f'def func():\n    {body}\n')
+        namespace = {}
+        exec(compile(path.read_text(), str(path), 'exec'), namespace)
+        return namespace['func']
+
+    assert get_source_block(load('return 1'))[2][1] == '    return 1'
+
+    # edits to the file are picked up
+    func = load('return 22')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert get_source_block(func)[2][1] == '    return 22'
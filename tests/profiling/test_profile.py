@@ -0,0 +1,34 @@
+
+# local
+from motley.profiling import profile
+
+
+def test_deferred_report():
+    decorator = profile(mode='sample', every=None)
+    reports = []
+    decorator.printer = reports.append
+
+    @decorator
+    def square(x):
+        return x * x
+
+    for i in range(100):
+        square(i)
+
+    # nothing reported until requested
+    assert reports == []
+    assert decorator.n_calls == 100
+    square.report()
+    assert len(reports) == 1
+
+
+def test_report_every():
+    decorator = profile(mode='sample', every=10)
+    reports = []
+    decorator.printer = reports.append
+
+    square = decorator(lambda x: x * x)
+    for i in range(25):
+        square(i)
+
+    assert len(reports) == 2
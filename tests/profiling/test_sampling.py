@@ -0,0 +1,66 @@
+
+# std
+import sys
+import time
+import threading
+
+# local
+from motley.profiling.core import SamplingProfiler
+
+
+def sleepy():
+    time.sleep(0.02)
+    time.sleep(0.08)
+
+
+def test_sampling_profiler():
+    profiler = SamplingProfiler(sleepy, interval=0.001)
+    profiler.enable_by_count()
+    sleepy()
+    profiler.disable_by_count()
+
+    lstats = profiler.get_stats()
+    (filename, start, func), (stats, total) = next(iter(lstats.timings.items()))
+    assert func is sleepy
+    assert 0.05 < total < 0.5
+
+    # same structure as `LineProfiler.get_stats`: hits, time, per hit,
+    # fraction of function total, fraction of grand total
+    first, second = start + 1, start + 2
+    assert set(stats) <= {first, second}
+    hits, times, per_hit, foft, fogt = stats[second]
+    assert hits > 0
+    assert stats[second][1] > stats[first][1]
+    assert 0 < foft <= 1
+
+
+def recurse(profiler, n):
+    if n:
+        return recurse(profiler, n - 1)
+    profiler.sample({0: sys._getframe()}, 1.)
+
+
+def test_sampling_recursion():
+    # lines of recursive calls are counted once per sample
+    profiler = SamplingProfiler(recurse)
+    recurse(profiler, 3)
+    lines = profiler.samples[recurse.__code__]
+    assert len(lines) == 2
+    assert all(hits == 1 for hits, _ in lines.values())
+
+
+def test_sampling_stats_while_running():
+    profiler = SamplingProfiler(sleepy, interval=0.0001)
+    workers = [threading.Thread(target=sleepy) for _ in range(4)]
+    profiler.enable_by_count()
+    for thread in workers:
+        thread.start()
+
+    # collecting stats while the sampler thread is adding lines
+    while any(thread.is_alive() for thread in workers):
+        profiler.get_stats()
+
+    for thread in workers:
+        thread.join()
+    profiler.disable_by_count()
+    assert profiler.get_stats().timings
@@ -0,0 +1,74 @@
+
+# std
+from types import SimpleNamespace
+
+# third-party
+import pytest
+
+# local
+from motley import codes
+from motley.table.attrs import AttrTable
+
+
+class Items(list):
+    # minimal container with vectorized attribute lookup
+    def attrs(self, *names):
+        return [tuple(getattr(item, name) for name in names) for item in self]
+
+
+class Groups(dict):
+    # minimal grouped containers
+    group_id = ((), {})
+
+    def varies_by(self, key):
+        return True
+
+
+def make_items(*values):
+    return Items(SimpleNamespace(a=value, b=2 * value) for value in values)
+
+
+def test_grouped_table():
+    table = AttrTable(['a', 'b'],
+                      formatters={'a': str, 'b': str},
+                      flags={'a': lambda item: '*' if item.a > 2 else '',
+                             'b': ['', '†', '']})
+    groups = Groups(one=make_items(1, 2), none=Items(), two=make_items(3))
+    tbl = table.get_grouped_table(groups)
+
+    # single table with the rows of all groups
+    assert tbl.data.shape == (3, 2)
+    text = codes.strip(str(tbl))
+    assert text.index('one') < text.index('none') < text.index('EMPTY') < \
+        text.index('two')
+
+    # callable flags are evaluated per item, static flags once for all rows
+    assert '3*' in text
+    assert '4†' in text
+    assert '2†' not in text
+    assert '6†' not in text
+
+
+def test_grouped_table_empty():
+    table = AttrTable(['a', 'b'])
+    tbl = table.get_grouped_table(Groups(one=Items(), two=None))
+    assert 'EMPTY' in codes.strip(str(tbl))
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_to_xlsx_sheets(tmp_path, workers):
+    from openpyxl import load_workbook
+
+    table = AttrTable(['a', 'b'], title='Items')
+    groups = {'one': make_items(1, 2),
+              'two': make_items(3),
+              'none': Items()}
+    path = tmp_path / 'groups.xlsx'
+    table.to_xlsx_sheets(path, groups, workers=workers)
+
+    # empty groups are skipped
+    book = load_workbook(path)
+    assert book.sheetnames == ['one', 'two']
+    assert {1, 2} <= {cell.value for cell in book['one']['A']}
+    assert {3, 6} <= {cell.value for row in book['two'].iter_rows()
+                      for cell in row}
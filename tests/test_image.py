@@ -2,10 +2,14 @@
 import pytest
 import numpy as np
 from loguru import logger
+from matplotlib import colormaps
+from matplotlib.colors import Normalize
 from scipy.stats import multivariate_normal
 
 # local
-from motley.image import AnsiImage
+from motley import codes
+from motley.image import (AnsiImage, get_level_index, get_lut, stack,
+                          thumbnails)
 from recipes.testing import Expected, mock
 
 
@@ -58,6 +62,60 @@ test_display = Expected(format_with_overlay)({
         '\x1b[;4m  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓  ⃓\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84;4;31m  \x1b[0m\x1b[;48;2;68;1;84;4;31m  \x1b[0m\x1b[;48;2;68;2;85m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84;4;31m  \x1b[0m\x1b[;48;2;68;1;84;4;31m  \x1b[0m\x1b[;48;2;70;9;92;4;31m  \x1b[0m\x1b[31;48;2;71;22;105m▏ \x1b[0m\x1b[31;48;2;71;22;105m ▕\x1b[0m\x1b[;48;2;70;9;92m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84;4;31m  \x1b[0m\x1b[31;48;2;70;14;97m▏ \x1b[0m\x1b[;48;2;66;64;133m  \x1b[0m\x1b[;48;2;42;119;142m  \x1b[0m\x1b[;48;2;49;102;141m  \x1b[0m\x1b[;48;2;71;38;118;4;31m ▕\x1b[0m\x1b[;48;2;69;5;88m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;69;5;88;4;31m  \x1b[0m\x1b[31;48;2;70;45;124m▏ \x1b[0m\x1b[;48;2;31;161;135m  \x1b[0m\x1b[;48;2;253;231;36m  \x1b[0m\x1b[;48;2;62;188;115m  \x1b[0m\x1b[;48;2;66;64;133;4;31m ▕\x1b[0m\x1b[;48;2;69;8;91m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;69;8;91;4;31m  \x1b[0m\x1b[31;48;2;66;64;133m▏ \x1b[0m\x1b[;48;2;62;188;115m  \x1b[0m\x1b[;48;2;253;231;36m  \x1b[0m\x1b[;48;2;31;161;135m  \x1b[0m\x1b[;48;2;70;45;124;4;31m ▕\x1b[0m\x1b[;48;2;69;5;88m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;69;5;88m  \x1b[0m\x1b[31;48;2;71;38;118m▏ \x1b[0m\x1b[;48;2;49;102;141m  \x1b[0m\x1b[;48;2;42;119;142;4;31m  \x1b[0m\x1b[;48;2;66;64;133;4;31m  \x1b[0m\x1b[;48;2;70;14;97;4;31m ▕\x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;70;9;92m  \x1b[0m\x1b[;48;2;71;22;105;4;31m▏ \x1b[0m\x1b[;48;2;71;22;105;4;31m ▕\x1b[0m\x1b[;48;2;70;9;92m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4m▕\x1b[0m\x1b[;48;2;68;2;85m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;48;2;68;1;84m  \x1b[0m\x1b[;4m▏\x1b[0m\n\x1b[;4;4m▕\x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;48;2;68;1;84;4m  \x1b[0m\x1b[;4;4m▏\x1b[0m\n ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ ᑊ',
 })
 
+
+def render_pixels(data, cmap, clim):
+    # reference: resolve the codes for each pixel individually
+    data = Normalize(*clim)(data)
+    rgb = cmap(np.ma.ravel(data), bytes=True)[..., :3]
+    return np.reshape([codes.apply('  ', bg=_) for _ in rgb], data.shape)
+
+
+def test_lut():
+    cmap = colormaps.get_cmap('viridis')
+    clim = (0, 1)
+    # includes bad (nan and masked), under and over values
+    data = np.ma.array([[0., 0.5, 1.],
+                        [-1., 2., np.nan],
+                        [0.25, 0.75, 0.3]],
+                       mask=[[0, 0, 0],
+                             [0, 0, 0],
+                             [0, 0, 1]])
+
+    with codes.color_depth(24):
+        lut = get_lut(cmap)
+        pixels = lut[get_level_index(Normalize(*clim)(data), cmap.N)]
+        np.testing.assert_array_equal(pixels, render_pixels(data, cmap, clim))
+
+        image = data.filled(np.nan)
+        img = AnsiImage(image, cmap, clim=clim)
+        np.testing.assert_array_equal(img.pixels,
+                                      render_pixels(image[::-1], cmap, clim))
+
+
+def test_thumbnails_clim():
+    cmap = colormaps.get_cmap('viridis')
+    images = [np.array([[0., 1.],
+                        [2., np.nan]]),
+              np.array([[0., 4.],
+                        [-1., 8.]])]
+    origins = [(0, 0)] * len(images)
+
+    with codes.color_depth(24):
+        # common colour limits for the stack
+        clim = (0, 4)
+        thumbs = thumbnails(images, origins=origins, cmap=cmap, frame=False,
+                            clim=clim)
+        assert thumbs == [stack(render_pixels(image[::-1], cmap, clim))
+                          for image in images]
+
+        # limits resolved once for the whole stack: equal values have equal
+        # colours in all images
+        thumbs = thumbnails(images, origins=origins, cmap=cmap, frame=False,
+                            clim=True)
+        first = [thumb.splitlines()[-1].split(codes.END)[0] for thumb in thumbs]
+        assert first[0] == first[1]
+
+
 # logger.enable('motley')
 FRAMES = ('', '_', '-', '=', '+', '[', 'E')
 
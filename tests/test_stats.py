@@ -0,0 +1,53 @@
+
+# third-party
+import pytest
+
+# local
+from motley import codes, stats
+from motley.table import Table
+
+
+@pytest.fixture(autouse=True)
+def restore():
+    yield
+    stats.disable()
+    stats.reset()
+
+
+def test_disabled():
+    stats.reset()
+    codes.apply('hello', 'r')
+    assert not stats.counters
+    assert not stats.timers
+
+
+def test_collect():
+    with codes.color_mode('always'), stats.collect() as (counters, timers):
+        out = codes.apply('hello', 'r', bg='k')
+        codes.apply('world', 'r', bg='k')
+
+    assert not stats.enabled
+    assert counters['codes.apply'] == 2
+    assert counters['codes.apply.bytes'] == 2 * len(out.encode())
+    assert counters['codes.resolve'] == 2
+    assert counters['codes.resolve.cache_hits'] >= 1
+    assert not timers
+
+
+def test_cache_numeric_styles():
+    # equal, but not identical, rgb values should not share a cache entry
+    with codes.color_depth(24):
+        assert codes.get(fg=(1, 0, 0)) != codes.get(fg=(1., 0, 0))
+
+
+def test_table_stats():
+    with stats.collect() as (counters, timers):
+        str(Table([[1, 2.5], [3, 4.5]], formatters={1: '{:.2f}'.format}))
+
+    assert counters['table.cells.formatted'] >= 2
+    assert counters['table.cells.measured'] >= 4
+    assert timers['table._build'][0] == 1
+
+    table = stats.get_table()
+    assert isinstance(table, Table)
+    assert 'table._build' in str(table)
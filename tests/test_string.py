@@ -0,0 +1,109 @@
+# local
+import motley
+from motley.string import StyledText
+
+
+# ---------------------------------------------------------------------------- #
+
+def test_styled_text_render():
+    s = StyledText('Hello', 'r') + ' ' + StyledText('world', 'B', bg='g')
+    assert str(s) == motley.red('Hello') + ' ' + motley.codes.apply('world', 'B', bg='g')
+    assert s.width == 11
+    assert s.plain == 'Hello world'
+
+
+def test_styled_text_slice():
+    s = StyledText('Hello', 'r') + ' ' + StyledText('world', 'B')
+    assert s[6:] == StyledText('world', 'B')
+    assert s[3:7].plain == 'lo w'
+    assert s[-1].plain == 'd'
+
+
+def test_styled_text_width():
+    s = StyledText(motley.red('ab\tc') + '\n日本')
+    assert s.width == 7
+    assert s[:s.width].plain == s.plain
+    assert s[3:].plain == '\n日本'
+
+
+def test_styled_text_eq_hash():
+    s = StyledText('hi', 'r')
+    assert s == StyledText(motley.red('hi'))
+    assert hash(s) == hash(StyledText(motley.red('hi')))
+    assert s != str(s)
+    assert len({s, str(s)}) == 2
+
+
+def test_styled_text_eq_effects():
+    # constructed, restyled and parsed text with the same styles are equal
+    expected = StyledText(motley.codes.apply('x', 'r', 'B'))
+    assert StyledText('x', 'r', 'B') == expected
+    assert StyledText('x', 'B', 'r') == expected
+    assert StyledText('x', 'r').style('B') == expected
+    assert StyledText(motley.red('x'), 'B') == expected
+    assert StyledText('x', 'r', 'B', bg='g') == \
+        StyledText(motley.codes.apply('x', 'B', 'r', bg='g'))
+
+
+def test_styled_text_concat():
+    s = StyledText('')
+    for _ in range(10_000):
+        s += StyledText('x', 'r')
+    assert s.width == 10_000
+    assert len(s.spans) == 1
+
+
+def test_styled_text_parse():
+    s = StyledText(motley.red('hi') + ' there')
+    assert s.spans[1] == (' there', 0)
+    assert str(s) == motley.red('hi') + ' there'
+
+
+def test_styled_text_parse_multiline():
+    s = StyledText(motley.red('ab\nabcd'))
+    assert s.plain == 'ab\nabcd'
+    assert s.spans[0][1] != 0
+
+
+def test_styled_text_parse_extended_colours():
+    from motley.string import _STYLES
+
+    # zeros in extended colour arguments are not resets
+    for params in ('38;5;0', '38;2;255;0;128', '48;2;0;0;0'):
+        s = StyledText(f'\x1b[;{params}mhi\x1b[0m there')
+        assert _STYLES[s.spans[0][1]] == params
+        assert s.spans[1] == (' there', 0)
+
+    s = StyledText('\x1b[1;38;5;0;0;31mhi')
+    assert _STYLES[s.spans[0][1]] == '31'
+
+
+# ---------------------------------------------------------------------------- #
+
+def test_truncate():
+    from motley.string import truncate
+
+    assert truncate('hello world', 8) == 'hello w…'
+    assert truncate('hello', 8) == 'hello'
+    assert truncate('日本語のテキスト', 7) == '日本語…'
+    assert truncate(motley.red('hello world'), 8) == motley.red('hello w…')
+    assert truncate(motley.red('line one\nline two'), 6) == '\n'.join(
+        [motley.red('line …')] * 2)
+
+
+def test_slice_columns():
+    from motley.string import slice_columns
+
+    assert slice_columns(motley.red('hello world'), 6) == motley.red('world')
+    assert slice_columns('日本語', 2, 4) == '本'
+
+
+def test_wrap():
+    from motley.string import get_width, wrap
+
+    assert wrap('the quick brown fox', 10) == ['the quick', 'brown fox']
+    assert wrap('日本語のテキスト', 5) == ['日本', '語の', 'テキ', 'スト']
+    lines = wrap(motley.red('the quick brown') + ' fox jumps over', 10)
+    assert [motley.codes.strip(line) for line in lines] == \
+        ['the quick', 'brown fox', 'jumps over']
+    assert max(map(get_width, lines)) <= 10
@@ -1,9 +1,16 @@
 
+# std
+import datetime
+
 # third-party
+import pytest
 import numpy as np
 
 # local
+from motley import codes
+from motley.utils import vstack
 from motley.table import Table
+from motley.table.rules import ColourMap, Mask, Rule, Threshold
 
 
 def random_words(word_size, n_words, ord_range=(97, 122)):
@@ -18,6 +25,245 @@ def test_formatters_mixed():
           col_headers=['one', 'two'],
           formatters={0: str, 'two': '{:.3f}'.format})
 
+
+def test_rules():
+    data = np.array([[-1., 0.5],
+                     [2., 3.]])
+    tbl = Table(data, rules={0: Threshold(0, ['r', None]),
+                             1: [ColourMap(), Mask(data[:, 1] > 1, 'B')]})
+    cell = tbl.pre_table[0, 0]
+    assert cell == codes.apply(codes.strip(cell), 'r')
+    assert not codes.has_ansi(tbl.pre_table[1, 0])
+    assert tbl.pre_table[1, 1].count('\x1b[;') == 1
+    assert ';1m' in tbl.pre_table[1, 1]
+
+
+def test_rule_abstract():
+    with pytest.raises(TypeError):
+        Rule()
+
+
+def test_highlight_cells_states():
+    tbl = Table([list('abc'), list('def')])
+    tbl.highlight_cells(np.array([[0, 1, 2],
+                                  [5, 1, 0]]), ['r', 'g'])
+    # states are kept as given, including those without colours
+    assert tbl.states.tolist() == [0, 1, 2, 5]
+    assert codes.has_ansi(tbl.data[0, 1])
+    assert not codes.has_ansi(tbl.data[1, 0])
+    assert not codes.has_ansi(tbl.data[1, 2])
+
+
+def test_aggregates():
+    data = np.array([[1, 2.5],
+                     [3, 0.5],
+                     [5, 1.0]], 'O')
+    tbl = Table(data, totals=True, aggregates=['mean', 'max', 'count'],
+                row_headers=list('abc'))
+    assert tbl.totals.tolist() == [9, 4.0]
+    assert list(tbl.aggregates) == ['mean', 'max', 'count']
+    assert tbl.aggregates['max'][0] == 5
+    assert tbl.aggregates['count'].tolist() == [3, 3]
+    assert tbl.footer_labels == ['Totals', 'Mean', 'Max', 'Count']
+    assert tbl.n_footer == 4
+
+
+def test_aggregates_exact_integers():
+    big = 2 ** 53
+    data = np.array([[big + 1, 0.5],
+                     [1, 0.5]], 'O')
+    tbl = Table(data, totals=True, aggregates=['min', 'max'])
+    assert tbl.totals[0] == big + 2
+    assert isinstance(tbl.totals[0], int)
+    assert tbl.aggregates['max'][0] == big + 1
+    assert tbl.aggregates['min'][0] == 1
+
+
+def test_accumulator():
+    from motley.table.aggregate import Accumulator, aggregate
+
+    data = np.random.randn(100, 3)
+    acc = Accumulator(3)
+    for row in data:
+        acc.update(row)
+
+    expected = aggregate(data, ['mean', 'std', 'min', 'max'])
+    for name, values in expected.items():
+        np.testing.assert_allclose(acc.result(name), values)
+    np.testing.assert_allclose(expected['std'], data.std(0))
+
+
+def test_type_inference():
+    from motley.table.column import infer_types
+
+    assert infer_types(np.arange(5.)) == ({float}, True)
+    assert infer_types(np.array(['a', 'b'])) == ({str}, True)
+    assert infer_types(np.arange(5.).astype('O'), sample=2) == ({float}, False)
+
+    # offending cell missed by the sample falls back to pretty printer
+    data = np.arange(10, dtype=float).astype('O')
+    data[3] = 'three'
+
+    class Sampled(Table):
+        type_sample = 3
+
+    tbl = Sampled(data[:, None])
+    assert tbl.col_data_types[0] == {float}
+    assert codes.strip(tbl.pre_table[3, 0]).strip() == 'three'
+
+    # mixed types in the sample are also verified for each cell
+    data = np.array([1, 2.5, 3, 4.5, 'five', 6, 7.5], 'O')
+    tbl = Sampled(data[:, None])
+    assert tbl.col_data_types[0] == {int, float}
+    assert codes.strip(tbl.pre_table[4, 0]).strip() == 'five'
+
+
+@pytest.mark.parametrize('dtype, type_', [('M8[s]', datetime.datetime),
+                                          ('M8[D]', datetime.date),
+                                          ('M8[ns]', np.datetime64),
+                                          ('m8[s]', datetime.timedelta),
+                                          ('m8[ns]', np.timedelta64)])
+def test_type_inference_datetime(dtype, type_):
+    from motley.table.column import infer_types
+
+    data = np.array([1, 2], dtype)
+    assert infer_types(data) == ({type_}, True)
+
+    # cells keep the inferred type
+    tbl = Table(data[:, None])
+    assert tbl.col_data_types[0] == {type_}
+    assert {type(cell) for cell in tbl.data[:, 0]} == {type_}
+
+
+def test_truncate_cells():
+    tbl = Table([['abcdefgh', 'xy'], ['abc', 'z']], width=[4, 5])
+    cells = {codes.strip(cell).strip() for cell in tbl.pre_table.ravel()}
+    assert 'abcd' in cells
+    assert 'abcdefgh' not in cells
+
+    # only the narrowed column is touched
+    tbl.truncate_cells([2, 5])
+    cells = {codes.strip(cell).strip() for cell in tbl.pre_table.ravel()}
+    assert {'ab', 'xy', 'z'} <= cells
+
+
+def test_ansi_data_color_off():
+    # codes already in the data are compensated for when colours are off
+    data = [[codes.apply('foo', 'r'), 1],
+            ['barbaz', 2]]
+    with codes.color_mode('never'):
+        text = str(Table(data))
+
+    lines = [line for line in codes.strip(text).splitlines() if line.strip()]
+    assert len({len(line) for line in lines}) == 1
+
+
+def test_render_cache():
+    tbl = Table(np.random.randn(3, 3), title='Cached')
+    first = str(tbl)
+    assert str(tbl) is first
+
+    # changing layout re-renders
+    tbl.col_widths = tbl.col_widths + 1
+    assert str(tbl) != first
+
+    # setters invalidate
+    tbl.title = 'New'
+    assert 'New' in str(tbl)
+
+    # in-place changes require explicit invalidation
+    before = str(tbl)
+    tbl.highlight[0] = 'r'
+    assert str(tbl) is before
+    tbl.invalidate()
+    assert str(tbl) != before
+
+    # direct changes to the cell data and layout attributes invalidate
+    before = str(tbl)
+    pre_table = tbl.pre_table.copy()
+    pre_table[-1, -1] = 'xyz'
+    tbl.pre_table = pre_table
+    assert 'xyz' in str(tbl)
+
+    before = str(tbl)
+    tbl.align = np.array(list('>' * len(tbl.align)), 'U1')
+    assert str(tbl) is not before
+
+    # tables do not share rendered output
+    other = Table(np.random.randn(3, 3), title='Cached')
+    assert other._render_cache is not tbl._render_cache
+
+
+def test_stage_hooks():
+    calls = []
+    tbl = Table(np.random.randn(4, 3), title='Stages',
+                on_stage=lambda *args: calls.append(args))
+    str(tbl)
+
+    names = [name for name, *_ in calls]
+    assert names[:2] == ['convert', 'types']
+    assert names[-2:] == ['layout', 'build']
+    assert calls[0][2:] == (4, 3)
+    assert all(duration >= 0 for _, duration, *_ in calls)
+
+    # cached render does not rebuild
+    str(tbl)
+    assert len(calls) == len(names)
+
+    assert set(tbl.stage_times) == set(names)
+    assert 'build' in str(tbl.get_stage_table())
+
+
+def test_vstack():
+    tables = [Table(np.random.randn(n, 3), title=f'Group {n}',
+                    col_headers=['a', 'b', 'c'])
+              for n in (1, 3, 2)]
+    widths = [tbl.col_widths.copy() for tbl in tables]
+    text = codes.strip(vstack(tables, strip_titles=False))
+
+    # input tables keep their own widths
+    assert all((tbl.col_widths == w).all() for tbl, w in zip(tables, widths))
+
+    # headings rendered once, titles for each section
+    assert text.count('Group') == 3
+    heads = [line for line in text.splitlines()
+             if line.strip('⎢⎥⎪ ').split() and
+             set(line.strip('⎢⎥⎪ ').replace('⎪', ' ').split()) == {'a', 'b', 'c'}]
+    assert len(heads) == 1
+
+    # shared column widths
+    widths = {len(line) for line in text.splitlines() if line.strip()}
+    assert len(widths) == 1
+
+
+def test_vstack_split():
+    # over-wide stacked tables are still split to the maximum width
+    tables = [Table(np.random.randn(2, 30), col_headers=list(map(str, range(30))))
+              for _ in range(2)]
+    for tbl in tables:
+        tbl.max_width = 80
+
+    text = codes.strip(vstack(tables))
+    assert max(map(len, text.splitlines())) <= 80
+
+
+def test_xlsx_stream(tmp_path):
+    from openpyxl import load_workbook
+
+    n_cols = 30  # more than 26 columns
+    data = np.arange(5 * n_cols).reshape(5, n_cols)
+    tbl = Table(data, title='Stream', col_headers=[f'c{i}' for i in range(n_cols)],
+                totals=[0])
+    path = tmp_path / 'stream.xlsx'
+    tbl.to_xlsx(path, stream=True)
+
+    ws = load_workbook(path).active
+    assert ws['A1'].value == 'Stream'
+    assert 'A1:AD1' in ws.merged_cells
+    assert ws['AD3'].value == data[0, -1]
+    assert ws['A8'].value == '=SUM(A3:A7)'
+    assert ws['A3'].style == ws['A7'].style
+
 # TODO: loads more basic tests to showcase functionality
 
 # TODO: automated way of looping through all possible argument combinations
@@ -0,0 +1,53 @@
+
+# local
+from motley.terminal import TerminalGeometry
+
+
+def test_terminal_geometry(monkeypatch):
+    monkeypatch.setenv('COLUMNS', '123')
+    monkeypatch.setenv('LINES', '45')
+
+    geometry = TerminalGeometry(ttl=60)
+    assert geometry.get_size() == (123, 45)
+
+    # cached until invalidated
+    monkeypatch.setenv('COLUMNS', '77')
+    assert geometry.get_width() == 123
+    geometry.invalidate()
+    assert geometry.get_width() == 77
+
+
+def test_terminal_geometry_ttl(monkeypatch):
+    monkeypatch.setenv('COLUMNS', '100')
+    geometry = TerminalGeometry(ttl=0)
+
+    assert geometry.get_width() == 100
+    monkeypatch.setenv('COLUMNS', '90')
+    assert geometry.get_width() == 90
+
+
+def test_terminal_watch(monkeypatch):
+    import signal
+
+    from motley import terminal
+
+    if not hasattr(signal, 'SIGWINCH'):
+        return
+
+    previous = signal.getsignal(signal.SIGWINCH)
+    monkeypatch.setattr(terminal, '_installed', False)
+    try:
+        monkeypatch.setenv('COLUMNS', '100')
+        geometries = [TerminalGeometry(ttl=60) for _ in range(3)]
+        assert all(geometry.watch() for geometry in geometries)
+        # a single handler for all instances
+        handler = signal.getsignal(signal.SIGWINCH)
+        assert geometries[0].watch()
+        assert signal.getsignal(signal.SIGWINCH) is handler
+
+        assert geometries[0].get_width() == 100
+        monkeypatch.setenv('COLUMNS', '90')
+        handler(signal.SIGWINCH, None)
+        assert geometries[0].get_width() == 90
+    finally:
+        signal.signal(signal.SIGWINCH, previous)
@@ -1,4 +1,5 @@
-from motley.textbox import textbox
+from motley import codes
+from motley.textbox import CORNERS, GridFrameBox, TextBox, textbox
 from recipes.testing import Expected, mock
 
 # texts = [  # 'Hello world!',
@@ -146,3 +147,22 @@ test_textbox = Expected(textbox, text='Hello\nworld!',
         #     '\x1b[;4;4m┤\x1b[0m\x1b[;4mworld!\x1b[0m\x1b[;4;4m├\x1b[0m',
         #     ' 𝇁ᑊ𝇁ᑊ𝇁ᑊ𝇁',
     })
+
+
+def test_textbox_align():
+    box = TextBox(corners=CORNERS['round'])
+    assert box('a\nbcd', align='<').splitlines()[1:3] == ['│a  │', '│bcd│']
+    assert box('a\nbcd', align='>').splitlines()[1] == '│  a│'
+    # width ignores ANSI codes
+    assert codes.strip(box(codes.apply('ab', 'r') + '\ncde').splitlines()[1]) == '│ab │'
+
+
+def test_for_style_cache():
+    assert TextBox.for_style('[') is GridFrameBox
+    assert TextBox.for_style('[') is GridFrameBox
+
+    class CustomBox(TextBox):
+        _supported_linestyles = {'#'}
+
+    # cache is cleared when new subclasses are defined
+    assert TextBox.for_style('#') is CustomBox
@@ -76,3 +76,50 @@ test_apply()
 # http://misc.flogisoft.com/bash/tip_colors_and_formatting
 # http://askubuntu.com/questions/512525/how-to-enable-24bit-true-color-support-in-gnome-terminal
 # https://github.com/robertknight/konsole/blob/master/tests/color-spaces.pl
+
+
+def test_color_depth():
+    s = motley.codes.apply('x', fg=(255, 0, 0), bg=(68, 1, 84))
+    assert motley.codes.downgrade(s, 'truecolor') == s
+    assert motley.codes.downgrade(s, 256) == '\x1b[;38;5;196;48;5;53mx\x1b[0m'
+    assert motley.codes.downgrade(s, 16) == '\x1b[;91;40mx\x1b[0m'
+    assert motley.codes.downgrade(s, 'none') == 'x\x1b[0m'
+
+    with motley.codes.color_depth(256):
+        assert motley.codes.get(fg=(255, 0, 0)) == '\x1b[38;5;196m'
+
+    # colours removed entirely: no code rather than a reset
+    with motley.codes.color_depth('none'):
+        assert motley.codes.get('r') == ''
+        assert motley.codes.get('bold', 'r') == '\x1b[1m'
+
+    assert motley.codes.get_depth() == 24
+
+
+def test_color_mode():
+    with motley.codes.color_mode('never'):
+        assert motley.codes.apply('hi', 'r') == 'hi'
+        assert motley.red('hi') == 'hi'
+        assert motley.format('{:|r}', 'hi') == 'hi'
+        assert motley.codes.get('bold') == ''
+
+    assert motley.codes.use_color()
+    assert motley.red('hi') != 'hi'
+
+
+def test_minimise():
+    minimise = motley.codes.minimise
+    assert minimise('\033[31m\033[1m\033[43mhi\033[0m\033[31m\033[0m') \
+        == '\033[1;31;43mhi\033[0m'
+    assert minimise('\033[;31;1;3;4;40mhi\033[0m') == '\033[1;3;4;31;40mhi\033[0m'
+    assert minimise('\033[;31ma\033[0m\033[;31mb\033[0m') == '\033[31mab\033[0m'
+    assert minimise('plain') == 'plain'
+
+    # styles left open are not closed, trailing resets are kept
+    assert minimise('\033[31mhi') == '\033[31mhi'
+    assert minimise('\033[31mhi\033[32m') == '\033[31mhi'
+    assert minimise('\033[31mhi\033[0m\033[1m') == '\033[31mhi\033[0m'
+    assert minimise('\033[31mhi\033[0mthere') == '\033[31mhi\033[0mthere'
+
+    s = motley.red(motley.bold('hi')) + ' there'
+    assert motley.codes.strip(minimise(s)) == motley.codes.strip(s)
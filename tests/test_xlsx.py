@@ -0,0 +1,200 @@
+# std
+import os
+from collections import defaultdict
+
+# third-party
+import pytest
+import numpy as np
+
+# local
+from motley.table import Table
+from motley.table.xlsx import (cell_range, get_cell_merges, get_row_merges,
+                               sheet_names, write_sheets)
+
+
+# ---------------------------------------------------------------------------- #
+# reference implementations of the original (list scan) algorithms
+
+def _where_duplicate(seq):
+    indices = defaultdict(list)
+    for i, item in enumerate(seq):
+        indices[item].append(i)
+    return [idx for idx in indices.values() if len(idx) > 1]
+
+
+def reference_row_merges(column, trigger=2):
+    for idx in _where_duplicate(column):
+        j, *_, k = idx
+        if idx == list(range(j, k + 1)) and len(idx) >= trigger:
+            yield j, k
+
+
+def reference_cell_merges(data, trigger=2):
+    data = np.atleast_2d(np.array(data, str))
+    nrows, ncols = data.shape
+    merged = defaultdict(set)
+    for r, row in enumerate(data):
+        groups = defaultdict(list)
+        for i, item in enumerate(row):
+            groups[item].append(i)
+
+        duplicate = {key: idx for key, idx in groups.items()
+                     if len(idx) > 1 and key != ''}
+        unique = []
+        if nrows > 1:
+            unique = [[i] for i in sorted(set(range(ncols)) -
+                                          set(sum(duplicate.values(), [])))]
+
+        for idx in (*duplicate.values(), *unique):
+            if not (idx := set(idx) - merged[r]):
+                continue
+
+            j, k = min(idx), max(idx)
+            s = (nrows - r - 1) * np.all(data[r + 1:, j:k + 1] == '')
+            if (k - j + 1 >= trigger) or s > 0:
+                yield r, j, r + s, k
+                for t in range(s + 1):
+                    merged[r + t] |= idx
+
+
+# ---------------------------------------------------------------------------- #
+def grouped_column(n, max_size=20, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, max_size, n)
+    return np.repeat(np.arange(n), sizes)
+
+
+def grouped_headers(n_cols, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for level, size in enumerate((12, 4, 1)):
+        row = []
+        while len(row) < n_cols:
+            name = f'{level}.{len(row)}' if rng.random() > 0.2 else ''
+            row.extend([name] * int(rng.integers(1, size + 1)))
+        rows.append(row[:n_cols])
+    return np.array(rows, 'O')
+
+
+def test_cell_range():
+    assert cell_range(0, 1) == 'A1:A1'
+    assert cell_range(0, 1, 27, 10) == 'A1:AB10'
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('trigger', (1, 2, 5))
+def test_row_merges(seed, trigger):
+    column = grouped_column(50_000, seed=seed)
+    # some values occur in non-contiguous runs, these should not be merged
+    column[::997] = column[5]
+
+    expected = set(reference_row_merges(column, trigger))
+    assert set(map(tuple, get_row_merges(column, trigger).T)) == expected
+
+    # mixed (unorderable) types
+    mixed = np.array([*map(str, column[:100]), *column[100:200]], 'O')
+    expected = set(reference_row_merges(mixed, trigger))
+    assert set(map(tuple, get_row_merges(mixed, trigger).T)) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('trigger', (1, 2))
+def test_cell_merges(seed, trigger):
+    headers = grouped_headers(500, seed)
+    expected = set(reference_cell_merges(headers, trigger))
+    assert set(get_cell_merges(headers, trigger)) == expected
+
+
+def test_cell_merges_blank_extend_down():
+    headers = [['a', 'a', '', 'b'],
+               ['c', 'd', '', 'e'],
+               ['', 'f', '', 'g']]
+    merges = set(get_cell_merges(headers))
+    assert merges == set(reference_cell_merges(headers))
+    assert (0, 2, 2, 2) in merges   # blank column merged down
+    assert (1, 0, 2, 0) in merges   # extends over blank cell below
+
+
+def test_cell_merges_non_contiguous():
+    # repeated names that are not adjacent are not merged across other cells
+    assert get_cell_merges([['a', 'b', 'a']]) == []
+    assert get_cell_merges([['a', 'a', 'b', 'a']]) == [(0, 0, 0, 1)]
+
+
+def test_sheet_names():
+    names = list(sheet_names(['a/b', 'a:b', 'x' * 40, None], 5))
+    assert names == ['a_b', 'a_b (2)', 'x' * 31, 'Sheet4', 'Sheet5']
+
+
+class WorkerTable(Table):
+    # records the id of the process that unpickled the table in its title
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._title = f'{self._title}@{os.getpid()}'
+
+
+class BrokenInWorker(Table):
+    # fails to build when unpickled in a worker process
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.unpickled = True
+
+    def resolve_input(self, *args, **kws):
+        if getattr(self, 'unpickled', False):
+            raise ValueError('Failed in worker.')
+        return super().resolve_input(*args, **kws)
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_write_sheets(tmp_path, workers):
+    from openpyxl import load_workbook
+
+    tables = [Table(np.arange(3 * n).reshape(n, 3), title=f'Group {n}',
+                    col_headers=list('abc'))
+              for n in range(2, 8)]
+    names = [f'g{n}' for n in range(2, 8)]
+    path = tmp_path / 'groups.xlsx'
+    write_sheets(path, tables, names, workers=workers)
+
+    book = load_workbook(path)
+    assert book.sheetnames == names
+    for n, name in enumerate(names, 2):
+        ws = book[name]
+        assert ws['A1'].value == f'Group {n}'
+        assert ws.max_row == n + 3  # title, headers, data, bottom rule
+
+
+def test_write_sheets_unpicklable(tmp_path):
+    from openpyxl import load_workbook
+
+    # local function formatters cannot be sent to worker processes
+    tables = [Table(np.arange(6).reshape(2, 3), title=f'Group {n}',
+                    formatters={0: lambda x: f'<{x}>'})
+              for n in range(3)]
+    path = tmp_path / 'fallback.xlsx'
+    write_sheets(path, tables, workers=2)
+    assert load_workbook(path).sheetnames == ['Sheet1', 'Sheet2', 'Sheet3']
+
+
+def test_write_sheets_workers(tmp_path):
+    from openpyxl import load_workbook
+
+    # tables, including one with stage hooks, are built in worker processes
+    tables = [WorkerTable(np.arange(6).reshape(2, 3), title=f'Group {n}',
+                          on_stage=lambda *args: None)
+              for n in range(4)]
+    path = tmp_path / 'workers.xlsx'
+    write_sheets(path, tables, workers=2)
+
+    book = load_workbook(path)
+    titles = [book[name]['A1'].value for name in book.sheetnames]
+    pids = {int(title.split('@')[1]) for title in titles}
+    assert [title.split('@')[0] for title in titles] == \
+        [f'Group {n}' for n in range(4)]
+    assert os.getpid() not in pids
+
+
+def test_write_sheets_worker_error(tmp_path):
+    tables = [BrokenInWorker(np.arange(6).reshape(2, 3)) for _ in range(2)]
+    with pytest.raises(ValueError, match='Failed in worker'):
+        write_sheets(tmp_path / 'broken.xlsx', tables, workers=2)